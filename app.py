@@ -11,10 +11,12 @@ import io
 from datetime import datetime
 import random
 import re
-import csv
 import json
 import uuid
 import math
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
 import tnc
 from openpyxl.reader.excel import load_workbook
 from dotenv import load_dotenv
@@ -23,8 +25,13 @@ from dotenv import load_dotenv
 import pdf_gen
 import xlsx_gen
 import data_management
+import price_list_repo
+import project_catalog
+import project_store
+import table_store
 import cover_merger
 from app_helpers import html_to_plain_text, to_words_usd, to_words_bdt
+from search_index import SearchHit, serialize_hits
 
 # NEW: Import BeautifulSoup for HTML cleaning
 from bs4 import BeautifulSoup
@@ -64,23 +71,152 @@ CONFIG = {
     'BDT_CONVERSION_RATE': float(os.getenv('BDT_CONVERSION_RATE', 125.0)),
     'CUSTOMS_DUTY_PERCENTAGE': float(os.getenv('CUSTOMS_DUTY_PERCENTAGE', 0.16)), # 16%
     'MODEL_NAME': os.getenv('MODEL_NAME', 'all-MiniLM-L6-v2'),
+    'ENCODER_BACKEND': os.getenv('ENCODER_BACKEND', 'torch'), # torch, onnx or openvino
+    'ENCODER_MODEL_FILE': os.getenv('ENCODER_MODEL_FILE', ''), # e.g. onnx/model_qint8_avx512_vnni.onnx
     'ITEM_FAISS_INDEX_FILE': os.path.join('data_storage', 'item_faiss_index.bin'),
-    'ITEM_SEARCH_DATA_FILE': os.path.join('data_storage', 'item_searchable_data.pkl'),
+    'ITEM_SEARCH_DATA_FILE': os.path.join('data_storage', 'item_searchable_data.rows'),
     'LOCAL_ITEM_FAISS_INDEX_FILE': os.path.join('data_storage', 'local_item_faiss_index.bin'),
-    'LOCAL_ITEM_SEARCH_DATA_FILE': os.path.join('data_storage', 'local_item_searchable_data.pkl'),
+    'LOCAL_ITEM_SEARCH_DATA_FILE': os.path.join('data_storage', 'local_item_searchable_data.rows'),
+    'ITEM_KEYWORD_INDEX_FILE': os.path.join('data_storage', 'item_keyword_index.pkl'),
+    'LOCAL_ITEM_KEYWORD_INDEX_FILE': os.path.join('data_storage', 'local_item_keyword_index.pkl'),
+    'ITEM_FACET_INDEX_FILE': os.path.join('data_storage', 'item_facet_index.pkl'),
+    'LOCAL_ITEM_FACET_INDEX_FILE': os.path.join('data_storage', 'local_item_facet_index.pkl'),
     'CLIENT_FAISS_INDEX_FILE': os.path.join('data_storage', 'client_faiss_index.bin'),
-    'CLIENT_SEARCH_DATA_FILE': os.path.join('data_storage', 'client_searchable_data.pkl'),
+    'CLIENT_SEARCH_DATA_FILE': os.path.join('data_storage', 'client_searchable_data.rows'),
+    'ITEM_EMBEDDINGS_FILE': os.path.join('data_storage', 'item_embeddings.npz'),
+    'LOCAL_ITEM_EMBEDDINGS_FILE': os.path.join('data_storage', 'local_item_embeddings.npz'),
+    'CLIENT_EMBEDDINGS_FILE': os.path.join('data_storage', 'client_embeddings.npz'),
+    'ITEM_LOCATION_INDEX_FILE': os.path.join('data_storage', 'item_locations.json'),
+    'PRICE_LIST_STAMPS_FILE': os.path.join('data_storage', 'price_list_stamps.json'), # price-list versions the item rows were built from
+    'PROJECT_CATALOG_FILE': os.path.join('data_storage', 'project_catalog.json'),
+    'PROJECT_STORE': os.getenv('PROJECT_STORE', 'files'), # files (one JSON file per project) or sqlite
+    'PROJECT_DB_FILE': os.path.join('data_storage', 'projects.sqlite3'),
+    'APP_DB_FILE': os.path.join('data_storage', 'app_data.sqlite3'), # notifications, reviews, shares, tasks, chat, activity log
+    'INGEST_WORKERS': int(os.getenv('INGEST_WORKERS', min(4, os.cpu_count() or 1))),
+    # Vector index type for catalogs larger than FAISS_FLAT_MAX_ROWS, as a faiss.index_factory string
+    # (benchmarks/bench_faiss_index.py measures the options; e.g. HNSW32 with efSearch=64)
+    'FAISS_INDEX_FACTORY': os.getenv('FAISS_INDEX_FACTORY', 'Flat'),
+    'FAISS_FLAT_MAX_ROWS': int(os.getenv('FAISS_FLAT_MAX_ROWS', 50000)),
+    'FAISS_SEARCH_PARAMS': os.getenv('FAISS_SEARCH_PARAMS', ''),
     'AI_HELPER_TOP_K': 5,
+    'AI_HELPER_BATCH_SIZE': int(os.getenv('AI_HELPER_BATCH_SIZE', 64)),
+    'AI_HELPER_JOB_WORKERS': int(os.getenv('AI_HELPER_JOB_WORKERS', 2)),
+    'AI_HELPER_JOB_CHUNK_ROWS': int(os.getenv('AI_HELPER_JOB_CHUNK_ROWS', 50)),
+    'AI_HELPER_JOB_TTL_SECONDS': 3600,
+    'PRICE_LIST_CACHE_SECONDS': int(os.getenv('PRICE_LIST_CACHE_SECONDS', 300)),
+    'PROJECT_PAGE_SIZE': int(os.getenv('PROJECT_PAGE_SIZE', 50)),
+    'PROJECT_PAGE_SIZE_MAX': 500,
+    'QUERY_EMBEDDING_CACHE_SIZE': int(os.getenv('QUERY_EMBEDDING_CACHE_SIZE', 4096)),
     'HEADER_COLOR_HEX': "EEE576"
 }
 
 # --- In-memory Data Storage ---
-sentence_model = None
-item_faiss_index, item_searchable_data = None, None
-local_item_faiss_index, local_item_searchable_data = None, None
-client_faiss_index, client_searchable_data = None, None
+price_list_repo.price_lists.max_idle_seconds = CONFIG['PRICE_LIST_CACHE_SECONDS']
+price_list_repo.price_lists.location_index_file = CONFIG['ITEM_LOCATION_INDEX_FILE']
+project_catalog.projects.projects_dir = CONFIG['PROJECTS_DIR']
+project_catalog.projects.catalog_file = CONFIG['PROJECT_CATALOG_FILE']
+# Project documents; the SQLite store imports PROJECTS_DIR once on first use
+if CONFIG['PROJECT_STORE'] == 'sqlite':
+    projects_store = project_store.SqliteProjectStore(CONFIG['PROJECT_DB_FILE'], migrate_from=CONFIG['PROJECTS_DIR'])
+else:
+    projects_store = project_store.FileProjectStore(CONFIG['PROJECTS_DIR'], project_catalog.projects)
+# Record tables; the CSV files they used to live in are imported once and then only kept for reference
+table_store.tables.db_file = CONFIG['APP_DB_FILE']
+table_store.tables.csv_sources = {
+    table: os.path.join(CONFIG['DATA_DIR'], CONFIG[key]) for table, key in [
+        ('activity_log', 'ACTIVITY_LOG_FILE'), ('review_requests', 'REVIEW_REQUESTS_FILE'), ('notifications', 'NOTIFICATIONS_FILE'),
+        ('project_shares', 'PROJECT_SHARES_FILE'), ('tasks', 'TASKS_FILE'), ('chat_history', 'CHAT_HISTORY_FILE')]
+}
+# The model, indexes and row data of the current build. Requests read `search_bundle`
+# once and use that object throughout, so a rebuild can never pair a new index with old rows.
+search_bundle = data_management.SearchBundle()
+filter_options_cache = None
+sheet_catalog = None
 users_df, clients_df = None, None
 online_users = {}
+query_embedding_cache = data_management.EmbeddingCache(CONFIG['QUERY_EMBEDDING_CACHE_SIZE'])
+# Background AI-helper jobs; a small pool keeps large uploads from starving interactive requests
+ai_helper_jobs = {}
+ai_helper_jobs_lock = threading.Lock()
+ai_helper_executor = ThreadPoolExecutor(max_workers=CONFIG['AI_HELPER_JOB_WORKERS'], thread_name_prefix='ai-helper')
+# Index rebuilds run one at a time on their own thread; search keeps serving the published bundle meanwhile
+index_builds = {}
+index_builds_lock = threading.Lock()
+queued_index_build_id = None
+index_build_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='index-build')
+
+def price_list_path(key):
+    """Path of a price-list workbook ('PRICE_LIST_FILE' or 'LOCAL_PRICE_LIST_FILE'), which live in DATA_DIR."""
+    return os.path.join(CONFIG['DATA_DIR'], CONFIG[key])
+
+def data_config():
+    """CONFIG with the source files resolved to the paths the indexer reads them from."""
+    config = CONFIG.copy()
+    config['USERS_FILE'] = os.path.join(CONFIG['AUTH_DIR'], CONFIG['USERS_FILE'])
+    config['CLIENTS_FILE'] = os.path.join(CONFIG['DATA_DIR'], CONFIG['CLIENTS_FILE'])
+    config['PRICE_LIST_FILE'] = price_list_path('PRICE_LIST_FILE')
+    config['LOCAL_PRICE_LIST_FILE'] = price_list_path('LOCAL_PRICE_LIST_FILE')
+    return config
+
+def publish_search_bundle(bundle):
+    """Makes a freshly built SearchBundle the one served to requests, with a single reference swap."""
+    global search_bundle, filter_options_cache, sheet_catalog
+    if bundle.sentence_model is not search_bundle.sentence_model:
+        # Cached query embeddings belong to the model being replaced
+        query_embedding_cache.clear()
+    filter_options_cache = bundle.filter_options
+    sheet_catalog = bundle.sheet_catalog
+    search_bundle = bundle
+    print(f"Search bundle {bundle.build_id} published.")
+
+def start_index_build(reason, patch=None):
+    """
+    Queues a background rebuild of the search bundle and returns its build id.
+    While a build is still waiting to start, later requests share it, since it
+    will read the source files as they are when it runs.
+    `patch(bundle, build_id)` can stand in for the full rebuild when a change
+    only touches row metadata; it returns the patched bundle, or None to fall
+    back to the rebuild.
+    """
+    global queued_index_build_id
+    with index_builds_lock:
+        if queued_index_build_id is not None:
+            return queued_index_build_id
+        build_id = uuid.uuid4().hex
+        index_builds[build_id] = {
+            'build_id': build_id, 'status': 'queued', 'reason': reason, 'message': '',
+            'kind': 'rebuild' if patch is None else 'patch',
+            'queued_at': datetime.now().isoformat(), 'started_at': None, 'finished_at': None,
+        }
+        # Forget the oldest finished builds; queued and running ones are still referenced by their task
+        finished = [old_id for old_id, old_build in index_builds.items() if old_build['status'] in ('completed', 'failed')]
+        for old_id in finished[:max(0, len(index_builds) - 50)]:
+            del index_builds[old_id]
+        if patch is None:
+            queued_index_build_id = build_id
+    index_build_executor.submit(run_index_build, build_id, patch)
+    return build_id
+
+def run_index_build(build_id, patch=None):
+    global queued_index_build_id
+    with index_builds_lock:
+        if queued_index_build_id == build_id:
+            queued_index_build_id = None
+        build = index_builds[build_id]
+        build.update(status='running', started_at=datetime.now().isoformat())
+    try:
+        # Builds run one at a time on this thread, so the bundle being patched is the latest
+        # one; a patch still falls back to a rebuild if a workbook changed since it was built
+        bundle = patch(search_bundle, build_id) if patch is not None else None
+        if bundle is None:
+            bundle = data_management.initialize_data(data_config(), force_rebuild=True, build_id=build_id)
+        publish_search_bundle(bundle)
+        result = {'status': 'completed', 'message': 'Data re-initialized successfully.'}
+    except Exception as e:
+        print(f"Index build {build_id} failed: {e}")
+        result = {'status': 'failed', 'message': f'Failed to re-initialize data: {e}'}
+    with index_builds_lock:
+        build.update(result, finished_at=datetime.now().isoformat())
 
 # --- Helper Functions ---
 def sanitize_dirty_html(html_string):
@@ -152,45 +288,26 @@ def setup_directories_and_files():
         clients_df = pd.DataFrame({'sl': [1, 2], 'client_name': ['Global Construction Ltd.', 'Modern Builders Inc.'], 'client_address': ['123 Business Bay, Dubai', '456 Skyline Ave, Abu Dhabi']})
         clients_df.to_csv(clients_filepath, index=False)
 
-    for key in ['ACTIVITY_LOG_FILE', 'REVIEW_REQUESTS_FILE', 'NOTIFICATIONS_FILE', 'PROJECT_SHARES_FILE', 'TASKS_FILE', 'CHAT_HISTORY_FILE']:
-        filepath = os.path.join(CONFIG['DATA_DIR'], CONFIG[key])
-        if not os.path.exists(filepath):
-            headers = {
-                'ACTIVITY_LOG_FILE': ['sl', 'date', 'user_name', 'fo_name', 'file_path', 'project_id'],
-                'REVIEW_REQUESTS_FILE': ['request_id', 'user_email', 'request_type', 'item_code', 'details', 'status', 'visibility', 'remarks', 'timestamp'],
-                'NOTIFICATIONS_FILE': ['notification_id', 'user_email', 'message', 'is_read', 'timestamp'],
-                'PROJECT_SHARES_FILE': ['share_id', 'project_id', 'owner_email', 'shared_with_email', 'permissions', 'timestamp'],
-                'TASKS_FILE': ['task_id', 'assigned_by', 'assigned_to', 'task_description', 'status', 'timestamp'],
-                'CHAT_HISTORY_FILE': ['message_id', 'sender_email', 'recipient_email', 'message', 'timestamp']
-            }
-            with open(filepath, 'w', newline='', encoding='utf-8') as f:
-                csv.writer(f).writerow(headers[key])
-
 def log_activity(user_name, fo_name, file_path, project_id):
     try:
-        log_file = os.path.join(CONFIG['DATA_DIR'], CONFIG['ACTIVITY_LOG_FILE'])
-
-        sl = 1
-        if os.path.exists(log_file) and os.path.getsize(log_file) > 0:
-            try:
-                df = pd.read_csv(log_file)
-                if not df.empty and 'sl' in df.columns:
-                    last_sl = pd.to_numeric(df['sl'], errors='coerce').max()
-                    if pd.notna(last_sl):
-                        sl = int(last_sl) + 1
-            except Exception as read_err:
-                print(f"Could not read activity log to determine next sl: {read_err}")
-
-        with open(log_file, 'a', newline='', encoding='utf-8') as f:
-            csv.writer(f).writerow([sl, datetime.now().strftime('%Y-%m-%d %H:%M:%S'), user_name, fo_name, file_path, project_id])
+        table_store.tables.append_activity({
+            'date': datetime.now().strftime('%Y-%m-%d %H:%M:%S'), 'user_name': user_name, 'fo_name': fo_name,
+            'file_path': file_path, 'project_id': project_id
+        })
     except Exception as e:
         print(f"Error logging activity: {e}")
 
 def create_notification(user_email, message):
+    """Stores a notification and pushes it to the user's socket if they are online."""
     try:
-        with open(os.path.join(CONFIG['DATA_DIR'], CONFIG['NOTIFICATIONS_FILE']), 'a', newline='', encoding='utf-8') as f:
-            writer = csv.writer(f)
-            writer.writerow([str(uuid.uuid4()), user_email, message, 'no', datetime.now().isoformat()])
+        notification = {
+            'notification_id': str(uuid.uuid4()), 'user_email': user_email, 'message': message,
+            'is_read': 'no', 'timestamp': datetime.now().isoformat()
+        }
+        table_store.tables.insert('notifications', notification)
+        sid = online_users.get(user_email)
+        if sid:
+            socketio.emit('new_notification', {'notification': notification, 'unread_count': table_store.tables.unread_count(user_email)}, to=sid)
     except Exception as e:
         print(f"Error creating notification for {user_email}: {e}")
 
@@ -219,19 +336,12 @@ def check_project_permission(project_id, user_email, user_role):
     if user_role == 'admin':
         return True
 
-    project_filepath = os.path.join(CONFIG['PROJECTS_DIR'], f"{project_id}.json")
-    if os.path.exists(project_filepath):
-        with open(project_filepath, 'r', encoding='utf-8') as f:
-            project_data = json.load(f)
-        if project_data.get('owner_email') == user_email:
-            return True
+    project_data = projects_store.load(project_id)
+    if project_data is not None and project_data.get('owner_email') == user_email:
+        return True
 
-    shares_filepath = os.path.join(CONFIG['DATA_DIR'], CONFIG['PROJECT_SHARES_FILE'])
-    if os.path.exists(shares_filepath):
-        shares_df = pd.read_csv(shares_filepath)
-        is_shared = not shares_df[(shares_df['project_id'] == project_id) & (shares_df['shared_with_email'] == user_email)].empty
-        if is_shared:
-            return True
+    if table_store.tables.exists('project_shares', {'shared_with_email': user_email, 'project_id': project_id}):
+        return True
 
     return False
 
@@ -248,54 +358,63 @@ def safe_float(value, default=0.0):
 
 def update_excel_price(filepath, sheet_name, item_code, price_data):
     """Helper function to update a specific excel file."""
+    return update_excel_prices(filepath, [(sheet_name, item_code, price_data)])[0]
+
+def update_excel_prices(filepath, updates):
+    """
+    Applies several (sheet_name, item_code, price_data) updates to one price list
+    with a single workbook load and save. Returns a (success, message) pair per update.
+    """
     try:
-        wb = load_workbook(filepath)
-        if sheet_name not in wb.sheetnames:
-            # If sheet doesn't exist, create it from the first sheet's template
-            template_sheet = wb.worksheets[0]
-            ws = wb.copy_worksheet(template_sheet)
-            ws.title = sheet_name
-        else:
-            ws = wb[sheet_name]
+        with price_list_repo.price_lists.edit(filepath) as edit:
+            return [_update_workbook_price(edit, filepath, sheet_name, item_code, price_data)
+                    for sheet_name, item_code, price_data in updates]
+    except Exception as e:
+        return [(False, f"Error updating Excel file: {e}")] * len(updates)
 
-        header = [cell.value.lower().strip() if cell.value else '' for cell in ws[1]]
-        try:
-            item_code_col_idx = header.index('item_code')
-            price_col_idx = header.index(price_data['price_column'])
-            desc_col_idx = header.index('description')
-            unit_col_idx = header.index('unit')
-            # Find make column, might not exist in all sheets
-            make_col_idx = header.index('make') if 'make' in header else -1
-
-        except ValueError as e:
-            return (False, f"Required column not found in sheet '{sheet_name}': {e}")
-
-        # Search for item_code to update row
-        row_to_update = None
-        for row_idx, row in enumerate(ws.iter_rows(min_row=2, values_only=True), start=2):
-            if row[item_code_col_idx] and str(row[item_code_col_idx]).strip() == item_code:
-                row_to_update = row_idx
-                break
+def _update_workbook_price(edit, filepath, sheet_name, item_code, price_data):
+    wb = edit.workbook
+    # A missing sheet is created from the first sheet's template, once the columns are known to be there
+    template_sheet = wb[sheet_name] if sheet_name in wb.sheetnames else wb.worksheets[0]
 
-        if row_to_update:
-            # Update existing row
-            ws.cell(row=row_to_update, column=price_col_idx + 1, value=price_data['price_value'])
-        else:
-            # Add new row if item_code is not found
-            new_row_values = [''] * len(header)
-            new_row_values[item_code_col_idx] = item_code
-            new_row_values[price_col_idx] = price_data['price_value']
-            new_row_values[desc_col_idx] = price_data.get('description', '')
-            new_row_values[unit_col_idx] = price_data.get('unit', 'Pcs')
-            if make_col_idx != -1:
-                new_row_values[make_col_idx] = price_data.get('make', 'MISC')
-            ws.append(new_row_values)
-
-        wb.save(filepath)
-        return (True, f"Successfully updated item {item_code} in {os.path.basename(filepath)}.")
+    header = [cell.value.lower().strip() if cell.value else '' for cell in template_sheet[1]]
+    try:
+        item_code_col_idx = header.index('item_code')
+        price_col_idx = header.index(price_data['price_column'])
+        desc_col_idx = header.index('description')
+        unit_col_idx = header.index('unit')
+        # Find make column, might not exist in all sheets
+        make_col_idx = header.index('make') if 'make' in header else -1
+
+    except ValueError as e:
+        return (False, f"Required column not found in sheet '{sheet_name}': {e}")
+
+    if sheet_name not in wb.sheetnames:
+        ws = wb.copy_worksheet(template_sheet)
+        ws.title = sheet_name
+    else:
+        ws = template_sheet
 
-    except Exception as e:
-        return (False, f"Error updating Excel file: {e}")
+    # Rows are looked up through the item location index of the price list
+    row_to_update = edit.item_rows(ws).get(str(item_code))
+
+    if row_to_update:
+        # Update existing row
+        ws.cell(row=row_to_update, column=price_col_idx + 1, value=price_data['price_value'])
+    else:
+        # Add new row if item_code is not found
+        new_row_values = [''] * len(header)
+        new_row_values[item_code_col_idx] = item_code
+        new_row_values[price_col_idx] = price_data['price_value']
+        new_row_values[desc_col_idx] = price_data.get('description', '')
+        new_row_values[unit_col_idx] = price_data.get('unit', 'Pcs')
+        if make_col_idx != -1:
+            new_row_values[make_col_idx] = price_data.get('make', 'MISC')
+        ws.append(new_row_values)
+        edit.row_added(ws, item_code, ws.max_row)
+
+    edit.changed = True
+    return (True, f"Successfully updated item {item_code} in {os.path.basename(filepath)}.")
 
 # --- Export Functions ---
 # --- START OF CORRECTION ---
@@ -557,34 +676,46 @@ def upload_cover():
 @app.route('/reinitialize', methods=['POST'])
 def reinitialize_data_endpoint():
     if request.json.get('role') != 'admin': return jsonify({'success': False, 'message': 'Permission denied.'}), 403
-    try:
-        global sentence_model, item_faiss_index, item_searchable_data, local_item_faiss_index, local_item_searchable_data, client_faiss_index, client_searchable_data
-        data_objects = data_management.initialize_data(CONFIG, force_rebuild=True)
-        sentence_model = data_objects['sentence_model']
-        item_faiss_index = data_objects['item_faiss_index']
-        item_searchable_data = data_objects['item_searchable_data']
-        local_item_faiss_index = data_objects['local_item_faiss_index']
-        local_item_searchable_data = data_objects['local_item_searchable_data']
-        client_faiss_index = data_objects['client_faiss_index']
-        client_searchable_data = data_objects['client_searchable_data']
-        return jsonify({'success': True, 'message': 'Data re-initialized successfully.'})
-    except Exception as e:
-        return jsonify({'success': False, 'message': f'Failed to re-initialize data: {e}'}), 500
+    build_id = start_index_build('reinitialize')
+    return jsonify({'success': True, 'build_id': build_id, 'message': 'Re-initialization started. Search keeps using the current data until it finishes.'}), 202
+
+@app.route('/reinitialize/<build_id>', methods=['GET'])
+def reinitialize_status(build_id):
+    if request.args.get('role') != 'admin': return jsonify({'success': False, 'message': 'Permission denied.'}), 403
+    with index_builds_lock:
+        build = dict(index_builds[build_id]) if build_id in index_builds else None
+    if build is None:
+        return jsonify({'success': False, 'message': 'Build not found.'}), 404
+    return jsonify({'success': True, 'build': build, 'active_build_id': search_bundle.build_id})
+
+@app.route('/embedding_cache_stats', methods=['GET'])
+def embedding_cache_stats():
+    if request.args.get('role') != 'admin': return jsonify({'success': False, 'message': 'Permission denied.'}), 403
+    return jsonify({'success': True, 'stats': query_embedding_cache.stats()})
+
+@app.route('/model_stats', methods=['GET'])
+def model_stats():
+    if request.args.get('role') != 'admin': return jsonify({'success': False, 'message': 'Permission denied.'}), 403
+    return jsonify({'success': True, 'stats': data_management.model_registry.stats()})
 
 @app.route('/get_activity_log', methods=['GET'])
 def get_activity_log():
     if request.args.get('role') != 'admin': return jsonify({'success': False, 'message': 'Permission denied.'}), 403
-    log_file_path = os.path.join(CONFIG['DATA_DIR'], CONFIG['ACTIVITY_LOG_FILE'])
-    if not os.path.exists(log_file_path): return jsonify([])
     try:
-        df = pd.read_csv(log_file_path)
-        if df.empty: return jsonify([])
-        df = df.astype(object).where(pd.notnull(df), None)
-        return jsonify(df.to_dict('records'))
+        return jsonify(table_store.tables.select('activity_log', order_by='rowid'))
     except Exception as e:
-        print(f"Error reading or parsing activity log file: {e}")
+        print(f"Error reading activity log: {e}")
         return jsonify([])
 
+@app.route('/export_table/<table>', methods=['GET'])
+def export_table(table):
+    """Downloads one of the record tables (e.g. notifications, activity_log) as CSV, in the old file layout."""
+    if request.args.get('role') != 'admin': return jsonify({'success': False, 'message': 'Permission denied.'}), 403
+    if table not in table_store.TABLES:
+        return jsonify({'success': False, 'message': f"Unknown table '{table}'."}), 404
+    csv_bytes = io.BytesIO(table_store.tables.export_csv(table).encode('utf-8'))
+    return send_file(csv_bytes, mimetype='text/csv', as_attachment=True, download_name=f"{table}.csv")
+
 @app.route('/download_fo/<path:filename>')
 def download_fo(filename):
     try:
@@ -627,56 +758,40 @@ def update_user():
     except Exception as e:
         return jsonify({'success': False, 'message': f'An error occurred: {e}'}), 500
 
+def loaded_facet_indexes():
+    bundle = search_bundle
+    return [index for index in (bundle.item_facet_index, bundle.local_item_facet_index) if index is not None]
+
 @app.route('/get_sheet_names', methods=['GET'])
 def get_sheet_names():
-    all_sheet_names = set()
+    global sheet_catalog
     try:
-        if os.path.exists(CONFIG['PRICE_LIST_FILE']):
-            wb_foreign = load_workbook(CONFIG['PRICE_LIST_FILE'], read_only=True, keep_vba=False)
-            all_sheet_names.update(wb_foreign.sheetnames)
-
-        if os.path.exists(CONFIG['LOCAL_PRICE_LIST_FILE']):
-            wb_local = load_workbook(CONFIG['LOCAL_PRICE_LIST_FILE'], read_only=True, keep_vba=False)
-            all_sheet_names.update(wb_local.sheetnames)
-
-        return jsonify(sorted(list(all_sheet_names)))
+        # The workbooks are only re-opened when their mtime/size and content hash change
+        if sheet_catalog is None:
+            sheet_catalog = data_management.load_sheet_catalog([price_list_path('PRICE_LIST_FILE'), price_list_path('LOCAL_PRICE_LIST_FILE')])
+        else:
+            sheet_catalog = data_management.refresh_sheet_catalog(sheet_catalog)
     except Exception as e:
         print(f"Error reading sheet names: {e}")
         return jsonify({'error': str(e)}), 500
 
+    response = jsonify(sheet_catalog['sheet_names'])
+    response.set_etag(sheet_catalog['etag'])
+    if sheet_catalog['last_modified'] is not None:
+        response.last_modified = datetime.fromtimestamp(sheet_catalog['last_modified'])
+    response.cache_control.no_cache = True
+    return response.make_conditional(request)
+
 @app.route('/get_filter_options', methods=['GET'])
 def get_filter_options():
-    filter_options = {
-        "make": [], "approvals": [], "model": []
-    }
-    filter_columns = list(filter_options.keys())
+    global filter_options_cache
+    if filter_options_cache is None:
+        filter_options_cache = data_management.build_filter_options(loaded_facet_indexes())
 
-    files_to_process = [CONFIG['PRICE_LIST_FILE'], CONFIG['LOCAL_PRICE_LIST_FILE']]
-
-    all_data_df = pd.DataFrame()
-
-    for file_path in files_to_process:
-        if os.path.exists(file_path):
-            try:
-                # Read all sheets from the Excel file
-                xls = pd.ExcelFile(file_path)
-                for sheet_name in xls.sheet_names:
-                    df = pd.read_excel(xls, sheet_name=sheet_name)
-                    # Normalize column names
-                    df.columns = [str(c).lower().strip() for c in df.columns]
-                    all_data_df = pd.concat([all_data_df, df], ignore_index=True)
-            except Exception as e:
-                print(f"Could not process {file_path} for filters: {e}")
-                continue
-
-    if not all_data_df.empty:
-        for col in filter_columns:
-            if col in all_data_df.columns:
-                # Get unique non-null values, convert to string, and sort
-                unique_values = all_data_df[col].dropna().astype(str).unique()
-                filter_options[col] = sorted([v for v in unique_values if v.strip()])
-
-    return jsonify(filter_options)
+    response = jsonify(filter_options_cache['options'])
+    response.set_etag(filter_options_cache['etag'])
+    response.cache_control.no_cache = True
+    return response.make_conditional(request)
 
 @app.route('/get_offer_config', methods=['GET'])
 def get_offer_config():
@@ -693,10 +808,11 @@ def get_offer_config():
 @app.route('/search_clients', methods=['GET'])
 def search_clients():
     query = request.args.get('q', '').lower()
-    if not query or client_faiss_index is None or sentence_model is None: return jsonify([])
-    query_embedding = sentence_model.encode([query], convert_to_tensor=True).cpu().numpy()
-    _, indices = client_faiss_index.search(query_embedding, k=5)
-    return jsonify([client_searchable_data[i] for i in indices[0]])
+    bundle = search_bundle
+    if not query or bundle.client_faiss_index is None or bundle.sentence_model is None: return jsonify([])
+    query_embedding = query_embedding_cache.encode(bundle.sentence_model, bundle.model_name, [query])
+    _, indices = bundle.client_faiss_index.search(query_embedding, k=5)
+    return jsonify([bundle.client_searchable_data[i] for i in indices[0]])
 
 @app.route('/search_items', methods=['GET'])
 def search_items():
@@ -713,41 +829,37 @@ def search_items():
     product_type_filter = [s.strip().lower() for s in product_type_filter_str.split(',') if s] if product_type_filter_str else []
     # --- END MODIFICATION ---
 
-    all_items_to_search = []
-    if source in ['foreign', 'all'] and item_searchable_data:
-        for item in item_searchable_data:
-            item_copy = item.copy()
-            item_copy['source_type'] = 'foreign'
-            all_items_to_search.append(item_copy)
-
-    if source in ['local', 'all'] and local_item_searchable_data:
-        for item in local_item_searchable_data:
-            item_copy = item.copy()
-            item_copy['source_type'] = 'local'
-            all_items_to_search.append(item_copy)
-
-    # Apply categorical filters first
-    filtered_items = []
-    for item in all_items_to_search:
-        # --- START MODIFICATION ---
-        # Check sheet name
-        if product_type_filter and str(item.get('product_type', '')).lower() not in product_type_filter:
-            continue
-        # --- END MODIFICATION ---
-        # Check make
-        if make_filter and str(item.get('make', '')).lower() not in make_filter:
-            continue
-        # Check approvals
-        if approvals_filter and str(item.get('approvals', '')).lower() not in approvals_filter:
-            continue
-        # Check model
-        if model_filter and str(item.get('model', '')).lower() not in model_filter:
-            continue
-        filtered_items.append(item)
+    facet_filters = {
+        'product_type': product_type_filter,
+        'make': make_filter,
+        'approvals': approvals_filter,
+        'model': model_filter,
+    }
+
+    bundle = search_bundle
+    sources_to_search = []
+    if source in ['foreign', 'all'] and bundle.item_searchable_data:
+        sources_to_search.append(('foreign', bundle.item_searchable_data, bundle.item_keyword_index, bundle.item_facet_index))
+    if source in ['local', 'all'] and bundle.local_item_searchable_data:
+        sources_to_search.append(('local', bundle.local_item_searchable_data, bundle.local_item_keyword_index, bundle.local_item_facet_index))
+
+    # Apply categorical filters first, as row-id set intersections over the precomputed facets
+    allowed_rows = {source_type: facet_index.allowed_rows(facet_filters) for source_type, _, _, facet_index in sources_to_search}
+
+    def filtered_catalog():
+        # Rows already carry source_type, so they are returned as-is without copying
+        filtered_items = []
+        for source_type, row_store, _, _ in sources_to_search:
+            allowed = allowed_rows[source_type]
+            if allowed is None:
+                filtered_items.extend(row_store)
+            else:
+                filtered_items.extend(row_store[row_id] for row_id in sorted(allowed))
+        return filtered_items
 
     if not query:
         # If no search query, return the pre-filtered list
-        return jsonify(filtered_items)
+        return jsonify(filtered_catalog())
 
     # Parse the text query to separate positive and negative keywords
     all_terms = query.split()
@@ -764,38 +876,16 @@ def search_items():
     positive_keywords = [word for word in re.split(r'[^a-z0-9]+', positive_query) if word]
 
     if not positive_keywords:
-        return jsonify(filtered_items)
-
-    scored_results = []
-    for item in filtered_items: # Search within the already filtered items
-        target_text = item.get('search_text', '')
-
-        # 1. Negative Filter: Skip item if it contains any negative keyword
-        if any(neg_keyword in target_text for neg_keyword in negative_keywords):
-            continue
-
-        # 2. Positive Scoring: Score based on positive keywords
-        matched_keywords_count = sum(1 for pos_keyword in positive_keywords if pos_keyword in target_text)
+        return jsonify(filtered_catalog())
 
-        if matched_keywords_count > 0:
-            score = matched_keywords_count / len(positive_keywords)
+    # Resolve keywords through the inverted index, restricted to the rows that passed the filters
+    hits = []
+    for source_type, row_store, keyword_index, _ in sources_to_search:
+        source_sort_key = 0 if source_type == 'foreign' else 1
+        for row_id, score in keyword_index.search(row_store, positive_keywords, positive_query, negative_keywords, allowed=allowed_rows[source_type]):
+            hits.append(SearchHit(row_store, row_id, score, source_sort_key))
 
-            if positive_query in target_text:
-                score += 0.5
-
-            item['relevance_score'] = score
-            item['source_sort_key'] = 0 if item['source_type'] == 'foreign' else 1
-            scored_results.append(item)
-
-    # Sort results
-    sorted_results = sorted(scored_results, key=lambda x: (-x['relevance_score'], x['source_sort_key']))
-
-    if role != 'admin':
-        for item in sorted_results:
-            item.pop('relevance_score', None)
-            item.pop('source_sort_key', None)
-
-    return jsonify(sorted_results)
+    return jsonify(serialize_hits(hits, include_scores=(role == 'admin')))
 
 @app.route('/project', methods=['POST'])
 def save_project():
@@ -821,16 +911,14 @@ def save_project():
 
     is_new_project = not data.get('projectId')
     project_id = data.get('projectId') or str(uuid.uuid4())
-    filename = f"{project_id}.json"
-    filepath = os.path.join(CONFIG['PROJECTS_DIR'], filename)
 
     existing_status = 'Pending'
     # BUG FIX: Preserve original owner when an admin saves
     original_owner_email = data.get('user', {}).get('email') # Default to current user for new projects
-    if not is_new_project and os.path.exists(filepath):
+    if not is_new_project:
         try:
-            with open(filepath, 'r', encoding='utf-8') as f:
-                existing_data = json.load(f)
+            existing_data = projects_store.load(project_id)
+            if existing_data is not None:
                 existing_status = existing_data.get('status', 'Pending')
                 original_owner_email = existing_data.get('owner_email', original_owner_email)
         except (IOError, json.JSONDecodeError):
@@ -888,8 +976,7 @@ def save_project():
 
 
     try:
-        with open(filepath, 'w', encoding='utf-8') as f:
-            json.dump(project_data, f, indent=4)
+        projects_store.save(project_id, project_data)
 
         user_name = data.get('user', {}).get('name', 'Unknown')
         reference_number = project_data.get('referenceNumber', 'Unsaved Project')
@@ -905,186 +992,86 @@ def save_project():
 
 # app.py
 
+def list_projects(owner_email=project_catalog.ANY_OWNER):
+    """
+    Responds with one page of listing rows, selected, ordered and paginated by the
+    project store without opening any project document. Query parameters: search, type,
+    sort (date_desc, date_asc, ref_asc, ref_desc), offset, limit, and fields, a comma
+    separated subset of the summary columns (all of them by default). The page is a JSON
+    array; X-Total-Count holds the number of matches and X-Next-Offset the offset of the
+    next page, if there is one. Full documents are loaded through GET /project/<id>.
+    """
+    search_term = request.args.get('search', '').lower()
+    sort = request.args.get('sort', 'date_desc')
+    if sort not in project_catalog.SORT_ORDERS:
+        return jsonify({'success': False, 'message': f"Unknown sort '{sort}'."}), 400
+    try:
+        offset = max(0, int(request.args.get('offset', 0)))
+        limit = min(max(1, int(request.args.get('limit', CONFIG['PROJECT_PAGE_SIZE']))), CONFIG['PROJECT_PAGE_SIZE_MAX'])
+    except ValueError:
+        return jsonify({'success': False, 'message': 'offset and limit must be integers.'}), 400
+    fields = [field.strip() for field in request.args.get('fields', '').split(',') if field.strip()] or list(project_catalog.SUMMARY_FIELDS)
+    unknown_fields = [field for field in fields if field not in project_catalog.SUMMARY_FIELDS]
+    if unknown_fields:
+        return jsonify({'success': False, 'message': f"Unknown field(s): {', '.join(unknown_fields)}."}), 400
+
+    total, summaries = projects_store.page(owner_email=owner_email, search_term=search_term, project_type=request.args.get('type') or None,
+                                           sort=sort, offset=offset, limit=limit)
+    page = [{field: summary[field] for field in fields} for summary in summaries]
+    for i, p in enumerate(page):
+        p['sl'] = offset + i + 1
+
+    response = jsonify(page)
+    response.headers['X-Total-Count'] = str(total)
+    if offset + limit < total:
+        response.headers['X-Next-Offset'] = str(offset + limit)
+    return response
+
 @app.route('/projects', methods=['GET'])
 def get_projects():
     user_email = request.args.get('email')
-    search_term = request.args.get('search', '').lower()
     # user_role is not needed here anymore for filtering, but kept in case other logic depends on it
     user_role = request.args.get('role')
-    projects = []
 
-    for filename in os.listdir(CONFIG['PROJECTS_DIR']):
-        if not filename.endswith('.json'):
-            continue
-        try:
-            filepath = os.path.join(CONFIG['PROJECTS_DIR'], filename)
-            with open(filepath, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-
-            # BUG FIX: Only show projects owned by the current user in "My Projects"
-            # Admins should not see other users' projects in this specific list.
-            if data.get('owner_email') != user_email:
-                continue
-
-            project_type = data.get('projectType', 'offer')
-            reference_number_display = data.get('referenceNumber', 'N/A')
-            client_name_display = data.get('client', {}).get('name', 'N/A')
-            product_types_display = []
-            
-            # MODIFICATION START: Get all items from sheets if they exist
-            all_items = []
-            if project_type == 'offer' and 'sheets' in data:
-                all_items = [item for sheet in data.get('sheets', []) for item in sheet.get('items', [])]
-            else:
-                all_items = data.get('items', [])
-            # MODIFICATION END
-
-            if project_type == 'challan':
-                client_name = data.get('client', {}).get('name', 'NOCLIENT')
-                all_cats = set(i.get('make') for i in all_items)
-                cats = sorted([str(c) for c in all_cats if c])
-                cats_part = '_'.join(cats) if cats else 'MISC'
-                abbreviation = ''.join(word[0]for word in client_name.split()).upper()
-                client_part = ''.join(filter(str.isalnum, abbreviation))[:4]
-                date_part = datetime.fromisoformat(data.get('lastModified')).strftime('%d-%b-%Y')
-                reference_number_display = f"DC_{data.get('referenceNumber')}_{client_part}_{cats_part}_{date_part}"
-                product_types_display = cats
-            elif project_type == 'ai_helper':
-                reference_number_display = f"[AI] {data.get('referenceNumber', 'Untitled')}"
-                client_name_display = "N/A"
-                product_types_display = ["AI Processed"]
-            else:
-                all_product_types = set(i.get('product_type', 'N/A') for i in all_items)
-                product_types_display = sorted([str(m) for m in all_product_types if m and m != 'N/A'])
-
-            if search_term and search_term not in reference_number_display.lower() and search_term not in client_name_display.lower():
-                continue
-
-            projects.append({
-                'projectId': data.get('projectId'),
-                'referenceNumber': reference_number_display,
-                'clientName': client_name_display,
-                'dateModified': data.get('lastModified'),
-                'productTypes': ', '.join(product_types_display),
-                'status': data.get('status', 'Pending'),
-                'projectType': project_type,
-                **data
-            })
-        except Exception as e:
-            print(f"Error processing project file {filename}: {e}")
-            continue
-
-    projects.sort(key=lambda p: p['dateModified'], reverse=True)
-    for i, p in enumerate(projects):
-        p['sl'] = i + 1
-
-    return jsonify(projects)
+    # BUG FIX: Only show projects owned by the current user in "My Projects"
+    # Admins should not see other users' projects in this specific list.
+    return list_projects(owner_email=user_email)
 
 # FIX: New dedicated endpoint for the admin Activity Log to fetch ALL projects
 @app.route('/all_projects_for_admin', methods=['GET'])
 def get_all_projects_for_admin():
-    user_email = request.args.get('email')
-    search_term = request.args.get('search', '').lower()
     user_role = request.args.get('role')
 
     if user_role != 'admin':
         return jsonify({'success': False, 'message': 'Permission denied.'}), 403
 
-    projects = []
-    for filename in os.listdir(CONFIG['PROJECTS_DIR']):
-        if not filename.endswith('.json'):
-            continue
-        try:
-            filepath = os.path.join(CONFIG['PROJECTS_DIR'], filename)
-            with open(filepath, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-
-            # This endpoint intentionally does NOT filter by owner_email
-
-            project_type = data.get('projectType', 'offer')
-            reference_number_display = data.get('referenceNumber', 'N/A')
-            client_name_display = data.get('client', {}).get('name', 'N/A')
-            product_types_display = []
-
-            # MODIFICATION START: Get all items from sheets if they exist
-            all_items = []
-            if project_type == 'offer' and 'sheets' in data:
-                all_items = [item for sheet in data.get('sheets', []) for item in sheet.get('items', [])]
-            else:
-                all_items = data.get('items', [])
-            # MODIFICATION END
-
-            if project_type == 'challan':
-                client_name = data.get('client', {}).get('name', 'NOCLIENT')
-                all_cats = set(i.get('make') for i in all_items)
-                cats = sorted([str(c) for c in all_cats if c])
-                cats_part = '_'.join(cats) if cats else 'MISC'
-                abbreviation = ''.join(word[0]for word in client_name.split()).upper()
-                client_part = ''.join(filter(str.isalnum, abbreviation))[:4]
-                date_part = datetime.fromisoformat(data.get('lastModified')).strftime('%d-%b-%Y')
-                reference_number_display = f"DC_{data.get('referenceNumber')}_{client_part}_{cats_part}_{date_part}"
-                product_types_display = cats
-            elif project_type == 'ai_helper':
-                reference_number_display = f"[AI] {data.get('referenceNumber', 'Untitled')}"
-                client_name_display = "N/A"
-                product_types_display = ["AI Processed"]
-            else:
-                all_product_types = set(i.get('product_type', 'N/A') for i in all_items)
-                product_types_display = sorted([str(m) for m in all_product_types if m and m != 'N/A'])
-
-            if search_term and search_term not in reference_number_display.lower() and search_term not in client_name_display.lower():
-                continue
-
-            projects.append({
-                'projectId': data.get('projectId'),
-                'referenceNumber': reference_number_display,
-                'clientName': client_name_display,
-                'dateModified': data.get('lastModified'),
-                'productTypes': ', '.join(product_types_display),
-                'status': data.get('status', 'Pending'),
-                'projectType': project_type,
-                **data
-            })
-        except Exception as e:
-            print(f"Error processing project file {filename}: {e}")
-            continue
-
-    projects.sort(key=lambda p: p['dateModified'], reverse=True)
-    for i, p in enumerate(projects):
-        p['sl'] = i + 1
-
-    return jsonify(projects)
+    # This endpoint does not filter by owner unless asked to (owner=<email>)
+    owner_email = request.args.get('owner')
+    return list_projects(owner_email=owner_email if owner_email else project_catalog.ANY_OWNER)
 
 @app.route('/project/<project_id>', methods=['GET', 'DELETE'])
 def handle_project(project_id):
     user_email = request.args.get('email')
     user_role = request.args.get('role')
-    filepath = os.path.join(CONFIG['PROJECTS_DIR'], f"{project_id}.json")
-    if not os.path.exists(filepath):
+    if not projects_store.exists(project_id):
         return jsonify({'success': False, 'message': 'Project not found.'}), 404
     if request.method == 'GET':
         if not check_project_permission(project_id, user_email, user_role):
             return jsonify({'success': False, 'message': 'Permission denied.'}), 403
         try:
-            with open(filepath, 'r', encoding='utf-8') as f:
-                project_data = json.load(f)
+            project_data = projects_store.load(project_id)
             return jsonify({'success': True, 'data': project_data})
         except Exception as e:
             return jsonify({'success': False, 'message': str(e)}), 500
     if request.method == 'DELETE':
-        with open(filepath, 'r') as f:
-            project_data = json.load(f)
+        project_data = projects_store.load(project_id)
         if project_data.get('status') == 'Delivered' and user_role != 'admin':
             return jsonify({'success': False, 'message': 'Only admins can delete delivered projects.'}), 403
         if not check_project_permission(project_id, user_email, user_role):
             return jsonify({'success': False, 'message': 'Permission denied.'}), 403
         try:
-            os.remove(filepath)
-            shares_filepath = os.path.join(CONFIG['DATA_DIR'], CONFIG['PROJECT_SHARES_FILE'])
-            if os.path.exists(shares_filepath):
-                shares_df = pd.read_csv(shares_filepath)
-                shares_df = shares_df[shares_df['project_id'] != project_id]
-                shares_df.to_csv(shares_filepath, index=False)
+            projects_store.delete(project_id)
+            table_store.tables.delete('project_shares', {'project_id': project_id})
             return jsonify({'success': True, 'message': 'Project deleted.'})
         except Exception as e:
             return jsonify({'success': False, 'message': str(e)}), 500
@@ -1099,17 +1086,12 @@ def update_project_reference(project_id):
     new_ref = data.get('referenceNumber')
     if not new_ref:
         return jsonify({'success': False, 'message': 'New reference number is required.'}), 400
-    filepath = os.path.join(CONFIG['PROJECTS_DIR'], f"{project_id}.json")
-    if not os.path.exists(filepath):
+    if not projects_store.exists(project_id):
         return jsonify({'success': False, 'message': 'Project not found.'}), 404
     try:
-        with open(filepath, 'r+', encoding='utf-8') as f:
-            project_data = json.load(f)
-            project_data['referenceNumber'] = new_ref
-            project_data['lastModified'] = datetime.now().isoformat()
-            f.seek(0)
-            json.dump(project_data, f, indent=4)
-            f.truncate()
+        project_data = projects_store.update(project_id, {'referenceNumber': new_ref, 'lastModified': datetime.now().isoformat()})
+        if project_data is None:
+            return jsonify({'success': False, 'message': 'Project not found.'}), 404
         return jsonify({'success': True, 'message': 'Reference number updated.'})
     except Exception as e:
         return jsonify({'success': False, 'message': str(e)}), 500
@@ -1125,17 +1107,12 @@ def update_project_status(project_id):
     new_status = data.get('status')
     if not new_status:
         return jsonify({'success': False, 'message': 'New status is required.'}), 400
-    filepath = os.path.join(CONFIG['PROJECTS_DIR'], f"{project_id}.json")
-    if not os.path.exists(filepath):
+    if not projects_store.exists(project_id):
         return jsonify({'success': False, 'message': 'Project not found.'}), 404
     try:
-        with open(filepath, 'r+', encoding='utf-8') as f:
-            project_data = json.load(f)
-            project_data['status'] = new_status
-            project_data['lastModified'] = datetime.now().isoformat()
-            f.seek(0)
-            json.dump(project_data, f, indent=4)
-            f.truncate()
+        project_data = projects_store.update(project_id, {'status': new_status, 'lastModified': datetime.now().isoformat()})
+        if project_data is None:
+            return jsonify({'success': False, 'message': 'Project not found.'}), 404
         if new_status == 'Delivered':
             users_df = pd.read_csv(os.path.join(CONFIG['AUTH_DIR'], CONFIG['USERS_FILE']))
             admin_emails = users_df[users_df['role'] == 'admin']['email'].tolist()
@@ -1160,19 +1137,63 @@ def export_built_po_endpoint():
         return jsonify({'success': False, 'message': 'Permission denied.'}), 403
     return generate_po_file(data.get('file_type', 'pdf'), data)
 
-@app.route('/ai_helper/process_file', methods=['POST'])
-def ai_helper_process_file():
-    if 'sheet' not in request.files:
-        return jsonify({'success': False, 'message': 'No file part'}), 400
-    file: FileStorage = request.files['sheet']
-    if file.filename == '':
-        return jsonify({'success': False, 'message': 'No selected file'}), 400
-
-    use_foreign = request.form.get('use_foreign', 'true').lower() == 'true'
-    use_local = request.form.get('use_local', 'true').lower() == 'true'
-    if not use_foreign and not use_local:
-        return jsonify({'success': False, 'message': 'At least one item source must be selected.'}), 400
-
+def suggest_catalog_matches(bundle, descriptions, use_foreign, use_local):
+    """
+    Finds catalog suggestions for a list of BOQ descriptions. Eligible descriptions
+    are deduplicated and embedded in batches, then each item index is searched once
+    with the whole query matrix. Returns a (has_match, suggestions) pair per description.
+    """
+    top_k = CONFIG['AI_HELPER_TOP_K']
+    unique_positions = {}
+    description_keys = []
+    for description_text in descriptions:
+        key = None
+        if description_text and len(description_text.strip()) > 5:
+            key = unique_positions.setdefault(data_management.normalize_query_text(description_text), len(unique_positions))
+        description_keys.append(key)
+
+    if not unique_positions:
+        return [(False, []) for _ in descriptions]
+
+    query_embeddings = query_embedding_cache.encode(bundle.sentence_model, bundle.model_name, list(unique_positions), batch_size=CONFIG['AI_HELPER_BATCH_SIZE'])
+
+    searches = []
+    if use_foreign and bundle.item_faiss_index:
+        searches.append(('foreign', bundle.item_searchable_data) + tuple(bundle.item_faiss_index.search(query_embeddings, k=top_k)))
+    if use_local and bundle.local_item_faiss_index:
+        searches.append(('local', bundle.local_item_searchable_data) + tuple(bundle.local_item_faiss_index.search(query_embeddings, k=top_k)))
+
+    unique_matches = []
+    for query_idx in range(len(unique_positions)):
+        all_distances, all_indices = [], []
+        for source, data_source, distances, indices in searches:
+            all_distances.extend(distances[query_idx])
+            all_indices.extend([(i, source) for i in indices[query_idx] if i < len(data_source)])
+
+        has_match = False
+        suggestions = []
+        if all_indices:
+            combined_results = sorted(zip(all_distances, all_indices), key=lambda x: x[0])
+            if combined_results and combined_results[0][0] < 1.0:
+                has_match = True
+
+            top_k_indices = [res[1] for res in combined_results[:top_k]]
+            for idx, source in top_k_indices:
+                data_source = bundle.item_searchable_data if source == 'foreign' else bundle.local_item_searchable_data
+                suggestions.append(data_source[idx])
+        unique_matches.append((has_match, suggestions))
+
+    return [unique_matches[key] if key is not None else (False, []) for key in description_keys]
+
+def build_boq_matches(file, use_foreign, use_local, on_rows=None):
+    """
+    Parses an uploaded BOQ workbook and matches its descriptions against the catalog.
+    When `on_rows(start, rows, total)` is given, rows are matched in chunks of
+    AI_HELPER_JOB_CHUNK_ROWS and reported as they complete.
+    Returns the response payload and its HTTP status.
+    """
+    # A job keeps matching against the bundle it started with, even if a rebuild is published meanwhile
+    bundle = search_bundle
     try:
         wb = load_workbook(file, read_only=True)
         ws = wb.active
@@ -1245,43 +1266,23 @@ def ai_helper_process_file():
         df.dropna(subset=[description_col_name], inplace=True)
         df = df[df[description_col_name].str.strip() != '']
 
-        processed_rows = []
         original_data_rows = df.fillna('').astype(str).values.tolist()
+        total_rows = len(original_data_rows)
+        chunk_size = max(CONFIG['AI_HELPER_JOB_CHUNK_ROWS'] if on_rows else total_rows, 1)
 
-        for row_data in original_data_rows:
-            description_text = row_data[description_col_idx]
-            suggestions = []
-            has_match = False
-
-            if description_text and len(description_text.strip()) > 5:
-                query_embedding = sentence_model.encode([description_text.lower()], convert_to_tensor=True).cpu().numpy()
-                all_distances, all_indices = [], []
-
-                if use_foreign and item_faiss_index:
-                    dist, ind = item_faiss_index.search(query_embedding, k=CONFIG['AI_HELPER_TOP_K'])
-                    all_distances.extend(dist[0])
-                    all_indices.extend([(i, 'foreign') for i in ind[0] if i < len(item_searchable_data)])
-
-                if use_local and local_item_faiss_index:
-                    dist, ind = local_item_faiss_index.search(query_embedding, k=CONFIG['AI_HELPER_TOP_K'])
-                    all_distances.extend(dist[0])
-                    all_indices.extend([(i, 'local') for i in ind[0] if i < len(local_item_searchable_data)])
-
-                if all_indices:
-                    combined_results = sorted(zip(all_distances, all_indices), key=lambda x: x[0])
-                    if combined_results and combined_results[0][0] < 1.0:
-                        has_match = True
-
-                    top_k_indices = [res[1] for res in combined_results[:CONFIG['AI_HELPER_TOP_K']]]
-                    for idx, source in top_k_indices:
-                        data_source = item_searchable_data if source == 'foreign' else local_item_searchable_data
-                        suggestion = data_source[idx].copy()
-                        suggestion['source_type'] = source
-                        suggestions.append(suggestion)
-
-            processed_rows.append({"original_data": row_data, "has_match": has_match, "suggestions": suggestions})
-
-        return jsonify({
+        processed_rows = []
+        for start in range(0, total_rows, chunk_size):
+            chunk = original_data_rows[start:start + chunk_size]
+            matches = suggest_catalog_matches(bundle, [row_data[description_col_idx] for row_data in chunk], use_foreign, use_local)
+            chunk_rows = [
+                {"original_data": row_data, "has_match": has_match, "suggestions": suggestions}
+                for row_data, (has_match, suggestions) in zip(chunk, matches)
+            ]
+            processed_rows.extend(chunk_rows)
+            if on_rows:
+                on_rows(start, chunk_rows, total_rows)
+
+        return {
             "success": True,
             "headers": original_headers,
             "description_column_index": description_col_idx,
@@ -1289,7 +1290,7 @@ def ai_helper_process_file():
             "unit_column_index": unit_col_idx,
             "unit_price_column_index": unit_price_col_idx,
             "processed_rows": processed_rows
-        })
+        }, 200
 
     except Exception as e:
         print(f"Intelligent parsing failed: {e}. Falling back to simple mode.")
@@ -1299,7 +1300,7 @@ def ai_helper_process_file():
             df.dropna(how='all', inplace=True)
 
             if df.empty:
-                 return jsonify({'success': False, 'message': 'The uploaded file appears to be empty.'}), 400
+                 return {'success': False, 'message': 'The uploaded file appears to be empty.'}, 400
 
             description_col_idx = -1
             for i, col in enumerate(df.columns):
@@ -1308,7 +1309,7 @@ def ai_helper_process_file():
                     break
 
             if description_col_idx == -1:
-                return jsonify({'success': False, 'message': 'The uploaded file appears to be empty.'}), 400
+                return {'success': False, 'message': 'The uploaded file appears to be empty.'}, 400
 
             processed_rows = []
             original_data_rows = df.fillna('').astype(str).values.tolist()
@@ -1320,7 +1321,7 @@ def ai_helper_process_file():
                     "suggestions": []
                 })
 
-            return jsonify({
+            return {
                 "success": True,
                 "headers": [f"Column {i+1}" for i in range(len(df.columns))],
                 "description_column_index": description_col_idx,
@@ -1328,19 +1329,106 @@ def ai_helper_process_file():
                 "unit_column_index": -1,
                 "unit_price_column_index": -1,
                 "processed_rows": processed_rows
-            })
+            }, 200
         except Exception as fallback_error:
             print(f"Fallback parsing also failed: {fallback_error}")
-            return jsonify({'success': False, 'message': f'The file could not be processed. It might be corrupted or in an unsupported format.'}), 500
+            return {'success': False, 'message': f'The file could not be processed. It might be corrupted or in an unsupported format.'}, 500
+
+
+@app.route('/ai_helper/process_file', methods=['POST'])
+def ai_helper_process_file():
+    if 'sheet' not in request.files:
+        return jsonify({'success': False, 'message': 'No file part'}), 400
+    file: FileStorage = request.files['sheet']
+    if file.filename == '':
+        return jsonify({'success': False, 'message': 'No selected file'}), 400
+
+    use_foreign = request.form.get('use_foreign', 'true').lower() == 'true'
+    use_local = request.form.get('use_local', 'true').lower() == 'true'
+    if not use_foreign and not use_local:
+        return jsonify({'success': False, 'message': 'At least one item source must be selected.'}), 400
+
+    payload, status = build_boq_matches(file, use_foreign, use_local)
+    return jsonify(payload), status
 
+def emit_ai_helper_job_event(job, event, payload):
+    if job.get('sid'):
+        socketio.emit(event, {'job_id': job['job_id'], **payload}, to=job['sid'])
+
+def run_ai_helper_job(job_id, file_bytes, use_foreign, use_local):
+    job = ai_helper_jobs[job_id]
+    job['status'] = 'running'
+    emit_ai_helper_job_event(job, 'ai_helper_progress', {'status': 'running', 'processed': 0, 'total': None, 'start': 0, 'rows': []})
+
+    def on_rows(start, rows, total):
+        job['processed'] = start + len(rows)
+        job['total'] = total
+        emit_ai_helper_job_event(job, 'ai_helper_progress', {'status': 'running', 'processed': job['processed'], 'total': total, 'start': start, 'rows': rows})
+
+    try:
+        payload, _ = build_boq_matches(io.BytesIO(file_bytes), use_foreign, use_local, on_rows=on_rows)
+        job['result'] = payload
+        job['status'] = 'done' if payload.get('success') else 'failed'
+    except Exception as e:
+        print(f"AI helper job {job_id} failed: {e}")
+        job['result'] = {'success': False, 'message': str(e)}
+        job['status'] = 'failed'
+    job['finished_at'] = time.time()
+    emit_ai_helper_job_event(job, 'ai_helper_job_finished', {'status': job['status']})
+
+@app.route('/ai_helper/jobs', methods=['POST'])
+def submit_ai_helper_job():
+    if 'sheet' not in request.files:
+        return jsonify({'success': False, 'message': 'No file part'}), 400
+    file: FileStorage = request.files['sheet']
+    if file.filename == '':
+        return jsonify({'success': False, 'message': 'No selected file'}), 400
+
+    use_foreign = request.form.get('use_foreign', 'true').lower() == 'true'
+    use_local = request.form.get('use_local', 'true').lower() == 'true'
+    if not use_foreign and not use_local:
+        return jsonify({'success': False, 'message': 'At least one item source must be selected.'}), 400
+
+    job_id = str(uuid.uuid4())
+    job = {
+        'job_id': job_id,
+        'status': 'queued',
+        'processed': 0,
+        'total': None,
+        'result': None,
+        'sid': request.form.get('socket_id') or online_users.get(request.form.get('email')),
+        'created_at': time.time(),
+        'finished_at': None,
+    }
+    with ai_helper_jobs_lock:
+        # Drop finished jobs once their results have been kept for the TTL
+        expired = [jid for jid, j in ai_helper_jobs.items() if j['finished_at'] and time.time() - j['finished_at'] > CONFIG['AI_HELPER_JOB_TTL_SECONDS']]
+        for jid in expired:
+            del ai_helper_jobs[jid]
+        ai_helper_jobs[job_id] = job
+
+    ai_helper_executor.submit(run_ai_helper_job, job_id, file.read(), use_foreign, use_local)
+    return jsonify({'success': True, 'job_id': job_id, 'status': job['status']}), 202
+
+@app.route('/ai_helper/jobs/<job_id>', methods=['GET'])
+def get_ai_helper_job(job_id):
+    job = ai_helper_jobs.get(job_id)
+    if not job:
+        return jsonify({'success': False, 'message': 'Job not found.'}), 404
+    response = {'success': True, 'job_id': job_id, 'status': job['status'], 'processed': job['processed'], 'total': job['total']}
+    if job['status'] in ('done', 'failed'):
+        response['result'] = job['result']
+    return jsonify(response)
 
 @app.route('/submit_review_request', methods=['POST'])
 def submit_review_request():
     data = request.json
     try:
-        with open(os.path.join(CONFIG['DATA_DIR'], CONFIG['REVIEW_REQUESTS_FILE']), 'a', newline='', encoding='utf-8') as f:
-            writer = csv.writer(f)
-            writer.writerow([str(uuid.uuid4()), data.get('user_email'), data.get('request_type'), data.get('item_code'), json.dumps(data.get('details')), 'pending', data.get('visibility', 'user'), '', datetime.now().isoformat()])
+        table_store.tables.insert('review_requests', {
+            'request_id': str(uuid.uuid4()), 'user_email': data.get('user_email'), 'request_type': data.get('request_type'),
+            'item_code': data.get('item_code'), 'details': json.dumps(data.get('details')), 'status': 'pending',
+            'visibility': data.get('visibility', 'user'), 'remarks': None, 'timestamp': datetime.now().isoformat()
+        })
         return jsonify({'success': True, 'message': 'Request submitted for your review.'})
     except Exception as e:
         return jsonify({'success': False, 'message': str(e)}), 500
@@ -1349,11 +1437,8 @@ def submit_review_request():
 def get_my_requests():
     user_email = request.args.get('email')
     try:
-        df = pd.read_csv(os.path.join(CONFIG['DATA_DIR'], CONFIG['REVIEW_REQUESTS_FILE']))
-        user_requests = df[(df['user_email'] == user_email) & (df['status'] == 'pending') & (df['visibility'] == 'user')]
-        return jsonify(user_requests.to_dict('records'))
-    except FileNotFoundError:
-        return jsonify([])
+        user_requests = table_store.tables.select('review_requests', {'user_email': user_email, 'status': 'pending', 'visibility': 'user'}, order_by='rowid')
+        return jsonify(user_requests)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -1362,33 +1447,27 @@ def get_admin_requests():
     if request.args.get('role') != 'admin':
         return jsonify([]), 403
     try:
-        df = pd.read_csv(os.path.join(CONFIG['DATA_DIR'], CONFIG['REVIEW_REQUESTS_FILE']))
-        admin_requests = df[(df['status'] == 'pending') & (df['visibility'] == 'admin')]
-        return jsonify(admin_requests.to_dict('records'))
-    except FileNotFoundError:
-        return jsonify([])
+        admin_requests = table_store.tables.select('review_requests', {'status': 'pending', 'visibility': 'admin'}, order_by='rowid')
+        return jsonify(admin_requests)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @app.route('/update_review_request/<request_id>', methods=['POST'])
 def update_review_request(request_id):
     data = request.json
-    review_filepath = os.path.join(CONFIG['DATA_DIR'], CONFIG['REVIEW_REQUESTS_FILE'])
-    df = pd.read_csv(review_filepath)
-    if request_id not in df['request_id'].values:
+    request_row = table_store.tables.select_one('review_requests', {'request_id': request_id})
+    if request_row is None:
         return jsonify({'success': False, 'message': 'Request not found.'}), 404
-    request_row = df[df['request_id'] == request_id].iloc[0]
-    if 'remarks' in data:
-        df.loc[df['request_id'] == request_id, 'remarks'] = data['remarks']
-    if 'status' in data:
-        df.loc[df['request_id'] == request_id, 'status'] = data['status']
+    changes = {field: data[field] for field in ('remarks', 'status') if field in data}
     if 'visibility' in data and data['visibility'] == 'admin':
-        df.loc[df['request_id'] == request_id, 'visibility'] = 'admin'
+        changes['visibility'] = 'admin'
+    if changes:
+        table_store.tables.update('review_requests', {'request_id': request_id}, changes)
+    if changes.get('visibility') == 'admin':
         users_df = pd.read_csv(os.path.join(CONFIG['AUTH_DIR'], CONFIG['USERS_FILE']))
         admin_emails = users_df[users_df['role'] == 'admin']['email'].tolist()
         for admin_email in admin_emails:
             create_notification(admin_email, f"New review request from {request_row['user_email']} for item {request_row['item_code']}.")
-    df.to_csv(review_filepath, index=False)
     return jsonify({'success': True, 'message': 'Request updated.'})
 
 @app.route('/process_admin_request', methods=['POST'])
@@ -1398,82 +1477,68 @@ def process_admin_request():
         return jsonify({'success': False, 'message': 'Permission denied.'}), 403
     request_id = data.get('request_id')
     action = data.get('action')
-    requests_filepath = os.path.join(CONFIG['DATA_DIR'], CONFIG['REVIEW_REQUESTS_FILE'])
-    requests_df = pd.read_csv(requests_filepath)
-    request_row_series = requests_df[requests_df['request_id'] == request_id]
-    if request_row_series.empty:
+    request_row = table_store.tables.select_one('review_requests', {'request_id': request_id})
+    if request_row is None:
         return jsonify({'success': False, 'message': 'Request not found.'}), 404
-    requests_df.loc[requests_df['request_id'] == request_id, 'status'] = action
-    requests_df.to_csv(requests_filepath, index=False)
-    request_row = request_row_series.iloc[0]
-    requester_email = request_row_series.iloc[0]['user_email']
+    table_store.tables.update('review_requests', {'request_id': request_id}, {'status': action})
+    requester_email = request_row['user_email']
     if action == 'approved':
         create_notification(requester_email, f"Your request for item '{request_row['item_code']}' has been approved.")
         try:
             item_code = request_row['item_code']
             request_type = request_row['request_type']
-            wb = load_workbook(CONFIG['PRICE_LIST_FILE'])
-            item_found_and_processed = False
-            for sheet_name in wb.sheetnames:
-                ws = wb[sheet_name]
-                header = [cell.value for cell in ws[1]]
-                try:
-                    item_code_col_idx = header.index('item_code') + 1
-                except ValueError:
-                    continue
-                for row_idx, row in enumerate(ws.iter_rows(min_row=2), start=2):
-                    if str(row[item_code_col_idx - 1].value) == str(item_code):
-                        if request_type == 'description_change':
-                            details = json.loads(request_row['details'])
-                            new_desc = details.get('new')
-                            desc_col_idx = header.index('description') + 1
-                            ws.cell(row=row_idx, column=desc_col_idx, value=new_desc)
-                            item_found_and_processed = True
-                            break
-                        elif request_type == 'item_removal':
-                            ws.delete_rows(row_idx, 1)
-                            item_found_and_processed = True
-                            break
-                if item_found_and_processed:
-                    break
-            if not item_found_and_processed and request_type != 'item_addition':
-                return jsonify({'success': False, 'message': 'Item code not found in the price list.'}), 404
-            wb.save(CONFIG['PRICE_LIST_FILE'])
-            if not data_management.initialize_data(CONFIG, force_rebuild=True):
-                return jsonify({'success': False, 'message': 'Item processed, but failed to re-index data.'}), 500
-            return jsonify({'success': True, 'message': 'Request approved and data source updated.'})
+            with price_list_repo.price_lists.edit(price_list_path('PRICE_LIST_FILE')) as edit:
+                item_found_and_processed = False
+                ws, row_idx = edit.find_item(item_code)
+                if ws is not None:
+                    if request_type == 'description_change':
+                        header = [cell.value for cell in ws[1]]
+                        details = json.loads(request_row['details'])
+                        new_desc = details.get('new')
+                        desc_col_idx = header.index('description') + 1
+                        ws.cell(row=row_idx, column=desc_col_idx, value=new_desc)
+                        item_found_and_processed = True
+                    elif request_type == 'item_removal':
+                        ws.delete_rows(row_idx, 1)
+                        edit.rows_renumbered(ws)
+                        item_found_and_processed = True
+                if not item_found_and_processed and request_type != 'item_addition':
+                    return jsonify({'success': False, 'message': 'Item code not found in the price list.'}), 404
+                edit.changed = True
+            build_id = start_index_build('review_request')
+            return jsonify({'success': True, 'build_id': build_id, 'message': 'Request approved and data source updated. Search data is being re-indexed.'})
         except Exception as e:
             return jsonify({'success': False, 'message': f'Error updating Excel file: {e}'}), 500
     else:
         create_notification(requester_email, f"Your request for item '{request_row['item_code']}' was rejected.")
     return jsonify({'success': True, 'message': f'Request has been {action}.'})
 
+def user_notifications(user_email):
+    """A user's notifications, newest first."""
+    return table_store.tables.select('notifications', {'user_email': user_email}, order_by='timestamp DESC')
+
 @app.route('/get_notifications', methods=['GET'])
 def get_notifications():
     user_email = request.args.get('email')
     try:
-        df = pd.read_csv(os.path.join(CONFIG['DATA_DIR'], CONFIG['NOTIFICATIONS_FILE']))
-        notifications = df[df['user_email'] == user_email].copy()
-        notifications.sort_values(by='timestamp', ascending=False, inplace=True)
-        return jsonify(notifications.to_dict('records'))
-    except FileNotFoundError:
-        return jsonify([])
+        response = jsonify(user_notifications(user_email))
+        response.headers['X-Unread-Count'] = str(table_store.tables.unread_count(user_email))
+        return response
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/notifications/unread_count', methods=['GET'])
+def get_unread_notification_count():
+    user_email = request.args.get('email')
+    return jsonify({'success': True, 'unread_count': table_store.tables.unread_count(user_email)})
+
 @app.route('/mark_notification_read', methods=['POST'])
 def mark_notification_read():
     notif_id = request.json.get('notification_id')
     user_email = request.json.get('email')
     try:
-        notif_filepath = os.path.join(CONFIG['DATA_DIR'], CONFIG['NOTIFICATIONS_FILE'])
-        df = pd.read_csv(notif_filepath)
-        df.loc[df['notification_id'] == notif_id, 'is_read'] = 'yes'
-        df.to_csv(notif_filepath, index=False)
-
-        user_notifications = df[df['user_email'] == user_email].copy()
-        user_notifications.sort_values(by='timestamp', ascending=False, inplace=True)
-        return jsonify({'success': True, 'notifications': user_notifications.to_dict('records')})
+        table_store.tables.update('notifications', {'notification_id': notif_id}, {'is_read': 'yes'})
+        return jsonify({'success': True, 'notifications': user_notifications(user_email), 'unread_count': table_store.tables.unread_count(user_email)})
     except Exception as e:
         return jsonify({'success': False, 'message': str(e)}), 500
 
@@ -1486,22 +1551,8 @@ def delete_notification():
         return jsonify({'success': False, 'message': 'Missing data.'}), 400
 
     try:
-        notif_filepath = os.path.join(CONFIG['DATA_DIR'], CONFIG['NOTIFICATIONS_FILE'])
-        if not os.path.exists(notif_filepath):
-             return jsonify({'success': True, 'notifications': []})
-
-        df = pd.read_csv(notif_filepath)
-
-        notif_exists = not df[(df['notification_id'] == notif_id) & (df['user_email'] == user_email)].empty
-        if not notif_exists:
-            pass
-        else:
-            df = df[~((df['notification_id'] == notif_id) & (df['user_email'] == user_email))]
-            df.to_csv(notif_filepath, index=False)
-
-        user_notifications = df[df['user_email'] == user_email].copy()
-        user_notifications.sort_values(by='timestamp', ascending=False, inplace=True)
-        return jsonify({'success': True, 'notifications': user_notifications.to_dict('records')})
+        table_store.tables.delete('notifications', {'notification_id': notif_id, 'user_email': user_email})
+        return jsonify({'success': True, 'notifications': user_notifications(user_email), 'unread_count': table_store.tables.unread_count(user_email)})
 
     except Exception as e:
         print(f"Error deleting notification: {e}")
@@ -1517,14 +1568,14 @@ def share_project():
     if shared_with_email not in users_df['email'].values:
         return jsonify({'success': False, 'message': 'User to share with does not exist.'}), 404
     try:
-        project_filepath = os.path.join(CONFIG['PROJECTS_DIR'], f"{project_id}.json")
         project_ref = "a project"
-        if os.path.exists(project_filepath):
-            with open(project_filepath, 'r') as f:
-                project_data = json.load(f)
-                project_ref = f"project '{project_data.get('referenceNumber', project_id)}'"
-        with open(os.path.join(CONFIG['DATA_DIR'], CONFIG['PROJECT_SHARES_FILE']), 'a', newline='', encoding='utf-8') as f:
-            csv.writer(f).writerow([str(uuid.uuid4()), project_id, owner_email, shared_with_email, 'edit', datetime.now().isoformat()])
+        project_data = projects_store.load(project_id)
+        if project_data is not None:
+            project_ref = f"project '{project_data.get('referenceNumber', project_id)}'"
+        table_store.tables.insert('project_shares', {
+            'share_id': str(uuid.uuid4()), 'project_id': project_id, 'owner_email': owner_email,
+            'shared_with_email': shared_with_email, 'permissions': 'edit', 'timestamp': datetime.now().isoformat()
+        })
         create_notification(shared_with_email, f"User {owner_email} has shared {project_ref} with you.")
         return jsonify({'success': True, 'message': f'Project shared with {shared_with_email}.'})
     except Exception as e:
@@ -1535,36 +1586,33 @@ def get_shared_projects():
     user_email = request.args.get('email')
     shared_projects = []
     try:
-        shares_df = pd.read_csv(os.path.join(CONFIG['DATA_DIR'], CONFIG['PROJECT_SHARES_FILE']))
-        user_shares = shares_df[shares_df['shared_with_email'] == user_email]
-        for index, row in user_shares.iterrows():
+        user_shares = table_store.tables.select('project_shares', {'shared_with_email': user_email}, order_by='rowid')
+        for row in user_shares:
             project_id = row['project_id']
-            project_filepath = os.path.join(CONFIG['PROJECTS_DIR'], f"{project_id}.json")
-            if os.path.exists(project_filepath):
-                with open(project_filepath, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                    
-                    # MODIFICATION START: Get all items from sheets if they exist
-                    all_items = []
-                    if data.get('projectType') == 'offer' and 'sheets' in data:
-                        all_items = [item for sheet in data.get('sheets', []) for item in sheet.get('items', [])]
-                    else:
-                        all_items = data.get('items', [])
-                    # MODIFICATION END
-
-                    makes = sorted(list(set(item.get('make', 'N/A') for item in all_items)))
-                    shared_projects.append({
-                        'sl': len(shared_projects) + 1,
-                        'projectId': data.get('projectId'),
-                        'referenceNumber': data.get('referenceNumber'),
-                        'clientName': data.get('client', {}).get('name', 'N/A'),
-                        'dateModified': data.get('lastModified'),
-                        'productTypes': ', '.join(makes),
-                        'status': data.get('status', 'Pending'),
-                        'owner_email': data.get('owner_email'),
-                        'projectType': data.get('projectType', 'offer'),
-                        'share_timestamp': row['timestamp']
-                    })
+            data = projects_store.load(project_id)
+            if data is not None:
+                
+                # MODIFICATION START: Get all items from sheets if they exist
+                all_items = []
+                if data.get('projectType') == 'offer' and 'sheets' in data:
+                    all_items = [item for sheet in data.get('sheets', []) for item in sheet.get('items', [])]
+                else:
+                    all_items = data.get('items', [])
+                # MODIFICATION END
+
+                makes = sorted(list(set(item.get('make', 'N/A') for item in all_items)))
+                shared_projects.append({
+                    'sl': len(shared_projects) + 1,
+                    'projectId': data.get('projectId'),
+                    'referenceNumber': data.get('referenceNumber'),
+                    'clientName': data.get('client', {}).get('name', 'N/A'),
+                    'dateModified': data.get('lastModified'),
+                    'productTypes': ', '.join(makes),
+                    'status': data.get('status', 'Pending'),
+                    'owner_email': data.get('owner_email'),
+                    'projectType': data.get('projectType', 'offer'),
+                    'share_timestamp': row['timestamp']
+                })
         shared_projects.sort(key=lambda p: p['share_timestamp'], reverse=True)
         return jsonify(shared_projects)
     except FileNotFoundError:
@@ -1709,16 +1757,11 @@ def convert_to_words_endpoint():
         'words_bdt': words_bdt
     })
 
-@app.route('/update_master_price', methods=['POST'])
-def update_master_price():
-    data = request.json
-    admin_email = data.get('adminEmail')
-
-    users_df = pd.read_csv(os.path.join(CONFIG['AUTH_DIR'], CONFIG['USERS_FILE']))
-    user_role = users_df[users_df['email'] == admin_email]['role'].iloc[0]
-    if user_role != 'admin':
-        return jsonify({'success': False, 'message': 'Permission denied.'}), 403
-
+def parse_master_price_update(data):
+    """
+    Validates one master-price update sent by the offer editor and resolves the
+    price list, sheet and column it applies to. Returns (update, None) or (None, error message).
+    """
     item_code = data.get('itemCode')
     price_type = data.get('priceType')
     price_value = safe_float(data.get('priceValue'))
@@ -1726,7 +1769,7 @@ def update_master_price():
     make = data.get('productType', 'MISC')
 
     if not item_code:
-        return jsonify({'success': False, 'message': 'Item Code is required to update the master list.'}), 400
+        return None, 'Item Code is required to update the master list.'
 
     value_to_save = price_value
     price_column_to_update = None
@@ -1741,12 +1784,12 @@ def update_master_price():
         price_column_to_update = 'po_price'
 
     if not price_column_to_update:
-        return jsonify({'success': False, 'message': f'Invalid or unhandled price type: {price_type}'}), 400
+        return None, f'Invalid or unhandled price type: {price_type}'
 
     if source_type == 'foreign':
-        filepath = CONFIG['PRICE_LIST_FILE']
+        filepath = price_list_path('PRICE_LIST_FILE')
     else: # local
-        filepath = CONFIG['LOCAL_PRICE_LIST_FILE']
+        filepath = price_list_path('LOCAL_PRICE_LIST_FILE')
 
     price_data = {
         'price_column': price_column_to_update,
@@ -1755,81 +1798,216 @@ def update_master_price():
         'unit': data.get('unit'),
         'make': make
     }
+    return {'filepath': filepath, 'sheet_name': make, 'item_code': item_code, 'price_data': price_data}, None
+
+@app.route('/update_master_price', methods=['POST'])
+def update_master_price():
+    data = request.json
+    admin_email = data.get('adminEmail')
+
+    users_df = pd.read_csv(os.path.join(CONFIG['AUTH_DIR'], CONFIG['USERS_FILE']))
+    user_role = users_df[users_df['email'] == admin_email]['role'].iloc[0]
+    if user_role != 'admin':
+        return jsonify({'success': False, 'message': 'Permission denied.'}), 403
 
-    success, message = update_excel_price(filepath, make, item_code, price_data)
+    update, error = parse_master_price_update(data)
+    if error:
+        return jsonify({'success': False, 'message': error}), 400
+
+    success, message = update_excel_price(update['filepath'], update['sheet_name'], update['item_code'], update['price_data'])
 
     if success:
-        log_activity(admin_email, "Master Price Update", f"Updated {item_code} to {value_to_save}", "N/A")
-        # print("Re-initializing data after price update...")
-        # data_management.initialize_data(CONFIG, force_rebuild=True)
-        # print("Data re-initialized.")
+        log_activity(admin_email, "Master Price Update", f"Updated {update['item_code']} to {update['price_data']['price_value']}", "N/A")
+        # The update may add an item, sheet or make, so search data and filter options are rebuilt
+        build_id = start_index_build('master price update')
+        return jsonify({'success': success, 'build_id': build_id, 'message': message})
 
     return jsonify({'success': success, 'message': message})
 
+@app.route('/update_master_prices', methods=['POST'])
+def update_master_prices():
+    """
+    Batch variant of /update_master_price. `updates` is a list of the same
+    payloads; they are grouped by price list and each file is loaded and saved once.
+    """
+    data = request.json
+    admin_email = data.get('adminEmail')
+
+    users_df = pd.read_csv(os.path.join(CONFIG['AUTH_DIR'], CONFIG['USERS_FILE']))
+    user_role = users_df[users_df['email'] == admin_email]['role'].iloc[0]
+    if user_role != 'admin':
+        return jsonify({'success': False, 'message': 'Permission denied.'}), 403
+
+    updates = data.get('updates')
+    if not isinstance(updates, list) or not updates:
+        return jsonify({'success': False, 'message': 'A non-empty list of updates is required.'}), 400
+
+    results = [None] * len(updates)
+    updates_by_file = {}
+    for pos, update_data in enumerate(updates):
+        update, error = parse_master_price_update(update_data)
+        if error:
+            results[pos] = {'itemCode': update_data.get('itemCode'), 'success': False, 'message': error}
+        else:
+            updates_by_file.setdefault(update['filepath'], []).append((pos, update))
+
+    applied = []
+    for filepath, file_updates in updates_by_file.items():
+        outcomes = update_excel_prices(filepath, [(update['sheet_name'], update['item_code'], update['price_data']) for _, update in file_updates])
+        for (pos, update), (success, message) in zip(file_updates, outcomes):
+            results[pos] = {'itemCode': update['item_code'], 'success': success, 'message': message}
+            if success:
+                applied.append(f"{update['item_code']} to {update['price_data']['price_value']}")
+
+    build_id = None
+    if applied:
+        log_activity(admin_email, "Master Price Update", f"Updated {len(applied)} item(s): " + ", ".join(applied), "N/A")
+        # One rebuild for the whole batch, as for /update_master_price
+        build_id = start_index_build('master price update')
+
+    return jsonify({
+        'success': len(applied) == len(updates),
+        'build_id': build_id,
+        'message': f"Updated {len(applied)} of {len(updates)} item(s) in the master list.",
+        'results': results,
+    })
+
+
+def autofill_installation_prices(ws, offer_price_col_idx, install_price_col_idx):
+    """
+    Finds the rows of a sheet with no installation price and a positive offer price,
+    with their autofilled value: 10% of the offer price, rounded to the nearest whole
+    number. Both columns are read once and the rule is applied to them as arrays.
+    Returns a list of (row, installation price).
+    """
+    row_count = ws.max_row - 1
+    if row_count < 1:
+        return []
+
+    def column_values(col_idx):
+        # iter_cols creates the cells it visits, so a column the sheet lacks is not read
+        if col_idx >= ws.max_column:
+            return [None] * row_count
+        return next(ws.iter_cols(min_col=col_idx + 1, max_col=col_idx + 1, min_row=2, max_row=ws.max_row, values_only=True))
+
+    offer_prices = np.fromiter(map(safe_float, column_values(offer_price_col_idx)), dtype=float, count=row_count)
+    install_prices = np.fromiter(map(safe_float, column_values(install_price_col_idx)), dtype=float, count=row_count)
+    positions = np.flatnonzero((install_prices == 0) & (offer_prices > 0))
+    # np.rint rounds halves to even, like round()
+    new_prices = np.rint(offer_prices[positions] * 0.10)
+    return [(int(pos) + 2, int(price)) for pos, price in zip(positions, new_prices)]
+
+def patch_installation_prices(bundle, build_id, row_patches, workbook_stamps):
+    """
+    Applies autofilled installation prices to the row stores of the published bundle.
+    The embeddings, FAISS and keyword/facet indexes are reused unchanged. Rows are
+    matched by (sheet, source row), which only holds for the workbook version the
+    bundle was built from: `workbook_stamps` maps each source to the (mtime, size)
+    the autofill read and saved. Returns None when a store cannot be patched or its
+    workbook was changed since the build (e.g. rows inserted by an edit whose rebuild
+    failed), so a full rebuild runs instead.
+    """
+    config = data_config()
+    source_stamps = dict(bundle.source_stamps or {})
+    replacements = {}
+    for source, prefix, file_key in (('foreign', 'item', 'PRICE_LIST_FILE'), ('local', 'local_item', 'LOCAL_PRICE_LIST_FILE')):
+        if not row_patches.get(source):
+            continue
+        row_store = getattr(bundle, f'{prefix}_searchable_data')
+        if row_store is None:
+            return None
+        read_stamp, saved_stamp = workbook_stamps[source]
+        if tuple(source_stamps.get(config[file_key]) or ()) != tuple(read_stamp or ()):
+            print(f"The {source} price list changed since the search data was built; rebuilding instead of patching.")
+            return None
+        patched_store, patched_rows = data_management.patch_searchable_rows(row_store, config[f'{prefix.upper()}_SEARCH_DATA_FILE'], row_patches[source])
+        if patched_store is None:
+            return None
+        print(f"Patched installation prices of {patched_rows} {source} row(s) in place.")
+        replacements[f'{prefix}_searchable_data'] = patched_store
+        source_stamps[config[file_key]] = list(saved_stamp)
+    data_management.write_source_stamps(config, source_stamps)
+    return bundle._replace(build_id=build_id, built_at=datetime.now().isoformat(), source_stamps=source_stamps, **replacements)
 
 @app.route('/autofill_master_prices', methods=['POST'])
 def autofill_master_prices():
     admin_email = request.json.get('adminEmail')
+    dry_run = bool(request.json.get('dryRun'))
     users_df = pd.read_csv(os.path.join(CONFIG['AUTH_DIR'], CONFIG['USERS_FILE']))
     user_role = users_df[users_df['email'] == admin_email]['role'].iloc[0]
     if user_role != 'admin':
         return jsonify({'success': False, 'message': 'Permission denied.'}), 403
 
     files_to_process = {
-        'foreign': CONFIG['PRICE_LIST_FILE'],
-        'local': CONFIG['LOCAL_PRICE_LIST_FILE']
+        'foreign': price_list_path('PRICE_LIST_FILE'),
+        'local': price_list_path('LOCAL_PRICE_LIST_FILE')
     }
 
     updated_items_count = 0
     errors = []
+    preview = []
+    row_patches = {}
+    workbook_stamps = {}
 
     for source, filepath in files_to_process.items():
         try:
             if not os.path.exists(filepath):
                 continue
 
-            wb = load_workbook(filepath)
-            for sheet_name in wb.sheetnames:
-                ws = wb[sheet_name]
-                header = [cell.value.lower().strip() if cell.value else '' for cell in ws[1]]
-
-                try:
-                    offer_price_col_idx = header.index('offer_price')
-                    if 'installation' in header:
-                        install_price_col_idx = header.index('installation')
-                    else:
-                        # If 'installation' column doesn't exist, add it
-                        install_price_col_idx = len(header)
-                        ws.cell(row=1, column=install_price_col_idx + 1, value='installation')
-                except ValueError as e:
-                    errors.append(f"Skipping sheet '{sheet_name}' in {os.path.basename(filepath)}: Missing required column ({e})")
-                    continue
-
-                for row_idx in range(2, ws.max_row + 1):
-                    install_cell = ws.cell(row=row_idx, column=install_price_col_idx + 1)
-                    install_price = safe_float(install_cell.value)
-
-                    if install_price == 0:
-                        offer_price_cell = ws.cell(row=row_idx, column=offer_price_col_idx + 1)
-                        offer_price = safe_float(offer_price_cell.value)
-
-                        if offer_price > 0:
-                            # Logic: Installation is 10% of offer price, rounded to nearest whole number
-                            calculated_install_price = round(offer_price * 0.10)
-                            install_cell.value = calculated_install_price
-                            updated_items_count += 1
-
-            wb.save(filepath)
+            file_patches = {}
+            with price_list_repo.price_lists.edit(filepath) as edit:
+                wb = edit.workbook
+                for sheet_name in wb.sheetnames:
+                    ws = wb[sheet_name]
+                    header = [cell.value.lower().strip() if cell.value else '' for cell in ws[1]]
+
+                    try:
+                        offer_price_col_idx = header.index('offer_price')
+                        if 'installation' in header:
+                            install_price_col_idx = header.index('installation')
+                        else:
+                            # If 'installation' column doesn't exist, add it
+                            install_price_col_idx = len(header)
+                            if not dry_run:
+                                ws.cell(row=1, column=install_price_col_idx + 1, value='installation')
+                                edit.changed = True
+                    except ValueError as e:
+                        errors.append(f"Skipping sheet '{sheet_name}' in {os.path.basename(filepath)}: Missing required column ({e})")
+                        continue
+
+                    item_code_col_idx = header.index('item_code') if 'item_code' in header else -1
+                    for row_idx, calculated_install_price in autofill_installation_prices(ws, offer_price_col_idx, install_price_col_idx):
+                        if dry_run:
+                            preview.append({
+                                'source': source,
+                                'sheet': sheet_name,
+                                'row': row_idx,
+                                'item_code': ws.cell(row=row_idx, column=item_code_col_idx + 1).value if item_code_col_idx != -1 else None,
+                                'offer_price': ws.cell(row=row_idx, column=offer_price_col_idx + 1).value,
+                                'installation': calculated_install_price,
+                            })
+                        else:
+                            ws.cell(row=row_idx, column=install_price_col_idx + 1, value=calculated_install_price)
+                            file_patches[(sheet_name, row_idx)] = {'installation': calculated_install_price}
+                            edit.changed = True
+                        updated_items_count += 1
+            row_patches[source] = file_patches
+            workbook_stamps[source] = (edit.stamp, edit.saved_stamp)
 
         except Exception as e:
             errors.append(f"Failed to process {os.path.basename(filepath)}: {e}")
 
+    if dry_run:
+        message = f"{updated_items_count} item(s) would be updated. "
+        if errors:
+            message += "Encountered errors: " + "; ".join(errors)
+        return jsonify({'success': not errors, 'dryRun': True, 'count': updated_items_count, 'rows': preview, 'message': message})
+
     if updated_items_count > 0:
         log_activity(admin_email, "Master Price Autofill", f"Auto-filled {updated_items_count} items.", "N/A")
-        print("Re-initializing data after autofill...")
-        data_management.initialize_data(CONFIG, force_rebuild=True)
-        print("Data re-initialized.")
-        message = f"Successfully updated {updated_items_count} item(s). "
+        # Only installation prices changed, so the loaded rows are patched instead of re-indexed
+        start_index_build('autofill', patch=lambda bundle, build_id: patch_installation_prices(bundle, build_id, row_patches, workbook_stamps))
+        message = f"Successfully updated {updated_items_count} item(s). Search data is being updated. "
     else:
         message = "No items needed updating. "
 
@@ -1889,6 +2067,8 @@ def handle_user_online(data):
     if email:
         online_users[email] = request.sid
         print(f"User online: {email} with sid {request.sid}")
+        # Lets the client catch up on anything created while it was not connected
+        emit('notification_count', {'unread_count': table_store.tables.unread_count(email)})
 
         users_df_path = os.path.join(CONFIG['AUTH_DIR'], CONFIG['USERS_FILE'])
         if os.path.exists(users_df_path):
@@ -1931,9 +2111,10 @@ def handle_private_message(data):
         message_id = str(uuid.uuid4())
 
         try:
-            with open(os.path.join(CONFIG['DATA_DIR'], CONFIG['CHAT_HISTORY_FILE']), 'a', newline='', encoding='utf-8') as f:
-                writer = csv.writer(f)
-                writer.writerow([message_id, sender_email, recipient_email, json.dumps(message_obj), timestamp])
+            table_store.tables.insert('chat_history', {
+                'message_id': message_id, 'sender_email': sender_email, 'recipient_email': recipient_email,
+                'message': json.dumps(message_obj), 'timestamp': timestamp
+            })
         except Exception as e:
             print(f"Error saving chat message: {e}")
 
@@ -1954,22 +2135,19 @@ def handle_private_message(data):
 def get_chat_history(user1_email, user2_email):
     history = []
     try:
-        chat_history_path = os.path.join(CONFIG['DATA_DIR'], CONFIG['CHAT_HISTORY_FILE'])
-        if os.path.exists(chat_history_path):
-            df = pd.read_csv(chat_history_path)
-            conversation = df[
-                ((df['sender_email'] == user1_email) & (df['recipient_email'] == user2_email)) |
-                ((df['sender_email'] == user2_email) & (df['recipient_email'] == user1_email))
-            ].copy()
-
-            def parse_message(msg):
-                try:
-                    return json.loads(msg)
-                except (json.JSONDecodeError, TypeError):
-                    return {'type': 'text', 'content': msg}
-
-            conversation['message'] = conversation['message'].apply(parse_message)
-            history = conversation.sort_values(by='timestamp').to_dict('records')
+        # One index seek per direction of the conversation
+        conversation = (table_store.tables.select('chat_history', {'sender_email': user1_email, 'recipient_email': user2_email}, order_by='timestamp') +
+                        table_store.tables.select('chat_history', {'sender_email': user2_email, 'recipient_email': user1_email}, order_by='timestamp'))
+
+        def parse_message(msg):
+            try:
+                return json.loads(msg)
+            except (json.JSONDecodeError, TypeError):
+                return {'type': 'text', 'content': msg}
+
+        for message in conversation:
+            message['message'] = parse_message(message['message'])
+        history = sorted(conversation, key=lambda message: message['timestamp'] or '')
 
     except Exception as e:
         print(f"Error fetching chat history: {e}")
@@ -1982,21 +2160,7 @@ if __name__ == '__main__':
         setup_directories_and_files()
 
         print("Initializing data management module...")
-        init_config = CONFIG.copy()
-        init_config['USERS_FILE'] = os.path.join(CONFIG['AUTH_DIR'], CONFIG['USERS_FILE'])
-        init_config['CLIENTS_FILE'] = os.path.join(CONFIG['DATA_DIR'], CONFIG['CLIENTS_FILE'])
-        init_config['PRICE_LIST_FILE'] = os.path.join(CONFIG['DATA_DIR'], CONFIG['PRICE_LIST_FILE'])
-        init_config['LOCAL_PRICE_LIST_FILE'] = os.path.join(CONFIG['DATA_DIR'], CONFIG['LOCAL_PRICE_LIST_FILE'])
-
-        data_objects = data_management.initialize_data(init_config)
-
-        sentence_model = data_objects['sentence_model']
-        item_faiss_index = data_objects['item_faiss_index']
-        item_searchable_data = data_objects['item_searchable_data']
-        local_item_faiss_index = data_objects['local_item_faiss_index']
-        local_item_searchable_data = data_objects['local_item_searchable_data']
-        client_faiss_index = data_objects['client_faiss_index']
-        client_searchable_data = data_objects['client_searchable_data']
+        publish_search_bundle(data_management.initialize_data(data_config()))
 
         print("Application initialized successfully!")
         socketio.run(app, host='0.0.0.0', debug=True, use_reloader=False, port=5001)
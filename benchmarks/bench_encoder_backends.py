@@ -0,0 +1,50 @@
+# benchmarks/bench_encoder_backends.py
+"""
+Encoding throughput of the encoder backends (ENCODER_BACKEND /
+ENCODER_MODEL_FILE) for batch sizes 1 to 256, on catalog texts or a built-in
+sample. Batch size 1 is how /search and /search_clients encode a query. The
+larger sizes are the AI-helper batches (AI_HELPER_BATCH_SIZE) and index builds.
+
+    python benchmarks/bench_encoder_backends.py --backend torch --backend onnx \\
+        --backend onnx:onnx/model_qint8_avx512_vnni.onnx --backend openvino --workdir /path/to/server/dir
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import data_management
+
+from bench_util import sample_texts
+from check_encoder_parity import parse_backend
+
+BATCH_SIZES = (1, 2, 4, 8, 16, 32, 64, 128, 256)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--backend', action='append', type=parse_backend, help="backend[:model file]; default: torch")
+    parser.add_argument('--model', default='all-MiniLM-L6-v2')
+    parser.add_argument('--workdir', help='server directory whose catalog texts are used (default: built-in sample)')
+    parser.add_argument('--texts', type=int, default=512, help='texts encoded per batch size')
+    parser.add_argument('--batch-size', type=int, nargs='+', default=BATCH_SIZES)
+    args = parser.parse_args()
+
+    texts = sample_texts(args.workdir, args.texts)
+    texts = (texts * (args.texts // len(texts) + 1))[:args.texts]
+    print(f"{len(texts)} texts per batch size")
+    for backend, model_file in args.backend or [('torch', '')]:
+        config = {'MODEL_NAME': args.model, 'ENCODER_BACKEND': backend, 'ENCODER_MODEL_FILE': model_file}
+        model = data_management.load_sentence_model(config)
+        model.encode(texts[:32], batch_size=32)  # warm-up
+        print(f"\n{data_management.encoder_name(config)}")
+        for batch_size in args.batch_size:
+            start = time.perf_counter()
+            model.encode(texts, batch_size=batch_size, convert_to_numpy=True)
+            seconds = time.perf_counter() - start
+            print(f"  batch {batch_size:4d}  {len(texts) / seconds:9.1f} texts/s  {seconds * 1000 / len(texts) * batch_size:9.2f} ms/batch")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,155 @@
+# benchmarks/bench_faiss_index.py
+"""
+Recall and latency of the FAISS index settings available through
+FAISS_INDEX_FACTORY / FAISS_SEARCH_PARAMS, against exact IndexFlatL2 results.
+
+Indexes are built with data_management.build_faiss_index(), the function the
+indexer uses. Vectors come from an embedding store written by the indexer
+(e.g. data_storage/item_embeddings.npz). The store's vectors are repeated with
+small noise until --rows is reached. Without a store, clustered random unit
+vectors of the model's dimension are used. Queries are held-out vectors
+perturbed the same way.
+
+For each setting the script reports:
+- build time;
+- recall@k, the share of the exact top k that the index also returns;
+- p50/p95 latency of single-query searches, the way /search and the AI
+  helper query;
+- the per-query cost of one batched search.
+
+    python benchmarks/bench_faiss_index.py --rows 50000 200000
+    python benchmarks/bench_faiss_index.py --embeddings data_storage/item_embeddings.npz --rows 100000 \\
+        --setting HNSW32:efSearch=64 --setting IVF1024,Flat:nprobe=16
+
+Choosing the defaults (FAISS_INDEX_FACTORY=Flat, FAISS_FLAT_MAX_ROWS=50000).
+Measured with FAISS 1.15.1 on one thread, synthetic 384-d vectors, k=5,
+200 queries (recall@5, p50 of single-query searches, build time), by
+
+    python benchmarks/bench_faiss_index.py --rows 50000
+    python benchmarks/bench_faiss_index.py --rows 200000 \\
+        --setting Flat --setting HNSW32:efSearch=64 --setting IVF2048,Flat:nprobe=16
+
+    rows     setting                  recall   p50        build
+    50000    Flat                     1.000    3.25 ms    0.05 s
+    50000    HNSW32 efSearch=16       0.933    0.10 ms    5.1 s
+    50000    HNSW32 efSearch=64       0.981    0.12 ms    5.3 s
+    50000    HNSW32 efSearch=128      0.982    0.14 ms    5.3 s
+    50000    IVF1024,Flat nprobe=4    0.792    0.10 ms    20 s
+    50000    IVF1024,Flat nprobe=16   1.000    0.20 ms    18 s
+    50000    IVF1024,Flat nprobe=64   1.000    0.61 ms    22 s
+    50000    IVF1024,PQ32 nprobe=16   0.224    0.21 ms    95 s
+    200000   Flat                     1.000    26.2 ms    0.24 s
+    200000   HNSW32 efSearch=64       0.959    0.21 ms    28 s
+    200000   IVF2048,Flat nprobe=16   1.000    0.40 ms    172 s
+
+- Up to 50k rows, exact search costs about 3 ms a query. That is small next
+  to the rest of a request, so catalogs below FAISS_FLAT_MAX_ROWS stay exact
+  whatever the factory says.
+- At 200k rows, Flat is about 26 ms. For catalogs that large, HNSW32 with
+  efSearch=64 (FAISS_SEARCH_PARAMS) is the suggested setting: over 100x
+  faster at about 0.96 recall, with a build time that stays reasonable.
+- IVF reaches full recall here only because the synthetic vectors are
+  tightly clustered, and it trains slowly. PQ32 loses too much recall for
+  item search.
+
+Flat stays the default factory, so no deployment trades recall for speed
+until it has been measured on its own catalog with --embeddings.
+"""
+import argparse
+import math
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import faiss
+import data_management
+
+from bench_util import percentile
+
+
+def load_vectors(embeddings_file, rows, query_count, dimension, seed):
+    rng = np.random.default_rng(seed)
+    if embeddings_file:
+        with np.load(embeddings_file, allow_pickle=False) as store:
+            base = np.asarray(store['embeddings'], dtype='float32')
+    else:
+        centers = rng.normal(size=(max(16, rows // 500), dimension)).astype('float32')
+        base = centers[rng.integers(len(centers), size=rows + query_count)] + 0.35 * rng.normal(size=(rows + query_count, dimension)).astype('float32')
+    total = rows + query_count
+    vectors = base[np.arange(total) % len(base)]
+    if len(base) < total:
+        vectors = vectors + 0.05 * rng.normal(size=vectors.shape).astype('float32')
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    order = rng.permutation(total)
+    return np.ascontiguousarray(vectors[order[:rows]]), np.ascontiguousarray(vectors[order[rows:]])
+
+
+def default_settings(rows):
+    nlist = 2 ** max(4, round(math.log2(4 * math.sqrt(rows))))
+    return [
+        ('Flat', ''),
+        ('HNSW32', 'efSearch=16'), ('HNSW32', 'efSearch=64'), ('HNSW32', 'efSearch=128'),
+        (f'IVF{nlist},Flat', 'nprobe=4'), (f'IVF{nlist},Flat', 'nprobe=16'), (f'IVF{nlist},Flat', 'nprobe=64'),
+        (f'IVF{nlist},PQ32', 'nprobe=16'),
+    ]
+
+
+def parse_setting(text):
+    factory, _, params = text.partition(':')
+    return factory, params
+
+
+def recall_at_k(found, expected):
+    k = expected.shape[1]
+    return float(np.mean([len(set(f) & set(e)) / k for f, e in zip(found, expected)]))
+
+
+def bench_setting(factory, params, vectors, queries, expected, k):
+    config = {'FAISS_INDEX_FACTORY': factory, 'FAISS_FLAT_MAX_ROWS': 0, 'FAISS_SEARCH_PARAMS': params}
+    start = time.perf_counter()
+    index = data_management.build_faiss_index(vectors, config)
+    build_seconds = time.perf_counter() - start
+
+    samples = []
+    found = []
+    for query in queries:
+        start = time.perf_counter()
+        _, ids = index.search(query[None, :], k)
+        samples.append((time.perf_counter() - start) * 1000)
+        found.append(ids[0])
+    start = time.perf_counter()
+    index.search(queries, k)
+    batch_ms = (time.perf_counter() - start) * 1000 / len(queries)
+
+    label = f"{factory}{' ' + params if params else ''}"
+    print(f"  {label:28s} build {build_seconds:7.2f} s  recall@{k} {recall_at_k(np.array(found), expected):.3f}  "
+          f"p50 {percentile(samples, 0.50):7.3f} ms  p95 {percentile(samples, 0.95):7.3f} ms  batched {batch_ms:7.3f} ms/query")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, nargs='+', default=[50000, 200000])
+    parser.add_argument('--embeddings', help='embedding store (.npz) written by the indexer')
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--dimension', type=int, default=384, help='vector size when no store is given (all-MiniLM-L6-v2: 384)')
+    parser.add_argument('--k', type=int, default=5)
+    parser.add_argument('--setting', action='append', type=parse_setting, help="factory[:search params], e.g. 'HNSW32:efSearch=64'")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    print(f"FAISS {faiss.__version__}, {faiss.omp_get_max_threads()} threads")
+    for rows in args.rows:
+        vectors, queries = load_vectors(args.embeddings, rows, args.queries, args.dimension, args.seed)
+        exact = faiss.IndexFlatL2(vectors.shape[1])
+        exact.add(vectors)
+        _, expected = exact.search(queries, args.k)
+        print(f"\n{rows} vectors of dimension {vectors.shape[1]}, {len(queries)} queries")
+        for factory, params in args.setting or default_settings(rows):
+            bench_setting(factory, params, vectors, queries, expected, args.k)
+
+
+if __name__ == '__main__':
+    main()
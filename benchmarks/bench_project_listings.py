@@ -0,0 +1,124 @@
+# benchmarks/bench_project_listings.py
+"""
+Project listings at dashboard scale on both project stores: FileProjectStore
+(one JSON file per project, listings answered by the ProjectCatalog) and
+SqliteProjectStore (PROJECT_STORE=sqlite).
+
+The script seeds --projects offers, written the way save_project writes them
+(json.dump with indent=4), into a fresh server directory. Both stores are then
+mounted in turn as app.projects_store and timed through the Flask endpoints:
+- paged /projects (one owner's listing), plain and with a search;
+- paged /all_projects_for_admin: first page, a deep page at offset 5000,
+  and the ref_asc sort;
+- POST /project/status/<id>.
+
+Cold start is timed separately:
+- for the files store, the first catalog build and the first listing after a
+  restart (persisted catalog);
+- for the SQLite store, the one-shot migration of the directory.
+
+    python benchmarks/bench_project_listings.py
+    python benchmarks/bench_project_listings.py --projects 10000 --repeat 50
+"""
+import os
+import json
+import time
+import random
+import argparse
+import tempfile
+from datetime import datetime, timedelta
+
+from bench_util import import_app, timed, latency_summary
+
+ADMIN = {'email': 'admin@example.com', 'role': 'admin', 'name': 'Admin'}
+
+
+def seed_projects(projects_dir, count, owners, items_per_project, seed=0):
+    """Writes `count` offers spread over `owners`; returns the owner emails."""
+    rng = random.Random(seed)
+    emails = [f"engineer{i}@example.com" for i in range(owners)]
+    product_types = ['Fire Alarm', 'Cable', 'Pump', 'Lighting', 'CCTV', 'Access Control']
+    start = datetime(2024, 1, 1)
+    for i in range(count):
+        data = {
+            'projectId': f"bench-{i:06d}",
+            'projectType': 'offer',
+            'referenceNumber': f"REF-{i}",
+            'lastModified': (start + timedelta(minutes=37 * i)).isoformat(),
+            'owner_email': rng.choice(emails),
+            'status': rng.choice(['Pending', 'Pending', 'Approved', 'Delivered']),
+            'client': {'name': f"Client {i % 300}", 'address': 'Industrial Area'},
+            'sheets': [{'name': 'Main', 'items': [
+                {'product_type': rng.choice(product_types), 'description': 'Item description ' * 10, 'qty': rng.randint(1, 20)}
+                for _ in range(items_per_project)
+            ]}],
+        }
+        with open(os.path.join(projects_dir, f"{data['projectId']}.json"), 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=4)
+    return emails
+
+
+def timed_once(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, (time.perf_counter() - start) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--projects', type=int, default=10000)
+    parser.add_argument('--owners', type=int, default=50)
+    parser.add_argument('--items', type=int, default=40, help='items per project')
+    parser.add_argument('--limit', type=int, default=50, help='page size')
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--workdir', help='empty directory to run the server in (default: a temporary one)')
+    args = parser.parse_args()
+
+    workdir = args.workdir or tempfile.mkdtemp(prefix='bench_projects_')
+    app = import_app(workdir)
+    projects_dir = app.CONFIG['PROJECTS_DIR']
+    print(f"Seeding {args.projects} projects in {os.path.abspath(projects_dir)} ...")
+    owners = seed_projects(projects_dir, args.projects, args.owners, args.items)
+    owner = owners[0]
+    deep_offset = min(5000, max(0, args.projects - args.limit))
+
+    catalog_file = os.path.join(app.CONFIG['DATA_DIR'], 'bench_project_catalog.json')
+    file_store = app.project_store.FileProjectStore(projects_dir, app.project_catalog.ProjectCatalog(projects_dir, catalog_file))
+    _, build_ms = timed_once(lambda: file_store.page(owner_email=owner, limit=args.limit))
+    restarted_store = app.project_store.FileProjectStore(projects_dir, app.project_catalog.ProjectCatalog(projects_dir, catalog_file))
+    _, restart_ms = timed_once(lambda: restarted_store.page(owner_email=owner, limit=args.limit))
+    sqlite_store = app.project_store.SqliteProjectStore(os.path.join(app.CONFIG['DATA_DIR'], 'bench_projects.sqlite3'), migrate_from=projects_dir)
+    _, migrate_ms = timed_once(lambda: sqlite_store.page(owner_email=owner, limit=args.limit))
+
+    print("\nCold start")
+    print(f"  files   first listing (catalog build)     {build_ms:10.1f} ms")
+    print(f"  files   first listing after a restart     {restart_ms:10.1f} ms")
+    print(f"  sqlite  first listing (migration)         {migrate_ms:10.1f} ms")
+
+    requests = [
+        ('owner listing', f"/projects?email={owner}&limit={args.limit}"),
+        ('owner listing + search', f"/projects?email={owner}&search=client 7&limit={args.limit}"),
+        ('admin listing', f"/all_projects_for_admin?role=admin&limit={args.limit}"),
+        (f"admin listing, offset {deep_offset}", f"/all_projects_for_admin?role=admin&offset={deep_offset}&limit={args.limit}"),
+        ('admin listing, ref_asc', f"/all_projects_for_admin?role=admin&sort=ref_asc&limit={args.limit}"),
+    ]
+    client = app.app.test_client()
+    pages = {}
+    for label, store in (('files', restarted_store), ('sqlite', sqlite_store)):
+        app.projects_store = store
+        print(f"\n{label} ({args.repeat} requests each)")
+        for name, url in requests:
+            response = client.get(url)
+            pages[label, name] = (response.headers['X-Total-Count'], response.get_json())
+            print(f"  {name:32s} {latency_summary(timed(lambda: client.get(url), args.repeat))}")
+        status_url = f"/project/status/bench-{args.projects // 2:06d}"
+        statuses = iter(['Approved', 'Pending'] * args.repeat)
+        samples = timed(lambda: client.post(status_url, json={'user': ADMIN, 'status': next(statuses)}), args.repeat)
+        print(f"  {'status update':32s} {latency_summary(samples)}")
+
+    mismatched = [name for name, _ in requests if pages['files', name] != pages['sqlite', name]]
+    print("\nBoth stores returned the same pages." if not mismatched else f"\nPages differ between the stores for: {', '.join(mismatched)}")
+
+
+if __name__ == '__main__':
+    main()
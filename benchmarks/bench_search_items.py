@@ -0,0 +1,139 @@
+# benchmarks/bench_search_items.py
+"""
+Compares /search_items as it is served now (row store, keyword and facet
+indexes, rows decoded only when returned) with the previous implementation,
+which copied every catalog row dict on each request and scanned them all.
+
+The previous implementation is reproduced below on the same rows, mounted at
+a benchmark-only route, so both go through the same Flask request handling.
+For each query it reports p50/p95 latency and the peak memory traced by
+tracemalloc during one request (a proxy for the per-request copies).
+
+    python benchmarks/bench_search_items.py --workdir /path/to/server/dir
+"""
+import re
+import argparse
+import tracemalloc
+
+from flask import request, jsonify
+
+from bench_util import load_app, timed, latency_summary
+
+QUERIES = [
+    'q=cable',
+    'q=fire alarm',
+    'q=cable -armoured',
+    'q=pump&make=abb',
+    'q=',
+    'q=zzzz-no-match',
+]
+
+
+def copying_search_items_view(item_rows, local_item_rows):
+    """The /search_items handler before the row store, over plain lists of row dicts."""
+    def view():
+        query = request.args.get('q', '').lower()
+        role = request.args.get('role', 'user')
+        source = request.args.get('source', 'all')
+        make_filter = [t.strip().lower() for t in request.args.get('make', '').split(',') if t]
+        approvals_filter = [t.strip().lower() for t in request.args.get('approvals', '').split(',') if t]
+        model_filter = [t.strip().lower() for t in request.args.get('model', '').split(',') if t]
+        product_type_filter_str = request.args.get('product_type', '')
+        product_type_filter = [s.strip().lower() for s in product_type_filter_str.split(',') if s] if product_type_filter_str else []
+
+        all_items_to_search = []
+        if source in ['foreign', 'all'] and item_rows:
+            for item in item_rows:
+                item_copy = item.copy()
+                item_copy['source_type'] = 'foreign'
+                all_items_to_search.append(item_copy)
+        if source in ['local', 'all'] and local_item_rows:
+            for item in local_item_rows:
+                item_copy = item.copy()
+                item_copy['source_type'] = 'local'
+                all_items_to_search.append(item_copy)
+
+        filtered_items = []
+        for item in all_items_to_search:
+            if product_type_filter and str(item.get('product_type', '')).lower() not in product_type_filter:
+                continue
+            if make_filter and str(item.get('make', '')).lower() not in make_filter:
+                continue
+            if approvals_filter and str(item.get('approvals', '')).lower() not in approvals_filter:
+                continue
+            if model_filter and str(item.get('model', '')).lower() not in model_filter:
+                continue
+            filtered_items.append(item)
+        if not query:
+            return jsonify(filtered_items)
+
+        positive_query_parts, negative_keywords = [], []
+        for term in query.split():
+            if term.startswith('-') and len(term) > 1:
+                negative_keywords.append(term[1:])
+            else:
+                positive_query_parts.append(term)
+        positive_query = " ".join(positive_query_parts)
+        positive_keywords = [word for word in re.split(r'[^a-z0-9]+', positive_query) if word]
+        if not positive_keywords:
+            return jsonify(filtered_items)
+
+        scored_results = []
+        for item in filtered_items:
+            target_text = item.get('search_text', '')
+            if any(neg_keyword in target_text for neg_keyword in negative_keywords):
+                continue
+            matched_keywords_count = sum(1 for pos_keyword in positive_keywords if pos_keyword in target_text)
+            if matched_keywords_count > 0:
+                score = matched_keywords_count / len(positive_keywords)
+                if positive_query in target_text:
+                    score += 0.5
+                item['relevance_score'] = score
+                item['source_sort_key'] = 0 if item['source_type'] == 'foreign' else 1
+                scored_results.append(item)
+        sorted_results = sorted(scored_results, key=lambda x: (-x['relevance_score'], x['source_sort_key']))
+        if role != 'admin':
+            for item in sorted_results:
+                item.pop('relevance_score', None)
+                item.pop('source_sort_key', None)
+        return jsonify(sorted_results)
+    return view
+
+
+def peak_traced_bytes(fn):
+    tracemalloc.start()
+    try:
+        fn()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--workdir', default='.', help='directory the server runs in (holds data_storage)')
+    parser.add_argument('--repeat', type=int, default=50)
+    args = parser.parse_args()
+
+    app = load_app(args.workdir)
+    bundle = app.search_bundle
+    # The previous implementation kept the catalog as lists of dicts in memory
+    item_rows = list(bundle.item_searchable_data or [])
+    local_item_rows = list(bundle.local_item_searchable_data or [])
+    app.app.add_url_rule('/bench/copying_search_items', 'bench_copying_search_items', copying_search_items_view(item_rows, local_item_rows))
+    client = app.app.test_client()
+    print(f"Catalog: {len(item_rows)} foreign + {len(local_item_rows)} local rows\n")
+
+    for query in QUERIES:
+        print(f"[{query}]")
+        for label, path in (('copying  ', '/bench/copying_search_items'), ('row store', '/search_items')):
+            url = f"{path}?{query}"
+            result_count = len(client.get(url).get_json())
+            samples = timed(lambda: client.get(url), args.repeat)
+            peak = peak_traced_bytes(lambda: client.get(url))
+            print(f"  {label}  {result_count:6d} rows  {latency_summary(samples)}  peak {peak / 1024:10.1f} KiB")
+        print()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+# benchmarks/bench_util.py
+import os
+import sys
+import time
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def import_app(workdir):
+    """
+    Imports app.py with `workdir` as the working directory (where data_storage,
+    authorization, ... live, as when the server runs) and creates its directories
+    and files, without loading any search data.
+    """
+    os.chdir(workdir)
+    if REPO_DIR not in sys.path:
+        sys.path.insert(0, REPO_DIR)
+    import app
+    app.setup_directories_and_files()
+    return app
+
+
+def load_app(workdir):
+    """import_app(), then publishes the search bundle the same way the server does at startup."""
+    app = import_app(workdir)
+    app.publish_search_bundle(app.data_management.initialize_data(app.data_config()))
+    return app
+
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def timed(fn, repeat):
+    """Runs fn() `repeat` times; returns the wall times in milliseconds."""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+def latency_summary(samples):
+    return f"p50 {percentile(samples, 0.50):8.3f} ms  p95 {percentile(samples, 0.95):8.3f} ms"
+
+
+# Representative catalog descriptions, used when no row store is given
+SAMPLE_TEXTS = [
+    'copper cable 4c 16 sq mm pvc armoured', 'fire alarm control panel 4 zone conventional',
+    'addressable smoke detector with base', 'heat detector rate of rise 57 c', 'manual call point break glass red',
+    'sprinkler head pendent 68 c 1/2 inch', 'gi pipe 2 inch medium class', 'ms flange 4 inch pn16',
+    'butterfly valve 6 inch with tamper switch', 'fire pump electric 500 gpm ul fm', 'jockey pump 25 gpm',
+    'elbow 90 degree 3/4 inch threaded', 'equal tee 1 inch galvanized', 'alarm bell 6 inch 24v dc',
+    'strobe light red wall mount', 'fire extinguisher co2 5 kg', 'hose reel 30 m with nozzle',
+    'landing valve 2.5 inch oblique', 'pressure gauge 0-300 psi', 'flow switch 4 inch paddle type',
+    'lan cable cat6 utp 305 m', 'cable tray perforated 300 mm', 'pvc conduit 25 mm', 'led panel light 36 w',
+    'distribution board 12 way tpn', 'mcb 32 a 3 pole', 'emergency exit sign led', 'beam detector reflective 100 m',
+    'gas suppression fm200 cylinder 80 l', 'deluge valve 4 inch ul listed',
+]
+
+
+def sample_texts(workdir=None, count=1000):
+    """Up to `count` search texts of the foreign catalog in `workdir`, or SAMPLE_TEXTS without one."""
+    if not workdir:
+        return list(SAMPLE_TEXTS)
+    if REPO_DIR not in sys.path:
+        sys.path.insert(0, REPO_DIR)
+    from search_index import RowStore
+    texts = [text for text in RowStore(os.path.join(workdir, 'data_storage', 'item_searchable_data.rows')).column('search_text') if text]
+    step = max(1, len(texts) // count)
+    return texts[::step][:count]
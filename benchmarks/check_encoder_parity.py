@@ -0,0 +1,99 @@
+# benchmarks/check_encoder_parity.py
+"""
+Checks that the ONNX / OpenVINO / quantized encoder backends produce vectors
+close enough to the PyTorch ones. Query vectors and catalog vectors must come
+from the same encoder: the embedding stores and FAISS indexes are rebuilt when
+ENCODER_BACKEND or ENCODER_MODEL_FILE changes, so parity decides whether a
+backend ranks like torch, not whether it can be mixed with torch vectors.
+
+Each backend encodes the same texts as torch. The script reports:
+- the mean and minimum cosine similarity of each text's vector to torch's;
+- top-5 neighbour agreement among the texts.
+It exits with status 1 when a backend's minimum cosine is below its
+threshold: --min-cosine for full-precision exports, --min-cosine-quantized
+for int8 files. tests/test_encoder_parity.py runs the same check for each
+installed backend; this script is for other model files and catalog texts.
+
+    python benchmarks/check_encoder_parity.py --backend onnx --backend openvino \\
+        --backend onnx:onnx/model_qint8_avx512_vnni.onnx --workdir /path/to/server/dir
+"""
+import argparse
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import data_management
+
+from bench_util import sample_texts
+
+QUANTIZED_MARKERS = ('int8', 'qint8', 'quint8')
+# Lowest cosine to the torch vector a text may have, for full-precision and int8 model files
+MIN_COSINE = 0.999
+MIN_COSINE_QUANTIZED = 0.95
+
+
+def parse_backend(text):
+    backend, _, model_file = text.partition(':')
+    return backend, model_file
+
+
+def encode(config, texts):
+    model = data_management.load_sentence_model(config)
+    return np.asarray(model.encode(texts, batch_size=64, convert_to_numpy=True), dtype='float32')
+
+
+def cosine_similarities(vectors, reference):
+    """Cosine similarity of each row of `vectors` to the same row of `reference`."""
+    return np.sum(vectors * reference, axis=1) / (np.linalg.norm(vectors, axis=1) * np.linalg.norm(reference, axis=1))
+
+
+def min_cosine_for(model_file, min_cosine=MIN_COSINE, min_cosine_quantized=MIN_COSINE_QUANTIZED):
+    return min_cosine_quantized if any(marker in (model_file or '') for marker in QUANTIZED_MARKERS) else min_cosine
+
+
+def neighbours(vectors, k):
+    normalized = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+    similarity = normalized @ normalized.T
+    np.fill_diagonal(similarity, -np.inf)
+    return np.argsort(-similarity, axis=1)[:, :k]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--backend', action='append', type=parse_backend, required=True, help="backend[:model file], e.g. 'onnx' or 'onnx:onnx/model_qint8_avx512_vnni.onnx'")
+    parser.add_argument('--model', default='all-MiniLM-L6-v2')
+    parser.add_argument('--workdir', help='server directory whose catalog texts are used (default: built-in sample)')
+    parser.add_argument('--texts', type=int, default=1000)
+    parser.add_argument('--min-cosine', type=float, default=MIN_COSINE)
+    parser.add_argument('--min-cosine-quantized', type=float, default=MIN_COSINE_QUANTIZED)
+    args = parser.parse_args()
+
+    texts = sample_texts(args.workdir, args.texts)
+    reference = encode({'MODEL_NAME': args.model, 'ENCODER_BACKEND': 'torch'}, texts)
+    reference_neighbours = neighbours(reference, min(5, len(texts) - 1))
+    print(f"{len(texts)} texts, reference: {args.model} [torch]")
+
+    failures = []
+    for backend, model_file in args.backend:
+        config = {'MODEL_NAME': args.model, 'ENCODER_BACKEND': backend, 'ENCODER_MODEL_FILE': model_file}
+        name = data_management.encoder_name(config)
+        vectors = encode(config, texts)
+        cosines = cosine_similarities(vectors, reference)
+        found = neighbours(vectors, reference_neighbours.shape[1])
+        agreement = np.mean([len(set(a) & set(b)) / len(a) for a, b in zip(found, reference_neighbours)])
+        threshold = min_cosine_for(model_file, args.min_cosine, args.min_cosine_quantized)
+        passed = cosines.min() >= threshold
+        print(f"  {name:60s} cosine mean {cosines.mean():.5f} min {cosines.min():.5f} (>= {threshold})  "
+              f"top-5 agreement {agreement:.3f}  {'ok' if passed else 'FAILED'}")
+        if not passed:
+            failures.append(name)
+
+    if failures:
+        print(f"Below the cosine threshold: {', '.join(failures)}")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,154 +1,394 @@
 import os
+import json
+import hashlib
 import pickle
+import time
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from collections import OrderedDict, namedtuple
+from datetime import datetime
 import faiss
 import pandas as pd
 import numpy as np
-from sentence_transformers import SentenceTransformer
 from app_helpers import html_to_plain_text
+from search_index import KeywordIndex, FacetIndex, RowStore
+from price_list_repo import price_lists, file_stamp
+from price_list_reader import read_price_list_sheet, PRICE_LIST_COLUMNS
 import traceback
 from openpyxl import load_workbook
 from openpyxl.utils.cell import get_column_letter
-import html # Added for escaping characters
 
-def openpyxl_rich_text_to_html(cell):
+def normalize_query_text(text):
+    """Lower-cases and collapses whitespace so equivalent queries share one cache entry."""
+    return ' '.join(str(text).lower().split())
+
+
+class EmbeddingCache:
     """
-    Safely converts a cell's value (including rich text with multiple formats)
-    into a single HTML string.
+    Bounded LRU cache of query embeddings keyed by (model name, normalized text).
+    Texts repeated within one call or across calls are encoded only once; the
+    hit/miss counters are exposed through stats().
     """
-    if cell.value is None:
-        return ""
 
-    # Handle cells with rich text (multiple formatting parts)
-    if cell.data_type == 'r' and isinstance(cell.value, (list, tuple)):
-        html_parts = []
-        for part in cell.value:
-            text = getattr(part, 'text', str(part))
-            font = getattr(part, 'font', None)
-            
-            if text is None:
-                continue
+    def __init__(self, maxsize=4096):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
 
-            text = html.escape(str(text)).replace('\n', '<br>')
-            
-            styles = []
-            if font:
-                if font.bold:
-                    styles.append('font-weight: bold;')
-                if font.italic:
-                    styles.append('font-style: italic;')
-                
-                # Safely handle font color
-                if font.color and hasattr(font.color, 'rgb') and font.color.rgb:
-                    rgb_value = font.color.rgb
-                    if isinstance(rgb_value, str) and len(rgb_value) >= 6:
-                        # Get RRGGBB part from AARRGGBB or RRGGBB
-                        color_hex = rgb_value[-6:]
-                        if color_hex.lower() != '000000': # Don't style default black text
-                            styles.append(f'color: #{color_hex};')
-
-            if styles:
-                html_parts.append(f'<span style="{" ".join(styles)}">{text}</span>')
-            else:
-                html_parts.append(text)
-        return "".join(html_parts)
-    
-    # Fallback for non-rich-text cells that may still have cell-level formatting
-    text = html.escape(str(cell.value)).replace('\n', '<br>')
-    styles = []
-    if cell.font:
-        if cell.font.bold:
-            styles.append('font-weight: bold;')
-        if cell.font.italic:
-            styles.append('font-style: italic;')
-        if cell.font.color and hasattr(cell.font.color, 'rgb') and cell.font.color.rgb:
-            rgb_value = cell.font.color.rgb
-            if isinstance(rgb_value, str) and len(rgb_value) >= 6:
-                color_hex = rgb_value[-6:]
-                if color_hex.lower() != '000000':
-                    styles.append(f'color: #{color_hex};')
-
-    if styles:
-        return f'<span style="{" ".join(styles)}">{text}</span>'
-    
-    return text
+    def encode(self, sentence_model, model_name, texts, batch_size=32):
+        """Returns a float32 matrix with one embedding row per text, encoding only the cache misses."""
+        normalized = [normalize_query_text(text) for text in texts]
+        vectors = [None] * len(normalized)
+        missing = OrderedDict()
+
+        with self._lock:
+            for pos, text in enumerate(normalized):
+                vector = self._entries.get((model_name, text))
+                if vector is not None:
+                    self._entries.move_to_end((model_name, text))
+                    vectors[pos] = vector
+                    self.hits += 1
+                elif text in missing:
+                    missing[text].append(pos)
+                    self.hits += 1
+                else:
+                    missing[text] = [pos]
+                    self.misses += 1
 
+        if missing:
+            embeddings = sentence_model.encode(list(missing), batch_size=batch_size, convert_to_tensor=True).cpu().numpy()
+            with self._lock:
+                for (text, positions), embedding in zip(missing.items(), embeddings):
+                    vector = np.array(embedding, dtype='float32')
+                    vector.flags.writeable = False
+                    for pos in positions:
+                        vectors[pos] = vector
+                    self._entries[(model_name, text)] = vector
+                    self._entries.move_to_end((model_name, text))
+                while len(self._entries) > self.maxsize:
+                    self._entries.popitem(last=False)
 
-def _process_excel_file(filepath, sentence_model, markup, is_local=False):
+        if not vectors:
+            return np.zeros((0, 0), dtype='float32')
+        return np.vstack(vectors)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'maxsize': self.maxsize,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+
+ENCODER_BACKENDS = ('torch', 'onnx', 'openvino')
+
+def encoder_name(config):
     """
-    Processes a single Excel price list file, calculates prices, generates search text,
-    creates embeddings, and returns a Faiss index and the searchable data.
+    Identifies the encoder that produced an embedding: the model name, plus the
+    backend and model file when they differ from the default PyTorch weights.
+    Used to key the query cache and the embedding stores, since ONNX and
+    quantized variants produce slightly different vectors.
     """
-    if not os.path.exists(filepath):
-        print(f"WARNING: Price list file not found at '{filepath}', skipping.")
-        return None, None
+    backend = config.get('ENCODER_BACKEND') or 'torch'
+    model_file = config.get('ENCODER_MODEL_FILE') or ''
+    if backend == 'torch':
+        return config['MODEL_NAME']
+    return f"{config['MODEL_NAME']} [{backend}{':' + model_file if model_file else ''}]"
+
+class ModelRegistry:
+    """
+    Holds the sentence model loaded in this process, so index rebuilds reuse it.
+    The model is loaded again only when the model name, encoder backend or
+    model file changes; each load is timed and reported through stats().
+    """
+
+    def __init__(self):
+        self.model_name = None
+        self.model = None
+        self.loads = 0
+        self.last_load_seconds = None
+        self.loaded_at = None
+        self._lock = threading.Lock()
+
+    def get(self, config):
+        name = encoder_name(config)
+        with self._lock:
+            if self.model is None or self.model_name != name:
+                print(f"Initializing sentence transformer with model: {name}")
+                started = time.perf_counter()
+                model = load_sentence_model(config)
+                self.last_load_seconds = round(time.perf_counter() - started, 3)
+                self.model, self.model_name = model, name
+                self.loaded_at = datetime.now().isoformat()
+                self.loads += 1
+                print(f"Sentence transformer '{name}' loaded in {self.last_load_seconds}s.")
+            return self.model
+
+    def stats(self):
+        with self._lock:
+            return {
+                'model_name': self.model_name,
+                'loads': self.loads,
+                'last_load_seconds': self.last_load_seconds,
+                'loaded_at': self.loaded_at,
+            }
+
+def load_sentence_model(config):
+    """
+    Loads MODEL_NAME with the configured ENCODER_BACKEND: 'torch' (default),
+    'onnx' (ONNX Runtime) or 'openvino'. ENCODER_MODEL_FILE selects a specific
+    exported file, e.g. 'onnx/model_qint8_avx512_vnni.onnx' for the int8-quantized
+    all-MiniLM-L6-v2. The onnx and openvino backends need the optimum extras
+    (pip install "sentence-transformers[onnx]" or "[openvino]").
+    sentence_transformers (and with it torch) is imported here rather than at
+    module level, so ingestion workers that re-import the app stay light.
+    """
+    from sentence_transformers import SentenceTransformer
+    backend = config.get('ENCODER_BACKEND') or 'torch'
+    if backend not in ENCODER_BACKENDS:
+        raise ValueError(f"Unknown ENCODER_BACKEND '{backend}', expected one of {', '.join(ENCODER_BACKENDS)}.")
+    if backend == 'torch':
+        return SentenceTransformer(config['MODEL_NAME'], trust_remote_code=True)
+
+    model_kwargs = {'file_name': config['ENCODER_MODEL_FILE']} if config.get('ENCODER_MODEL_FILE') else None
+    return SentenceTransformer(config['MODEL_NAME'], backend=backend, model_kwargs=model_kwargs, trust_remote_code=True)
+
+model_registry = ModelRegistry()
+
+
+def apply_faiss_search_params(faiss_index, search_params):
+    """Applies search-time parameters such as 'efSearch=64' or 'nprobe=16' to an approximate index."""
+    if not search_params or isinstance(faiss_index, faiss.IndexFlat):
+        return
     try:
-        # Use openpyxl to load the workbook to access rich text
-        wb = load_workbook(filepath, data_only=True)
-        all_items = []
-
-        for sheet_name in wb.sheetnames:
-            ws = wb[sheet_name]
-            # Ensure header is read as plain strings
-            header = [str(cell.value).strip() if cell.value is not None else '' for cell in ws[1]]
-            
-            # Find column indices
+        faiss.ParameterSpace().set_index_parameters(faiss_index, search_params)
+    except Exception as e:
+        print(f"Could not apply FAISS search parameters '{search_params}': {e}")
+
+def build_faiss_index(embeddings, config):
+    """
+    Creates the vector index for a matrix of embeddings. Catalogs of up to
+    FAISS_FLAT_MAX_ROWS vectors use an exact IndexFlatL2; larger ones use the
+    FAISS_INDEX_FACTORY description (e.g. 'HNSW32' or 'IVF1024,PQ16'), trained
+    on the embeddings when the index type needs it. The search parameters are
+    set before saving, so faiss.write_index persists them with the index.
+    """
+    embeddings = np.ascontiguousarray(embeddings, dtype='float32')
+    dimension = embeddings.shape[1]
+    factory = config.get('FAISS_INDEX_FACTORY', 'Flat')
+
+    if factory == 'Flat' or len(embeddings) <= config.get('FAISS_FLAT_MAX_ROWS', 50000):
+        faiss_index = faiss.IndexFlatL2(dimension)
+    else:
+        print(f"Building '{factory}' FAISS index for {len(embeddings)} vectors.")
+        faiss_index = faiss.index_factory(dimension, factory, faiss.METRIC_L2)
+        if not faiss_index.is_trained:
+            faiss_index.train(embeddings)
+        apply_faiss_search_params(faiss_index, config.get('FAISS_SEARCH_PARAMS'))
+
+    faiss_index.add(embeddings)
+    return faiss_index
+
+def write_faiss_index(faiss_index, filepath):
+    """Writes a FAISS index through a temporary file, so a reader never maps a partially written index."""
+    temp_path = f"{filepath}.tmp"
+    faiss.write_index(faiss_index, temp_path)
+    os.replace(temp_path, filepath)
+
+def _content_hash(text):
+    return hashlib.sha1(str(text).encode('utf-8')).hexdigest()
+
+def load_embedding_store(filepath, model_name):
+    """
+    Loads the persisted content-hash -> embedding store of one catalog as a dict.
+    A missing or unreadable store, or one written by another model, is treated as empty.
+    """
+    if not filepath or not os.path.exists(filepath):
+        return {}
+    try:
+        with np.load(filepath, allow_pickle=False) as store:
+            if str(store['model_name']) != model_name:
+                print(f"Embedding store '{filepath}' was built with another model, re-encoding everything.")
+                return {}
+            hashes = store['hashes'].astype(str)
+            embeddings = store['embeddings']
+            return {content_hash: embeddings[pos] for pos, content_hash in enumerate(hashes)}
+    except Exception as e:
+        print(f"Could not load embedding store '{filepath}', re-encoding everything: {e}")
+        return {}
+
+def save_embedding_store(filepath, model_name, hashes, embeddings):
+    """Saves the content hashes and their embeddings atomically (temporary file + os.replace)."""
+    temp_path = f"{filepath}.tmp.npz"
+    np.savez(temp_path, model_name=np.array(model_name), hashes=np.array(hashes, dtype='S40'), embeddings=embeddings)
+    os.replace(temp_path, filepath)
+
+def stored_encoder_names(config):
+    """{embedding store file: encoder name it was written with} for the stores that exist and can be read."""
+    names = {}
+    for key in ('ITEM_EMBEDDINGS_FILE', 'LOCAL_ITEM_EMBEDDINGS_FILE', 'CLIENT_EMBEDDINGS_FILE'):
+        filepath = config.get(key)
+        if filepath and os.path.exists(filepath):
             try:
-                desc_col_idx = header.index('description')
-                po_price_col_idx = header.index('po_price')
-            except ValueError:
-                print(f"Skipping sheet '{sheet_name}' in '{filepath}' due to missing 'description' or 'po_price' column.")
-                continue
-
-            # Map other columns, defaulting to None if not found
-            col_map = {col: (header.index(col) if col in header else -1) for col in ['item_code', 'make', 'approvals', 'model', 'installation', 'unit']}
-
-            for row_idx, row in enumerate(ws.iter_rows(min_row=2), start=2):
-                description_cell = row[desc_col_idx]
-                # Skip empty rows
-                if not description_cell.value:
-                    continue
-                
-                po_price_cell = row[po_price_col_idx]
-                po_price = pd.to_numeric(po_price_cell.value, errors='coerce')
-                if pd.isna(po_price) or po_price <= 0:
-                    continue
-
-                # Get rich text description as HTML
-                description_html = openpyxl_rich_text_to_html(description_cell)
-
-                item_data = {
-                    'product_type': sheet_name,
-                    'description': description_html, # Store HTML description
-                    'po_price': po_price,
-                    'item_code': row[col_map['item_code']].value if col_map['item_code'] != -1 else (f"local_{row_idx}" if is_local else None),
-                    'make': row[col_map['make']].value if col_map['make'] != -1 else None,
-                    'approvals': row[col_map['approvals']].value if col_map['approvals'] != -1 else None,
-                    'model': row[col_map['model']].value if col_map['model'] != -1 else None,
-                    'installation': row[col_map['installation']].value if col_map['installation'] != -1 else None,
-                    'unit': row[col_map['unit']].value if col_map['unit'] != -1 else 'Pcs',
-                }
-                all_items.append(item_data)
-
-        if not all_items:
+                with np.load(filepath, allow_pickle=False) as store:
+                    names[filepath] = str(store['model_name'])
+            except Exception as e:
+                print(f"Could not read embedding store '{filepath}': {e}")
+    return names
+
+def encode_with_embedding_store(sentence_model, texts, filepath, model_name):
+    """
+    Returns one embedding row per text, in order. Texts whose content hash is
+    already in the store at `filepath` reuse the stored vector; only new or
+    changed texts are encoded. The store is then rewritten with exactly the
+    current texts, so vectors of deleted rows are dropped with them.
+    """
+    hashes = [_content_hash(text) for text in texts]
+    stored = load_embedding_store(filepath, model_name)
+
+    missing = OrderedDict()
+    for content_hash, text in zip(hashes, texts):
+        if content_hash not in stored and content_hash not in missing:
+            missing[content_hash] = text
+
+    if missing:
+        encoded = sentence_model.encode(list(missing.values()), convert_to_tensor=True).cpu().numpy()
+        for content_hash, embedding in zip(missing, encoded):
+            stored[content_hash] = embedding
+    print(f"Embeddings for {len(texts)} rows: {len(texts) - len(missing)} reused from the store, {len(missing)} encoded.")
+
+    embeddings = np.vstack([stored[content_hash] for content_hash in hashes]).astype('float32')
+    if filepath:
+        save_embedding_store(filepath, model_name, hashes, embeddings)
+    return embeddings
+
+def read_faiss_index(filepath):
+    """
+    Loads a FAISS index memory-mapped, so processes on one host share its pages.
+    Falls back to a regular read for index types that cannot be mapped.
+    """
+    try:
+        return faiss.read_index(filepath, getattr(faiss, 'IO_FLAG_MMAP_IFC', faiss.IO_FLAG_MMAP))
+    except RuntimeError as e:
+        print(f"Memory-mapping '{filepath}' failed, reading it into memory instead: {e}")
+        return faiss.read_index(filepath)
+
+def ingest_pool_context():
+    """
+    Start method for the ingestion worker pool. Builds run on a thread of the
+    multi-threaded server, so workers are never forked from it: they come from
+    a single-threaded forkserver with the sheet reader preloaded, or are
+    spawned where forkserver is unavailable. Workers import price_list_reader
+    and the launching script, neither of which loads sentence_transformers or
+    torch (see load_sentence_model).
+    """
+    if 'forkserver' in multiprocessing.get_all_start_methods():
+        context = multiprocessing.get_context('forkserver')
+        context.set_forkserver_preload(['__main__', 'price_list_reader'])
+        return context
+    return multiprocessing.get_context('spawn')
+
+def read_price_lists(sources, workers=1):
+    """
+    Parses the sheets of several price lists, given as (filepath, is_local) pairs.
+    With more than one worker every (file, sheet) pair is parsed in a process pool.
+    Results are merged in file and sheet order, so the rows (and therefore the
+    row ids) are the same however the work was scheduled. The item_code -> row
+    maps found on the way are recorded in the item location index. Returns
+    {filepath: {column: values}}, with None for files that are missing or unreadable.
+    """
+    items_by_file = {}
+    stamps = {}
+    tasks = []
+    for filepath, is_local in sources:
+        if not os.path.exists(filepath):
+            print(f"WARNING: Price list file not found at '{filepath}', skipping.")
+            items_by_file[filepath] = None
+            continue
+        stamps[filepath] = file_stamp(filepath)
+        try:
+            wb = load_workbook(filepath, read_only=True)
+            sheet_names = wb.sheetnames
+            wb.close()
+        except Exception as e:
+            print(f"Error processing Excel file {filepath}: {e}")
+            items_by_file[filepath] = None
+            continue
+        items_by_file[filepath] = {name: [] for name in PRICE_LIST_COLUMNS}
+        tasks.extend((filepath, sheet_name, is_local) for sheet_name in sheet_names)
+
+    if not tasks:
+        return items_by_file
+
+    filepaths, sheet_names, local_flags = zip(*tasks)
+    try:
+        if workers > 1 and len(tasks) > 1:
+            with ProcessPoolExecutor(max_workers=min(workers, len(tasks)), mp_context=ingest_pool_context()) as pool:
+                results = list(pool.map(read_price_list_sheet, filepaths, sheet_names, local_flags))
+        else:
+            results = list(map(read_price_list_sheet, filepaths, sheet_names, local_flags))
+    except Exception as e:
+        print(f"Error reading price list sheets: {e}")
+        traceback.print_exc()
+        return {filepath: None for filepath in items_by_file}
+
+    sheet_rows_by_file = {filepath: {} for filepath in stamps}
+    for (filepath, sheet_name, _), (sheet_columns, item_rows) in zip(tasks, results):
+        for name, values in sheet_columns.items():
+            items_by_file[filepath][name].extend(values)
+        sheet_rows_by_file[filepath][sheet_name] = item_rows
+
+    for filepath, sheet_rows in sheet_rows_by_file.items():
+        # Stamped with the version seen before parsing, so a file changed meanwhile is treated as stale
+        price_lists.record_item_locations(filepath, stamps[filepath], sheet_rows)
+    return items_by_file
+
+def _frame_column_values(series):
+    """Converts a DataFrame column to plain Python values, with None for missing ones."""
+    return series.astype(object).where(series.notna(), None).tolist()
+
+def _process_excel_file(filepath, price_list_columns, sentence_model, config, is_local=False):
+    """
+    Processes the columns read from a single Excel price list file: calculates prices,
+    generates search text, creates embeddings, and returns a Faiss index and the
+    searchable data as a {column: values} dict ready for RowStore.write_columns.
+    """
+    try:
+        if not price_list_columns or not price_list_columns['description']:
             return None, None
 
-        price_list_df = pd.DataFrame(all_items)
-        
-        po_price_numeric = pd.to_numeric(price_list_df['po_price'], errors='coerce')
-        price_list_df['offer_price'] = (po_price_numeric * (1 + markup)).round(2)
+        price_list_df = pd.DataFrame(price_list_columns)
+        # Parse po_price once per column; rows without a positive price were already dropped while reading
+        price_list_df['po_price'] = pd.to_numeric(price_list_df['po_price'], errors='coerce')
+        price_list_df['offer_price'] = (price_list_df['po_price'] * (1 + config['MARKUP'])).round(2)
         
         # Create plain search_text from the HTML description for the search index
-        price_list_df['search_text'] = price_list_df['description'].apply(html_to_plain_text).str.lower()
+        price_list_df['search_text'] = price_list_df['description'].map(html_to_plain_text).str.lower()
         
         price_list_df['is_local'] = is_local
+        price_list_df['source_type'] = 'local' if is_local else 'foreign'
         
-        searchable_data = price_list_df.replace({np.nan: None}).to_dict('records')
-        search_texts = [text for text in price_list_df['search_text'].tolist() if str(text).strip()]
+        searchable_data = {name: _frame_column_values(price_list_df[name]) for name in price_list_df.columns}
+        search_texts = price_list_df['search_text'].fillna('').astype(str).tolist()
         
-        if search_texts:
-            embeddings = sentence_model.encode(search_texts, convert_to_tensor=True).cpu().numpy()
-            faiss_index = faiss.IndexFlatL2(embeddings.shape[1])
-            faiss_index.add(embeddings)
+        if any(text.strip() for text in search_texts):
+            # Every row gets a vector (blank ones included) so FAISS ids stay aligned with row ids
+            embeddings_file = config.get('LOCAL_ITEM_EMBEDDINGS_FILE' if is_local else 'ITEM_EMBEDDINGS_FILE')
+            embeddings = encode_with_embedding_store(sentence_model, search_texts, embeddings_file, encoder_name(config))
+            faiss_index = build_faiss_index(embeddings, config)
             return faiss_index, searchable_data
         else:
             return None, None
@@ -158,30 +398,174 @@ def _process_excel_file(filepath, sentence_model, markup, is_local=False):
         traceback.print_exc()
         return None, None
 
-# Rest of the code remains the same...
+def patch_searchable_rows(row_store, filepath, sheet_row_updates):
+    """
+    Applies workbook edits that leave descriptions alone (e.g. installation prices)
+    to a price list's RowStore, without touching embeddings or any index.
+    `sheet_row_updates` maps (sheet name, sheet row) -> {column: value}.
+    Returns the rewritten store and the number of rows patched, or (None, 0) for
+    a store written before source rows were recorded, which needs a full rebuild.
+    """
+    if not row_store.has_column('_source_row'):
+        return None, 0
+    row_ids = {
+        (product_type, source_row): row_id
+        for row_id, (product_type, source_row) in enumerate(zip(row_store.column('product_type'), row_store.column('_source_row')))
+    }
+    row_updates = {}
+    for key, values in sheet_row_updates.items():
+        if key in row_ids:
+            row_updates[row_ids[key]] = values
+    patched_rows = len(row_updates)
+    # Patched columns get the same dtype inference as a rebuild, so e.g. an
+    # installation column that still has gaps holds floats, not the ints written
+    for name in {name for values in row_updates.values() for name in values}:
+        column = row_store.column(name)
+        for row_id, values in row_updates.items():
+            if name in values:
+                column[row_id] = values[name]
+        for row_id, value in enumerate(_frame_column_values(pd.Series(column))):
+            row_updates.setdefault(row_id, {})[name] = value
+    return row_store.patched(filepath, row_updates), patched_rows
+
+def _save_row_index(index_cls, searchable_data, filepath):
+    """Builds a row-level index (KeywordIndex or FacetIndex) over the searchable rows and pickles it."""
+    row_index = index_cls(searchable_data)
+    temp_path = f"{filepath}.tmp"
+    with open(temp_path, 'wb') as f:
+        pickle.dump(row_index, f)
+    os.replace(temp_path, filepath)
+    return row_index
+
+def _load_row_index(index_cls, filepath, searchable_data):
+    """Loads a pickled row-level index, rebuilding it from the row data if it is missing or unreadable."""
+    if os.path.exists(filepath):
+        try:
+            with open(filepath, 'rb') as f:
+                return pickle.load(f)
+        except Exception as e:
+            print(f"Could not load index '{filepath}', rebuilding: {e}")
+    return _save_row_index(index_cls, searchable_data, filepath)
+
+FILTER_OPTION_COLUMNS = ['make', 'approvals', 'model']
+
+def build_filter_options(facet_indexes):
+    """
+    Merges the facet display values of the loaded sources into the payload of
+    /get_filter_options, together with an ETag derived from its content.
+    """
+    options = {col: set() for col in FILTER_OPTION_COLUMNS}
+    for facet_index in facet_indexes:
+        if facet_index is None:
+            continue
+        for col in FILTER_OPTION_COLUMNS:
+            options[col].update(facet_index.values.get(col, []))
+    options = {col: sorted(values) for col, values in options.items()}
+    etag = hashlib.sha1(json.dumps(options, sort_keys=True).encode('utf-8')).hexdigest()
+    return {'options': options, 'etag': etag}
+
+def _file_digest(filepath):
+    sha1 = hashlib.sha1()
+    with open(filepath, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            sha1.update(chunk)
+    return sha1.hexdigest()
+
+def load_sheet_catalog(filepaths, previous=None):
+    """
+    Reads the sheet names of the price-list workbooks together with the
+    validators (ETag, Last-Modified) used by /get_sheet_names. A workbook is
+    only re-opened when its mtime/size changed since `previous` and its
+    content hash differs as well.
+    """
+    previous_sources = previous['sources'] if previous else {}
+    sources = {}
+    for filepath in filepaths:
+        stamp = file_stamp(filepath)
+        if stamp is None:
+            continue
+        source = previous_sources.get(filepath)
+        if source and source['stamp'] == stamp:
+            sources[filepath] = source
+            continue
+
+        digest = _file_digest(filepath)
+        if source and source['digest'] == digest:
+            sources[filepath] = {**source, 'stamp': stamp}
+            continue
+
+        sheet_names = price_lists.sheet_names(filepath)
+        sources[filepath] = {'stamp': stamp, 'digest': digest, 'sheet_names': sheet_names, 'modified': stamp[0] / 1e9}
+
+    sheet_names = sorted({name for source in sources.values() for name in source['sheet_names']})
+    return {
+        'filepaths': list(filepaths),
+        'sources': sources,
+        'sheet_names': sheet_names,
+        'etag': hashlib.sha1(json.dumps(sheet_names).encode('utf-8')).hexdigest(),
+        'last_modified': max((source['modified'] for source in sources.values()), default=None),
+    }
+
+def refresh_sheet_catalog(catalog):
+    """Returns `catalog` unchanged if none of its workbooks changed on disk, otherwise a refreshed copy."""
+    stamps = {filepath: file_stamp(filepath) for filepath in catalog['filepaths']}
+    current = {filepath: source['stamp'] for filepath, source in catalog['sources'].items()}
+    if {filepath: stamp for filepath, stamp in stamps.items() if stamp is not None} == current:
+        return catalog
+    return load_sheet_catalog(catalog['filepaths'], previous=catalog)
+
+def read_source_stamps(config):
+    """{price list path: [mtime_ns, size]} of the workbook versions the stored item rows were built from; {} if unknown."""
+    filepath = config.get('PRICE_LIST_STAMPS_FILE')
+    if not filepath or not os.path.exists(filepath):
+        return {}
+    try:
+        with open(filepath, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"Could not read price list stamps '{filepath}': {e}")
+        return {}
+
+def write_source_stamps(config, stamps):
+    filepath = config.get('PRICE_LIST_STAMPS_FILE')
+    if not filepath:
+        return
+    temp_path = f"{filepath}.tmp"
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        json.dump(stamps, f)
+    os.replace(temp_path, filepath)
+
 def process_and_index_data(config, sentence_model):
     """
     Orchestrates the processing of all data files (foreign items, local items, clients)
     and saves the generated indexes and data to disk.
     """
     print("Starting data processing and indexing from source files...")
+    # Taken before reading, so an edit saved during the build shows up as a newer version
+    source_stamps = {filepath: file_stamp(filepath) for filepath in (config['PRICE_LIST_FILE'], config['LOCAL_PRICE_LIST_FILE'])}
+    price_list_items = read_price_lists(
+        [(config['PRICE_LIST_FILE'], False), (config['LOCAL_PRICE_LIST_FILE'], True)],
+        workers=config.get('INGEST_WORKERS', 1),
+    )
     
     # Process Foreign Items
-    item_faiss_index, item_searchable_data = _process_excel_file(config['PRICE_LIST_FILE'], sentence_model, config['MARKUP'], is_local=False)
+    item_faiss_index, item_searchable_data = _process_excel_file(config['PRICE_LIST_FILE'], price_list_items[config['PRICE_LIST_FILE']], sentence_model, config, is_local=False)
     if item_faiss_index and item_searchable_data:
-        faiss.write_index(item_faiss_index, config['ITEM_FAISS_INDEX_FILE'])
-        with open(config['ITEM_SEARCH_DATA_FILE'], 'wb') as f:
-            pickle.dump(item_searchable_data, f)
+        write_faiss_index(item_faiss_index, config['ITEM_FAISS_INDEX_FILE'])
+        RowStore.write_columns(item_searchable_data, config['ITEM_SEARCH_DATA_FILE'])
+        _save_row_index(KeywordIndex, item_searchable_data, config['ITEM_KEYWORD_INDEX_FILE'])
+        _save_row_index(FacetIndex, item_searchable_data, config['ITEM_FACET_INDEX_FILE'])
         print("Foreign item search index created.")
     else:
         print("Failed to process foreign items or no data found.")
         
     # Process Local Items
-    local_item_faiss_index, local_item_searchable_data = _process_excel_file(config['LOCAL_PRICE_LIST_FILE'], sentence_model, config['MARKUP'], is_local=True)
+    local_item_faiss_index, local_item_searchable_data = _process_excel_file(config['LOCAL_PRICE_LIST_FILE'], price_list_items[config['LOCAL_PRICE_LIST_FILE']], sentence_model, config, is_local=True)
     if local_item_faiss_index and local_item_searchable_data:
-        faiss.write_index(local_item_faiss_index, config['LOCAL_ITEM_FAISS_INDEX_FILE'])
-        with open(config['LOCAL_ITEM_SEARCH_DATA_FILE'], 'wb') as f:
-            pickle.dump(local_item_searchable_data, f)
+        write_faiss_index(local_item_faiss_index, config['LOCAL_ITEM_FAISS_INDEX_FILE'])
+        RowStore.write_columns(local_item_searchable_data, config['LOCAL_ITEM_SEARCH_DATA_FILE'])
+        _save_row_index(KeywordIndex, local_item_searchable_data, config['LOCAL_ITEM_KEYWORD_INDEX_FILE'])
+        _save_row_index(FacetIndex, local_item_searchable_data, config['LOCAL_ITEM_FACET_INDEX_FILE'])
         print("Local item search index created.")
     else:
         print("Failed to process local items or no data found.")
@@ -191,29 +575,37 @@ def process_and_index_data(config, sentence_model):
         clients_df = pd.read_csv(config['CLIENTS_FILE'])
         clients_df['search_text'] = (clients_df['client_name'].fillna('') + ' ' + clients_df['client_address'].fillna('')).str.lower()
         client_searchable_data = clients_df.to_dict('records')
-        client_embeddings = sentence_model.encode(clients_df['search_text'].tolist(), convert_to_tensor=True).cpu().numpy()
-        client_faiss_index = faiss.IndexFlatL2(client_embeddings.shape[1])
-        client_faiss_index.add(client_embeddings)
+        client_embeddings = encode_with_embedding_store(sentence_model, clients_df['search_text'].tolist(), config.get('CLIENT_EMBEDDINGS_FILE'), encoder_name(config))
+        client_faiss_index = build_faiss_index(client_embeddings, config)
         
-        faiss.write_index(client_faiss_index, config['CLIENT_FAISS_INDEX_FILE'])
-        with open(config['CLIENT_SEARCH_DATA_FILE'], 'wb') as f:
-            pickle.dump(client_searchable_data, f)
+        write_faiss_index(client_faiss_index, config['CLIENT_FAISS_INDEX_FILE'])
+        RowStore.write(client_searchable_data, config['CLIENT_SEARCH_DATA_FILE'])
         print("Client search index created.")
     except Exception as e:
         print(f"Error processing client data: {e}")
         return False
-        
+
+    write_source_stamps(config, {filepath: list(stamp) for filepath, stamp in source_stamps.items() if stamp})
     return True
 
-def initialize_data(config, force_rebuild=False):
+SEARCH_BUNDLE_FIELDS = (
+    'build_id', 'built_at', 'sentence_model', 'model_name',
+    'item_faiss_index', 'item_searchable_data', 'item_keyword_index', 'item_facet_index',
+    'local_item_faiss_index', 'local_item_searchable_data', 'local_item_keyword_index', 'local_item_facet_index',
+    'client_faiss_index', 'client_searchable_data', 'filter_options', 'sheet_catalog', 'source_stamps',
+)
+
+# Everything one build produced, published to the app as a single immutable object.
+# SearchBundle() is the empty bundle served before the first build finishes.
+SearchBundle = namedtuple('SearchBundle', SEARCH_BUNDLE_FIELDS, defaults=(None,) * len(SEARCH_BUNDLE_FIELDS))
+
+def initialize_data(config, force_rebuild=False, build_id=None):
     """
-    Initializes all data for the application. It loads the sentence transformer model,
-    and then either loads the pre-built Faiss indexes from disk or rebuilds them
-    by calling process_and_index_data.
+    Initializes all data for the application. It gets the sentence transformer model
+    from the model registry, and then either loads the pre-built Faiss indexes from disk or rebuilds them
+    by calling process_and_index_data. Returns the loaded SearchBundle.
     """
-    # Print the model name being used to the terminal
-    print(f"Initializing sentence transformer with model: {config['MODEL_NAME']}")
-    sentence_model = SentenceTransformer(config['MODEL_NAME'], trust_remote_code=True)
+    sentence_model = model_registry.get(config)
     
     # Check if a rebuild is forced or if any of the essential index files are missing.
     rebuild_needed = force_rebuild or not all(os.path.exists(config[f]) for f in [
@@ -222,9 +614,16 @@ def initialize_data(config, force_rebuild=False):
         'CLIENT_FAISS_INDEX_FILE', 'CLIENT_SEARCH_DATA_FILE'
     ])
 
+    # The FAISS indexes hold the vectors of their embedding stores; after a switch of
+    # model, backend or model file they no longer match query vectors, so they are rebuilt
+    stale_stores = [filepath for filepath, name in stored_encoder_names(config).items() if name != encoder_name(config)]
+    if stale_stores and not force_rebuild:
+        print(f"Indexes were built with another encoder than '{encoder_name(config)}' ({', '.join(stale_stores)}). Rebuilding all data.")
+        rebuild_needed = True
+
     if rebuild_needed:
         if force_rebuild: print("Forcing a rebuild of all data indexes.")
-        else: print("One or more index files are missing. Rebuilding all data.")
+        elif not stale_stores: print("One or more index files are missing. Rebuilding all data.")
         success = process_and_index_data(config, sentence_model)
         if not success:
             raise Exception("Failed to build necessary data indexes.")
@@ -232,29 +631,44 @@ def initialize_data(config, force_rebuild=False):
     # Load all data and indexes into memory
     try:
         print("Loading data indexes from disk...")
-        item_faiss_index = faiss.read_index(config['ITEM_FAISS_INDEX_FILE'])
-        with open(config['ITEM_SEARCH_DATA_FILE'], 'rb') as f:
-            item_searchable_data = pickle.load(f)
+        item_faiss_index = read_faiss_index(config['ITEM_FAISS_INDEX_FILE'])
+        item_searchable_data = RowStore(config['ITEM_SEARCH_DATA_FILE'])
             
-        local_item_faiss_index = faiss.read_index(config['LOCAL_ITEM_FAISS_INDEX_FILE'])
-        with open(config['LOCAL_ITEM_SEARCH_DATA_FILE'], 'rb') as f:
-            local_item_searchable_data = pickle.load(f)
+        local_item_faiss_index = read_faiss_index(config['LOCAL_ITEM_FAISS_INDEX_FILE'])
+        local_item_searchable_data = RowStore(config['LOCAL_ITEM_SEARCH_DATA_FILE'])
+
+        item_keyword_index = _load_row_index(KeywordIndex, config['ITEM_KEYWORD_INDEX_FILE'], item_searchable_data)
+        item_facet_index = _load_row_index(FacetIndex, config['ITEM_FACET_INDEX_FILE'], item_searchable_data)
+        local_item_keyword_index = _load_row_index(KeywordIndex, config['LOCAL_ITEM_KEYWORD_INDEX_FILE'], local_item_searchable_data)
+        local_item_facet_index = _load_row_index(FacetIndex, config['LOCAL_ITEM_FACET_INDEX_FILE'], local_item_searchable_data)
 
-        client_faiss_index = faiss.read_index(config['CLIENT_FAISS_INDEX_FILE'])
-        with open(config['CLIENT_SEARCH_DATA_FILE'], 'rb') as f:
-            client_searchable_data = pickle.load(f)
+        client_faiss_index = read_faiss_index(config['CLIENT_FAISS_INDEX_FILE'])
+        client_searchable_data = RowStore(config['CLIENT_SEARCH_DATA_FILE'])
             
+        for faiss_index in (item_faiss_index, local_item_faiss_index, client_faiss_index):
+            apply_faiss_search_params(faiss_index, config.get('FAISS_SEARCH_PARAMS'))
+
         print(f"Indexes loaded: Foreign Items ({item_faiss_index.ntotal}), Local Items ({local_item_faiss_index.ntotal}), Clients ({client_faiss_index.ntotal}).")
         
-        return {
-            "sentence_model": sentence_model,
-            "item_faiss_index": item_faiss_index,
-            "item_searchable_data": item_searchable_data,
-            "local_item_faiss_index": local_item_faiss_index,
-            "local_item_searchable_data": local_item_searchable_data,
-            "client_faiss_index": client_faiss_index,
-            "client_searchable_data": client_searchable_data,
-        }
+        return SearchBundle(
+            build_id=build_id or datetime.now().strftime('%Y%m%d%H%M%S%f'),
+            built_at=datetime.now().isoformat(),
+            sentence_model=sentence_model,
+            model_name=encoder_name(config),
+            item_faiss_index=item_faiss_index,
+            item_searchable_data=item_searchable_data,
+            item_keyword_index=item_keyword_index,
+            item_facet_index=item_facet_index,
+            local_item_faiss_index=local_item_faiss_index,
+            local_item_searchable_data=local_item_searchable_data,
+            local_item_keyword_index=local_item_keyword_index,
+            local_item_facet_index=local_item_facet_index,
+            client_faiss_index=client_faiss_index,
+            client_searchable_data=client_searchable_data,
+            filter_options=build_filter_options([item_facet_index, local_item_facet_index]),
+            sheet_catalog=load_sheet_catalog([config['PRICE_LIST_FILE'], config['LOCAL_PRICE_LIST_FILE']]),
+            source_stamps=read_source_stamps(config),
+        )
         
     except Exception as e:
         print(f"A critical error occurred while loading data indexes: {e}")
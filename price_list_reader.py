@@ -0,0 +1,146 @@
+# price_list_reader.py
+# Price-list sheet parsing for the indexer. It runs in ingestion worker
+# processes, so it only imports what those need.
+import html
+import pandas as pd
+from openpyxl import load_workbook
+
+def openpyxl_rich_text_to_html(cell):
+    """
+    Safely converts a cell's value (including rich text with multiple formats)
+    into a single HTML string.
+    """
+    if cell.value is None:
+        return ""
+
+    # Handle cells with rich text (multiple formatting parts)
+    if cell.data_type == 'r' and isinstance(cell.value, (list, tuple)):
+        html_parts = []
+        for part in cell.value:
+            text = getattr(part, 'text', str(part))
+            font = getattr(part, 'font', None)
+            
+            if text is None:
+                continue
+
+            text = html.escape(str(text)).replace('\n', '<br>')
+            
+            styles = []
+            if font:
+                if font.bold:
+                    styles.append('font-weight: bold;')
+                if font.italic:
+                    styles.append('font-style: italic;')
+                
+                # Safely handle font color
+                if font.color and hasattr(font.color, 'rgb') and font.color.rgb:
+                    rgb_value = font.color.rgb
+                    if isinstance(rgb_value, str) and len(rgb_value) >= 6:
+                        # Get RRGGBB part from AARRGGBB or RRGGBB
+                        color_hex = rgb_value[-6:]
+                        if color_hex.lower() != '000000': # Don't style default black text
+                            styles.append(f'color: #{color_hex};')
+
+            if styles:
+                html_parts.append(f'<span style="{" ".join(styles)}">{text}</span>')
+            else:
+                html_parts.append(text)
+        return "".join(html_parts)
+    
+    # Fallback for non-rich-text cells that may still have cell-level formatting
+    text = html.escape(str(cell.value)).replace('\n', '<br>')
+    styles = []
+    if cell.font:
+        if cell.font.bold:
+            styles.append('font-weight: bold;')
+        if cell.font.italic:
+            styles.append('font-style: italic;')
+        if cell.font.color and hasattr(cell.font.color, 'rgb') and cell.font.color.rgb:
+            rgb_value = cell.font.color.rgb
+            if isinstance(rgb_value, str) and len(rgb_value) >= 6:
+                color_hex = rgb_value[-6:]
+                if color_hex.lower() != '000000':
+                    styles.append(f'color: #{color_hex};')
+
+    if styles:
+        return f'<span style="{" ".join(styles)}">{text}</span>'
+    
+    return text
+
+
+PRICE_LIST_OPTIONAL_COLUMNS = ['item_code', 'make', 'approvals', 'model', 'installation', 'unit']
+# _source_row (the sheet row an item came from) is stored hidden, to map workbook edits back to row ids
+PRICE_LIST_COLUMNS = ['product_type', 'description', 'po_price'] + PRICE_LIST_OPTIONAL_COLUMNS + ['_source_row']
+
+def read_price_list_sheet(filepath, sheet_name, is_local=False):
+    """
+    Streams one price-list sheet in read-only mode and returns its item rows as
+    a {column: values} dict, plus the sheet's item_code -> row map for the item
+    location index. Read-only cells still carry their font, which is all
+    openpyxl_rich_text_to_html uses for descriptions. Runs inside an ingestion
+    worker process.
+    """
+    columns = {name: [] for name in PRICE_LIST_COLUMNS}
+    item_rows = {}
+    wb = load_workbook(filepath, read_only=True, data_only=True)
+    try:
+        ws = wb[sheet_name]
+        rows = ws.iter_rows()
+        # Ensure header is read as plain strings
+        header = [str(cell.value).strip() if cell.value is not None else '' for cell in next(rows, ())]
+
+        lower_header = [name.lower() for name in header]
+        item_code_col_idx = lower_header.index('item_code') if 'item_code' in lower_header else -1
+
+        def value(row, col_idx):
+            # Read-only rows stop at the last stored cell, so trailing columns may be absent
+            return row[col_idx].value if 0 <= col_idx < len(row) else None
+
+        # Find column indices
+        try:
+            desc_col_idx = header.index('description')
+            po_price_col_idx = header.index('po_price')
+        except ValueError:
+            print(f"Skipping sheet '{sheet_name}' in '{filepath}' due to missing 'description' or 'po_price' column.")
+            if item_code_col_idx != -1:
+                for row_idx, row in enumerate(rows, start=2):
+                    if value(row, item_code_col_idx):
+                        item_rows.setdefault(str(value(row, item_code_col_idx)).strip(), row_idx)
+            return columns, item_rows
+
+        # Map other columns, defaulting to None if not found
+        col_map = {col: (header.index(col) if col in header else -1) for col in PRICE_LIST_OPTIONAL_COLUMNS}
+
+        description_cells, po_prices, row_numbers = [], [], []
+        raw_values = {col: [] for col in PRICE_LIST_OPTIONAL_COLUMNS}
+        for row_idx, row in enumerate(rows, start=2):
+            if value(row, item_code_col_idx):
+                item_rows.setdefault(str(value(row, item_code_col_idx)).strip(), row_idx)
+            # Skip empty rows
+            if desc_col_idx >= len(row) or not row[desc_col_idx].value:
+                continue
+            description_cells.append(row[desc_col_idx])
+            po_prices.append(value(row, po_price_col_idx))
+            row_numbers.append(row_idx)
+            for col, col_idx in col_map.items():
+                raw_values[col].append(value(row, col_idx))
+    finally:
+        wb.close()
+
+    # Keep rows with a positive price, checked over the whole column at once
+    keep = (pd.to_numeric(pd.Series(po_prices, dtype=object), errors='coerce') > 0).tolist()
+    kept = [pos for pos, flag in enumerate(keep) if flag]
+
+    columns['product_type'] = [sheet_name] * len(kept)
+    # Rich-text conversion is only paid for the rows that are kept
+    columns['description'] = [openpyxl_rich_text_to_html(description_cells[pos]) for pos in kept]
+    columns['po_price'] = [po_prices[pos] for pos in kept]
+    columns['_source_row'] = [row_numbers[pos] for pos in kept]
+    for col in PRICE_LIST_OPTIONAL_COLUMNS:
+        if col_map[col] != -1:
+            columns[col] = [raw_values[col][pos] for pos in kept]
+        elif col == 'item_code':
+            columns[col] = [f"local_{row_numbers[pos]}" if is_local else None for pos in kept]
+        else:
+            columns[col] = ['Pcs' if col == 'unit' else None] * len(kept)
+    return columns, item_rows
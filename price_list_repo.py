@@ -0,0 +1,209 @@
+# price_list_repo.py
+import os
+import json
+import time
+import threading
+from contextlib import contextmanager
+from openpyxl import load_workbook
+
+
+def file_stamp(filepath):
+    """(mtime_ns, size) of a file, or None if it does not exist."""
+    try:
+        stat = os.stat(filepath)
+    except OSError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size)
+
+
+def item_code_column(ws):
+    """0-based index of a sheet's item_code column, or -1 if it has none."""
+    header = [str(cell.value).lower().strip() if cell.value is not None else '' for cell in ws[1]]
+    return header.index('item_code') if 'item_code' in header else -1
+
+
+def scan_item_rows(ws):
+    """Maps each item code of a sheet to the first row holding it."""
+    item_code_col_idx = item_code_column(ws)
+    rows = {}
+    if item_code_col_idx == -1:
+        return rows
+    for row_idx, row in enumerate(ws.iter_rows(min_row=2, values_only=True), start=2):
+        if item_code_col_idx < len(row) and row[item_code_col_idx]:
+            rows.setdefault(str(row[item_code_col_idx]).strip(), row_idx)
+    return rows
+
+
+class PriceListEdit:
+    """
+    The workbook being edited inside PriceListRepository.edit(). Set `changed` to
+    have it saved. Rows are found through the repository's item location index;
+    edits that add rows or shift row numbers must report it here. `stamp` is the
+    (mtime, size) of the file version being edited, `saved_stamp` that of the
+    version written when the edit is saved (None until then).
+    """
+
+    def __init__(self, workbook, sheet_rows, stamp=None):
+        self.workbook = workbook
+        self.changed = False
+        self.stamp = stamp
+        self.saved_stamp = None
+        self._sheet_rows = sheet_rows
+
+    def item_rows(self, ws):
+        """The item_code -> row map of a sheet, scanned only if the index has no current map for it."""
+        if ws.title not in self._sheet_rows:
+            self._sheet_rows[ws.title] = scan_item_rows(ws)
+        return self._sheet_rows[ws.title]
+
+    def find_item(self, item_code):
+        """Returns (worksheet, row) of the first sheet holding `item_code`, or (None, None)."""
+        item_code = str(item_code).strip()
+        for ws in self.workbook.worksheets:
+            row_idx = self.item_rows(ws).get(item_code)
+            if row_idx is not None:
+                return ws, row_idx
+        return None, None
+
+    def row_added(self, ws, item_code, row_idx):
+        self.item_rows(ws).setdefault(str(item_code).strip(), row_idx)
+
+    def rows_renumbered(self, ws):
+        """Call after inserting or deleting rows; only this sheet's map is rebuilt."""
+        self._sheet_rows.pop(ws.title, None)
+
+
+class PriceListRepository:
+    """
+    Owns the price-list workbooks used by the admin write paths.
+
+    A parsed workbook is kept in memory together with the (mtime, size) it was
+    read at, and is only parsed again when the file changes on disk or has not
+    been used for `max_idle_seconds`. Reads and edits of one file are serialized
+    by a per-file lock, and saves go through a temporary file and os.replace, so
+    readers (including the indexer) never see a half-written workbook.
+
+    It also keeps the item location index: per file, the (mtime, size) it
+    describes and an item_code -> row map per sheet. Ingestion records it while
+    parsing and every edit keeps it current, so edits jump straight to a row.
+    It is persisted to `location_index_file` when that is set.
+    """
+
+    def __init__(self, max_idle_seconds=300, location_index_file=None):
+        self.max_idle_seconds = max_idle_seconds
+        self.location_index_file = location_index_file
+        self._entries = {}
+        self._locks = {}
+        self._locations = None
+        self._guard = threading.Lock()
+
+    def _lock_for(self, filepath):
+        with self._guard:
+            return self._locks.setdefault(os.path.abspath(filepath), threading.RLock())
+
+    def _expire_idle(self):
+        now = time.monotonic()
+        with self._guard:
+            for key in [key for key, entry in self._entries.items() if now - entry['used'] > self.max_idle_seconds]:
+                del self._entries[key]
+
+    def _workbook(self, filepath):
+        # Called with the file's lock held
+        self._expire_idle()
+        key = os.path.abspath(filepath)
+        stamp = file_stamp(filepath)
+        with self._guard:
+            entry = self._entries.get(key)
+        if entry is None or entry['stamp'] != stamp:
+            entry = {'stamp': stamp, 'workbook': load_workbook(filepath)}
+        entry['used'] = time.monotonic()
+        with self._guard:
+            self._entries[key] = entry
+        return entry['workbook']
+
+    def _discard(self, filepath):
+        with self._guard:
+            self._entries.pop(os.path.abspath(filepath), None)
+
+    def _save(self, filepath, workbook, sheet_rows):
+        temp_path = f"{filepath}.tmp"
+        workbook.save(temp_path)
+        os.replace(temp_path, filepath)
+        stamp = file_stamp(filepath)
+        with self._guard:
+            entry = self._entries.get(os.path.abspath(filepath))
+            if entry is not None:
+                entry['stamp'] = stamp
+        self.record_item_locations(filepath, stamp, sheet_rows)
+        return stamp
+
+    def _load_locations(self):
+        # Called with self._guard held
+        if self._locations is None:
+            self._locations = {}
+            if self.location_index_file and os.path.exists(self.location_index_file):
+                try:
+                    with open(self.location_index_file, 'r', encoding='utf-8') as f:
+                        self._locations = json.load(f)
+                except (OSError, ValueError) as e:
+                    print(f"Could not read item location index '{self.location_index_file}', it will be rebuilt: {e}")
+        return self._locations
+
+    def _sheet_rows(self, filepath, stamp):
+        """A working copy of the per-sheet item maps of `filepath`, empty if they describe another version of it."""
+        with self._guard:
+            location = self._load_locations().get(os.path.abspath(filepath))
+            if location is None or tuple(location['stamp']) != tuple(stamp):
+                return {}
+            return {sheet: dict(rows) for sheet, rows in location['sheets'].items()}
+
+    def record_item_locations(self, filepath, stamp, sheet_rows):
+        """Stores the item_code -> row maps of a file's sheets as of the file version `stamp`."""
+        with self._guard:
+            locations = self._load_locations()
+            locations[os.path.abspath(filepath)] = {'stamp': list(stamp) if stamp else None, 'sheets': sheet_rows}
+            if self.location_index_file:
+                temp_path = f"{self.location_index_file}.tmp"
+                with open(temp_path, 'w', encoding='utf-8') as f:
+                    json.dump(locations, f)
+                os.replace(temp_path, self.location_index_file)
+
+    @contextmanager
+    def edit(self, filepath):
+        """
+        Yields a PriceListEdit for `filepath` while holding the file's lock.
+        The workbook is saved when the block completes with `changed` set. If the
+        block raises, the cached copy is dropped, since it may be half-modified.
+        """
+        with self._lock_for(filepath):
+            workbook = self._workbook(filepath)
+            with self._guard:
+                stamp = self._entries[os.path.abspath(filepath)]['stamp']
+            edit = PriceListEdit(workbook, self._sheet_rows(filepath, stamp), stamp)
+            try:
+                yield edit
+                if edit.changed:
+                    edit.saved_stamp = self._save(filepath, edit.workbook, edit._sheet_rows)
+            except BaseException:
+                self._discard(filepath)
+                raise
+
+    def sheet_names(self, filepath):
+        """
+        Sheet names of a price list, taken from the cached workbook when it is
+        current, otherwise from a read-only peek that does not parse the cells.
+        """
+        key = os.path.abspath(filepath)
+        with self._guard:
+            entry = self._entries.get(key)
+        if entry is not None and entry['stamp'] == file_stamp(filepath):
+            return list(entry['workbook'].sheetnames)
+        wb = load_workbook(filepath, read_only=True, keep_vba=False)
+        try:
+            return list(wb.sheetnames)
+        finally:
+            wb.close()
+
+
+# Shared by the app and data_management; app.py sets max_idle_seconds from CONFIG
+price_lists = PriceListRepository()
@@ -0,0 +1,233 @@
+# project_catalog.py
+import os
+import re
+import json
+import threading
+from datetime import datetime
+
+from price_list_repo import file_stamp
+
+# query() owner filter that matches every project
+ANY_OWNER = object()
+
+# The columns of a listing row, in the order they are returned
+SUMMARY_FIELDS = ('projectId', 'referenceNumber', 'clientName', 'dateModified', 'productTypes', 'status', 'projectType', 'owner_email')
+
+# Bumped whenever the shape of the summary rows changes, so a persisted catalog is rebuilt
+CATALOG_VERSION = 2
+
+NUMBER_RUN_RE = re.compile(r'(\d+)')
+
+
+def natural_key(text):
+    """Sort key that orders the digit runs of a reference by value, e.g. REF-9 before REF-10."""
+    return [int(part) if part.isdigit() else part.lower() for part in NUMBER_RUN_RE.split(text or '')]
+
+
+# sort parameter -> (row key, descending)
+SORT_ORDERS = {
+    'date_desc': (lambda p: p['dateModified'] or '', True),
+    'date_asc': (lambda p: p['dateModified'] or '', False),
+    'ref_asc': (lambda p: natural_key(p['referenceNumber']), False),
+    'ref_desc': (lambda p: natural_key(p['referenceNumber']), True),
+}
+
+
+def project_items(data):
+    """All items of a project, whether it keeps them in sheets (offers) or a flat list."""
+    if data.get('projectType', 'offer') == 'offer' and 'sheets' in data:
+        return [item for sheet in data.get('sheets', []) for item in sheet.get('items', [])]
+    return data.get('items', [])
+
+
+def summarize_project(data):
+    """
+    The listing row of a project (SUMMARY_FIELDS) plus `displayReference`, the
+    generated reference (e.g. DC_... for challans) that searches also match.
+    Fields the document sets itself (its raw reference, status, ...) take
+    precedence over the generated ones, as they always have in the listings.
+    """
+    project_type = data.get('projectType', 'offer')
+    reference_number_display = data.get('referenceNumber', 'N/A')
+    client_name_display = data.get('client', {}).get('name', 'N/A')
+    all_items = project_items(data)
+
+    if project_type == 'challan':
+        client_name = data.get('client', {}).get('name', 'NOCLIENT')
+        all_cats = set(i.get('make') for i in all_items)
+        cats = sorted([str(c) for c in all_cats if c])
+        cats_part = '_'.join(cats) if cats else 'MISC'
+        abbreviation = ''.join(word[0] for word in client_name.split()).upper()
+        client_part = ''.join(filter(str.isalnum, abbreviation))[:4]
+        date_part = datetime.fromisoformat(data.get('lastModified')).strftime('%d-%b-%Y')
+        reference_number_display = f"DC_{data.get('referenceNumber')}_{client_part}_{cats_part}_{date_part}"
+        product_types_display = cats
+    elif project_type == 'ai_helper':
+        reference_number_display = f"[AI] {data.get('referenceNumber', 'Untitled')}"
+        client_name_display = "N/A"
+        product_types_display = ["AI Processed"]
+    else:
+        all_product_types = set(i.get('product_type', 'N/A') for i in all_items)
+        product_types_display = sorted([str(m) for m in all_product_types if m and m != 'N/A'])
+
+    summary = {
+        'projectId': data.get('projectId'),
+        'referenceNumber': reference_number_display,
+        'clientName': client_name_display,
+        'dateModified': data.get('lastModified'),
+        'productTypes': ', '.join(product_types_display),
+        'status': data.get('status', 'Pending'),
+        'projectType': project_type,
+        'owner_email': data.get('owner_email'),
+    }
+    summary.update((field, data[field]) for field in ('projectId', 'referenceNumber', 'status', 'projectType') if field in data)
+    summary['displayReference'] = reference_number_display
+    return summary
+
+
+def filter_and_sort(summaries, owner_email=ANY_OWNER, search_term='', project_type=None, sort='date_desc'):
+    """
+    Summary rows ordered by one of SORT_ORDERS, optionally restricted to one
+    owner, one project type, and to rows whose reference, generated reference
+    or client name contains `search_term` (lower-cased).
+    """
+    results = []
+    for summary in summaries:
+        if owner_email is not ANY_OWNER and summary['owner_email'] != owner_email:
+            continue
+        if project_type and summary['projectType'] != project_type:
+            continue
+        if search_term and not any(search_term in str(summary[field] or '').lower() for field in ('displayReference', 'referenceNumber', 'clientName')):
+            continue
+        results.append(summary)
+
+    # Ties are broken newest first, then by id, so pages stay stable between requests
+    sort_key, descending = SORT_ORDERS[sort]
+    results.sort(key=lambda p: str(p['projectId']))
+    if sort_key is not SORT_ORDERS['date_desc'][0]:
+        results.sort(key=SORT_ORDERS['date_desc'][0], reverse=True)
+    results.sort(key=sort_key, reverse=descending)
+    return results
+
+
+class ProjectCatalog:
+    """
+    One summary row per saved project, so listings do not open every project file.
+
+    Rows are keyed by file name stem and carry the (mtime, size) of the file they
+    were built from. FileProjectStore reports every save and delete; on first
+    use, and whenever the directory itself changes (a file added or removed behind
+    the app's back), the catalog is reconciled against PROJECTS_DIR by stat and
+    only new or changed files are parsed again. Queries reconcile every time:
+    another process (a second server worker, a script) may rewrite a project in
+    place, which leaves the directory's mtime alone. That costs one stat per
+    project per listing. Reconciled catalogs are persisted to `catalog_file`
+    when that is set, so a restart does not re-read every project.
+    """
+
+    def __init__(self, projects_dir=None, catalog_file=None):
+        self.projects_dir = projects_dir
+        self.catalog_file = catalog_file
+        self._rows = None
+        self._directory_stamp = None
+        self._lock = threading.RLock()
+
+    def _filepath(self, project_id):
+        return os.path.join(self.projects_dir, f"{project_id}.json")
+
+    def _summarize_file(self, project_id):
+        filepath = self._filepath(project_id)
+        stamp = file_stamp(filepath)
+        try:
+            with open(filepath, 'r', encoding='utf-8') as f:
+                summary = summarize_project(json.load(f))
+        except Exception as e:
+            print(f"Error processing project file {project_id}.json: {e}")
+            summary = None
+        return {'stamp': list(stamp) if stamp else None, 'summary': summary}
+
+    def _persist(self):
+        if not self.catalog_file:
+            return
+        temp_path = f"{self.catalog_file}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump({'version': CATALOG_VERSION, 'projects': self._rows}, f)
+        os.replace(temp_path, self.catalog_file)
+
+    def _load(self, check_files=False):
+        # Called with the lock held; check_files reconciles even if the directory is unchanged
+        if self._rows is None:
+            self._rows = {}
+            if self.catalog_file and os.path.exists(self.catalog_file):
+                try:
+                    with open(self.catalog_file, 'r', encoding='utf-8') as f:
+                        catalog = json.load(f)
+                    if catalog.get('version') == CATALOG_VERSION:
+                        self._rows = catalog['projects']
+                except (OSError, ValueError, AttributeError) as e:
+                    print(f"Could not read project catalog '{self.catalog_file}', it will be rebuilt: {e}")
+        directory_stamp = os.stat(self.projects_dir).st_mtime_ns
+        if check_files or directory_stamp != self._directory_stamp:
+            self._reconcile()
+            self._directory_stamp = directory_stamp
+
+    def _reconcile(self):
+        # The same (mtime_ns, size) as file_stamp(), as stored in the rows, from one directory scan
+        stamps = {}
+        with os.scandir(self.projects_dir) as entries:
+            for entry in entries:
+                if entry.name.endswith('.json'):
+                    try:
+                        stat = entry.stat()
+                    except OSError:
+                        continue
+                    stamps[entry.name[:-len('.json')]] = [stat.st_mtime_ns, stat.st_size]
+        changed = False
+        for project_id in list(self._rows):
+            if project_id not in stamps:
+                del self._rows[project_id]
+                changed = True
+        for project_id, stamp in stamps.items():
+            row = self._rows.get(project_id)
+            if row is None or row['stamp'] != stamp:
+                self._rows[project_id] = self._summarize_file(project_id)
+                changed = True
+        if changed:
+            self._persist()
+
+    def _mark_directory_current(self):
+        self._directory_stamp = os.stat(self.projects_dir).st_mtime_ns
+
+    def project_saved(self, project_id, data):
+        """
+        Call after writing a project file, with the document that was written.
+        The persisted catalog is not rewritten here: after a restart the file's
+        stamp no longer matches, so reconciling parses just the files saved since.
+        """
+        with self._lock:
+            self._load()
+            try:
+                summary = summarize_project(data)
+            except Exception as e:
+                print(f"Error processing project file {project_id}.json: {e}")
+                summary = None
+            stamp = file_stamp(self._filepath(project_id))
+            self._rows[project_id] = {'stamp': list(stamp) if stamp else None, 'summary': summary}
+            self._mark_directory_current()
+
+    def project_deleted(self, project_id):
+        with self._lock:
+            self._load()
+            self._rows.pop(project_id, None)
+            self._mark_directory_current()
+
+    def query(self, owner_email=ANY_OWNER, search_term='', project_type=None, sort='date_desc'):
+        """Summary rows selected and ordered as described in filter_and_sort()."""
+        with self._lock:
+            self._load(check_files=True)
+            rows = [row['summary'] for row in self._rows.values() if row['summary']]
+        return filter_and_sort(rows, owner_email=owner_email, search_term=search_term, project_type=project_type, sort=sort)
+
+
+# Shared project catalog; app.py points it at PROJECTS_DIR and its catalog file
+projects = ProjectCatalog()
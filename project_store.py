@@ -0,0 +1,230 @@
+# project_store.py
+import os
+import json
+import sqlite3
+import threading
+from datetime import datetime
+
+from project_catalog import ANY_OWNER, filter_and_sort, summarize_project
+
+# Listing fields a search matches, as in project_catalog.filter_and_sort()
+SEARCH_FIELDS = ('displayReference', 'referenceNumber', 'clientName')
+
+# The date orders of filter_and_sort() in SQL: ties newest first, then by id
+SQL_DATE_ORDERS = {
+    'date_desc': "last_modified DESC, project_id",
+    'date_asc': "last_modified ASC, project_id",
+}
+
+
+class FileProjectStore:
+    """
+    Project documents as one JSON file per project in `projects_dir`, the original
+    layout. Listings are answered by the ProjectCatalog kept alongside it.
+    """
+
+    def __init__(self, projects_dir, catalog):
+        self.projects_dir = projects_dir
+        self.catalog = catalog
+        self._lock = threading.Lock()
+
+    def _filepath(self, project_id):
+        return os.path.join(self.projects_dir, f"{project_id}.json")
+
+    def exists(self, project_id):
+        return os.path.exists(self._filepath(project_id))
+
+    def load(self, project_id):
+        """The project document, or None if there is no such project."""
+        try:
+            with open(self._filepath(project_id), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def save(self, project_id, data):
+        with self._lock:
+            with open(self._filepath(project_id), 'w', encoding='utf-8') as f:
+                json.dump(data, f, indent=4)
+            self.catalog.project_saved(project_id, data)
+
+    def update(self, project_id, changes):
+        """Applies {field: value} to a stored project and returns the new document, or None if it does not exist."""
+        with self._lock:
+            data = self.load(project_id)
+            if data is None:
+                return None
+            data.update(changes)
+            with open(self._filepath(project_id), 'w', encoding='utf-8') as f:
+                json.dump(data, f, indent=4)
+            self.catalog.project_saved(project_id, data)
+            return data
+
+    def delete(self, project_id):
+        with self._lock:
+            os.remove(self._filepath(project_id))
+            self.catalog.project_deleted(project_id)
+
+    def page(self, owner_email=ANY_OWNER, search_term='', project_type=None, sort='date_desc', offset=0, limit=None):
+        """(number of matches, listing rows offset..offset+limit) as selected by project_catalog.filter_and_sort()."""
+        matches = self.catalog.query(owner_email=owner_email, search_term=search_term, project_type=project_type, sort=sort)
+        return len(matches), matches[offset:None if limit is None else offset + limit]
+
+
+class SqliteProjectStore:
+    """
+    Project documents in a local SQLite database (WAL mode), one row per project.
+
+    The document is stored as JSON text; owner, type, status and lastModified are
+    stored generated columns over it (JSON1 json_extract) with indexes, so listings seek
+    on them instead of scanning. The listing row and its lower-cased search text
+    are stored next to the document and rewritten in the same transaction, so the
+    three never disagree. Each thread gets its own connection.
+
+    With `migrate_from` set, the first connection imports every project file of
+    that directory once (the files are left in place), and records that it did.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS projects (
+            project_id TEXT PRIMARY KEY,
+            summary TEXT,
+            search_text TEXT,
+            created_at TEXT NOT NULL,
+            owner_email TEXT GENERATED ALWAYS AS (json_extract(document, '$.owner_email')) STORED,
+            project_type TEXT GENERATED ALWAYS AS (coalesce(json_extract(document, '$.projectType'), 'offer')) STORED,
+            status TEXT GENERATED ALWAYS AS (coalesce(json_extract(document, '$.status'), 'Pending')) STORED,
+            last_modified TEXT GENERATED ALWAYS AS (json_extract(document, '$.lastModified')) STORED,
+            -- Last, so listings read the small columns without walking the document's overflow pages
+            document TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS projects_owner ON projects (owner_email, last_modified);
+        CREATE INDEX IF NOT EXISTS projects_type ON projects (project_type, last_modified);
+        CREATE INDEX IF NOT EXISTS projects_status ON projects (status);
+        CREATE INDEX IF NOT EXISTS projects_last_modified ON projects (last_modified);
+        CREATE TABLE IF NOT EXISTS store_meta (key TEXT PRIMARY KEY, value TEXT);
+    """
+
+    def __init__(self, db_file, migrate_from=None):
+        self.db_file = db_file
+        self.migrate_from = migrate_from
+        self._local = threading.local()
+        self._setup_lock = threading.Lock()
+        self._ready = False
+
+    def _connection(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.db_file, timeout=30)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            self._local.connection = connection
+            with self._setup_lock:
+                if not self._ready:
+                    with connection:
+                        connection.executescript(self.SCHEMA)
+                    if self.migrate_from:
+                        self._migrate_directory(connection, self.migrate_from)
+                    self._ready = True
+        return connection
+
+    @staticmethod
+    def _summary_columns(project_id, data):
+        """(listing row as JSON, search text) of a document, or (None, None) if it cannot be summarized."""
+        try:
+            summary = summarize_project(data)
+        except Exception as e:
+            print(f"Error processing project {project_id}: {e}")
+            return None, None
+        search_text = '\n'.join(str(summary[field] or '').lower() for field in SEARCH_FIELDS)
+        return json.dumps(summary), search_text
+
+    def _migrate_directory(self, connection, projects_dir):
+        if connection.execute("SELECT 1 FROM store_meta WHERE key = 'migrated_from'").fetchone():
+            return
+        imported = 0
+        with connection:
+            for filename in sorted(os.listdir(projects_dir)) if os.path.isdir(projects_dir) else []:
+                if not filename.endswith('.json'):
+                    continue
+                project_id = filename[:-len('.json')]
+                try:
+                    with open(os.path.join(projects_dir, filename), 'r', encoding='utf-8') as f:
+                        data = json.load(f)
+                except Exception as e:
+                    print(f"Skipping project file {filename} during migration: {e}")
+                    continue
+                # A project already saved to the database is newer than its file
+                cursor = connection.execute(
+                    "INSERT OR IGNORE INTO projects (project_id, document, summary, search_text, created_at) VALUES (?, ?, ?, ?, ?)",
+                    (project_id, json.dumps(data), *self._summary_columns(project_id, data), datetime.now().isoformat()))
+                imported += cursor.rowcount
+            connection.execute("INSERT INTO store_meta (key, value) VALUES ('migrated_from', ?)",
+                               (json.dumps({'directory': os.path.abspath(projects_dir), 'projects': imported, 'at': datetime.now().isoformat()}),))
+        print(f"Migrated {imported} project(s) from '{projects_dir}' into '{self.db_file}'.")
+
+    def exists(self, project_id):
+        return self._connection().execute("SELECT 1 FROM projects WHERE project_id = ?", (project_id,)).fetchone() is not None
+
+    def load(self, project_id):
+        """The project document, or None if there is no such project."""
+        row = self._connection().execute("SELECT document FROM projects WHERE project_id = ?", (project_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def save(self, project_id, data):
+        connection = self._connection()
+        with connection:
+            connection.execute(
+                "INSERT INTO projects (project_id, document, summary, search_text, created_at) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT (project_id) DO UPDATE SET document = excluded.document, summary = excluded.summary, search_text = excluded.search_text",
+                (project_id, json.dumps(data), *self._summary_columns(project_id, data), datetime.now().isoformat()))
+
+    def update(self, project_id, changes):
+        """Applies {field: value} to a stored project and returns the new document, or None if it does not exist."""
+        connection = self._connection()
+        with connection:
+            # BEGIN IMMEDIATE takes the write lock before the read, so concurrent updates cannot interleave
+            connection.execute('BEGIN IMMEDIATE')
+            row = connection.execute("SELECT document FROM projects WHERE project_id = ?", (project_id,)).fetchone()
+            if row is None:
+                return None
+            data = json.loads(row[0])
+            data.update(changes)
+            connection.execute("UPDATE projects SET document = ?, summary = ?, search_text = ? WHERE project_id = ?",
+                               (json.dumps(data), *self._summary_columns(project_id, data), project_id))
+        return data
+
+    def delete(self, project_id):
+        connection = self._connection()
+        with connection:
+            connection.execute("DELETE FROM projects WHERE project_id = ?", (project_id,))
+
+    def page(self, owner_email=ANY_OWNER, search_term='', project_type=None, sort='date_desc', offset=0, limit=None):
+        """
+        (number of matches, listing rows offset..offset+limit), selected and ordered
+        as project_catalog.filter_and_sort() would. Owner and type are index seeks;
+        date orders are paged in SQL, so only the returned rows are decoded.
+        """
+        where = "summary IS NOT NULL"
+        params = []
+        if owner_email is not ANY_OWNER:
+            where += " AND owner_email IS ?"
+            params.append(owner_email)
+        if project_type:
+            where += " AND project_type = ?"
+            params.append(project_type)
+        if search_term:
+            where += " AND instr(search_text, ?) > 0"
+            params.append(search_term)
+        connection = self._connection()
+
+        if sort not in SQL_DATE_ORDERS:
+            summaries = [json.loads(summary) for (summary,) in connection.execute(f"SELECT summary FROM projects WHERE {where}", params)]
+            matches = filter_and_sort(summaries, sort=sort)
+            return len(matches), matches[offset:None if limit is None else offset + limit]
+
+        total = connection.execute(f"SELECT count(*) FROM projects WHERE {where}", params).fetchone()[0]
+        rows = connection.execute(
+            f"SELECT summary FROM projects WHERE {where} ORDER BY {SQL_DATE_ORDERS[sort]} LIMIT ? OFFSET ?",
+            params + [-1 if limit is None else limit, offset])
+        return total, [json.loads(summary) for (summary,) in rows]
@@ -0,0 +1,346 @@
+# search_index.py
+import os
+import sys
+import re
+import json
+from array import array
+from collections import namedtuple
+import numpy as np
+
+TOKEN_SPLIT_RE = re.compile(r'[^a-z0-9]+')
+MAX_GRAM_SIZE = 3
+
+
+def tokenize(text):
+    """Splits lower-cased text into the alphanumeric runs used for keyword search."""
+    if not text:
+        return []
+    return [token for token in TOKEN_SPLIT_RE.split(str(text).lower()) if token]
+
+
+def column_values(rows, name, default=None):
+    """
+    Returns one column of row data, given either as a list of row dicts, a
+    RowStore, or a {name: values} dict of equally long columns.
+    """
+    if isinstance(rows, dict):
+        if name in rows:
+            return rows[name]
+        return [default] * len(next(iter(rows.values()), ()))
+    if isinstance(rows, RowStore):
+        return rows.column(name, default)
+    return [row.get(name, default) for row in rows]
+
+
+def _grams(token):
+    """Yields every distinct substring of length 1..MAX_GRAM_SIZE of a token."""
+    seen = set()
+    for size in range(1, MAX_GRAM_SIZE + 1):
+        for start in range(len(token) - size + 1):
+            gram = token[start:start + size]
+            if gram not in seen:
+                seen.add(gram)
+                yield gram
+
+
+class KeywordIndex:
+    """
+    Inverted index over the `search_text` of a list of catalog rows.
+
+    Keywords in /search_items are matched as substrings. Since a keyword only
+    contains [a-z0-9], it is a substring of a row's text exactly when it is a
+    substring of one of the row's tokens. The index therefore keeps:
+      - postings: token -> row ids containing that token
+      - grams:    1/2/3-gram -> token ids containing that gram
+    A keyword lookup resolves its candidate tokens through the gram lists and
+    unions their postings, so the cost follows the vocabulary and the result
+    set rather than the number of rows.
+    """
+
+    def __init__(self, rows):
+        token_ids = {}
+        postings = []
+        for row_id, text in enumerate(column_values(rows, 'search_text')):
+            for token in set(tokenize(text)):
+                token_id = token_ids.get(token)
+                if token_id is None:
+                    token_id = token_ids[token] = len(postings)
+                    postings.append(array('I'))
+                postings[token_id].append(row_id)
+
+        grams = {}
+        for token, token_id in token_ids.items():
+            for gram in _grams(token):
+                grams.setdefault(gram, array('I')).append(token_id)
+
+        self.tokens = list(token_ids)
+        self.postings = postings
+        self.grams = grams
+
+    def _matching_token_ids(self, keyword):
+        if len(keyword) <= MAX_GRAM_SIZE:
+            return self.grams.get(keyword, ())
+
+        candidates = None
+        for start in range(len(keyword) - MAX_GRAM_SIZE + 1):
+            token_ids = self.grams.get(keyword[start:start + MAX_GRAM_SIZE])
+            if not token_ids:
+                return ()
+            candidates = set(token_ids) if candidates is None else candidates.intersection(token_ids)
+            if not candidates:
+                return ()
+        return [token_id for token_id in candidates if keyword in self.tokens[token_id]]
+
+    def lookup(self, keyword):
+        """Returns the set of row ids whose text contains the alphanumeric `keyword`."""
+        rows = set()
+        for token_id in self._matching_token_ids(keyword):
+            rows.update(self.postings[token_id])
+        return rows
+
+    def search(self, rows, positive_keywords, positive_query, negative_keywords, allowed=None):
+        """
+        Scores rows the same way the linear scan in /search_items did:
+        the fraction of positive keywords found, +0.5 when the whole positive
+        query appears verbatim, and rows containing any negative keyword dropped.
+        `allowed` optionally restricts the candidates (e.g. to facet matches).
+        Returns a list of (row_id, score) in catalog order.
+        """
+        keyword_rows = [self.lookup(keyword) for keyword in positive_keywords]
+        candidates = set().union(*keyword_rows)
+        if allowed is not None:
+            candidates &= allowed
+
+        results = []
+        for row_id in sorted(candidates):
+            target_text = rows.value(row_id, 'search_text') or ''
+            if any(neg_keyword in target_text for neg_keyword in negative_keywords):
+                continue
+
+            matched_keywords_count = sum(1 for matches in keyword_rows if row_id in matches)
+            score = matched_keywords_count / len(positive_keywords)
+            if positive_query in target_text:
+                score += 0.5
+            results.append((row_id, score))
+        return results
+
+
+FACET_FIELDS = ('product_type', 'make', 'approvals', 'model')
+
+
+class FacetIndex:
+    """
+    Row-id sets for each value of the categorical columns used by the
+    /search_items filters, keyed the way the filters compare them
+    (str(value).lower()). Also keeps the sorted display values that
+    /get_filter_options and /get_sheet_names offer to the frontend.
+    """
+
+    def __init__(self, rows, fields=FACET_FIELDS):
+        postings = {field: {} for field in fields}
+        display_values = {field: set() for field in fields}
+        for field in fields:
+            for row_id, value in enumerate(column_values(rows, field, '')):
+                postings[field].setdefault(str(value).lower(), array('I')).append(row_id)
+                if value is not None and str(value).strip():
+                    display_values[field].add(str(value))
+
+        self.postings = postings
+        self.values = {field: sorted(values) for field, values in display_values.items()}
+
+    def allowed_rows(self, filters):
+        """
+        Intersects the facet filters ({field: [lower-cased values]}), where the
+        values of one field are OR-ed together. Returns None when no filter is active.
+        """
+        allowed = None
+        for field, values in filters.items():
+            if not values:
+                continue
+            field_postings = self.postings.get(field, {})
+            matches = set()
+            for value in values:
+                matches.update(field_postings.get(value, ()))
+            allowed = matches if allowed is None else allowed & matches
+            if not allowed:
+                break
+        return allowed
+
+
+# Marks a key a row dict lacks, as opposed to one whose value is None
+_ABSENT = object()
+
+_decode_json = json.JSONDecoder().decode
+
+
+class RowStore:
+    """
+    Read-only, memory-mapped columnar store of catalog rows. Row ids are the
+    positions used by the FAISS and keyword indexes. Each column is a blob of
+    JSON-encoded values plus an int64 offsets array inside a single file, so
+    worker processes share the same page-cache pages and a row is only decoded
+    when it is actually returned. An empty value marks a key the row lacked.
+    Columns named with a leading underscore are bookkeeping (e.g. the source
+    sheet row) and are left out of decoded rows.
+
+    Offsets and values are read through memoryviews of the map (plain ints and
+    byte slices, no numpy scalars), and a row's values are parsed with a single
+    JSON decode of the array they form.
+    """
+
+    MAGIC = b'ROWSTORE1\n'
+
+    __slots__ = ('_buffer', '_columns', '_row_columns', '_column_positions', '_row_count')
+
+    def __init__(self, filepath):
+        buffer = np.memmap(filepath, dtype=np.uint8, mode='r')
+        magic_length = len(self.MAGIC)
+        if buffer[:magic_length].tobytes() != self.MAGIC:
+            raise ValueError(f"'{filepath}' is not a row store file.")
+        header_length = int(buffer[magic_length:magic_length + 8].view('<i8')[0])
+        header = json.loads(buffer[magic_length + 8:magic_length + 8 + header_length].tobytes())
+
+        row_count = header['row_count']
+        view = memoryview(buffer)
+        columns = []
+        for column in header['columns']:
+            offsets_start, offsets_end = column['offsets'], column['offsets'] + 8 * (row_count + 1)
+            if sys.byteorder == 'little':
+                offsets = view[offsets_start:offsets_end].cast('q')
+            else:
+                offsets = buffer[offsets_start:offsets_end].view('<i8')
+            data = view[column['data']:column['data'] + column['data_length']]
+            columns.append((column['name'], offsets, data))
+
+        self._buffer = buffer
+        self._columns = columns
+        self._row_columns = [column for column in columns if not column[0].startswith('_')]
+        self._column_positions = {name: pos for pos, (name, _, _) in enumerate(columns)}
+        self._row_count = row_count
+
+    @classmethod
+    def write(cls, rows, filepath):
+        """Writes a list of row dicts to `filepath`; keys a row lacks are stored as absent."""
+        rows = list(rows)
+        names = list(dict.fromkeys(key for row in rows for key in row))
+        columns = {name: [row.get(name, _ABSENT) for row in rows] for name in names}
+        cls.write_columns(columns, filepath, row_count=len(rows))
+
+    @classmethod
+    def write_columns(cls, columns, filepath, row_count=None):
+        """
+        Writes a {name: values} dict of equally long columns to `filepath`
+        (via a temporary file, so readers never see a partial store).
+        """
+        if row_count is None:
+            row_count = len(next(iter(columns.values()), ()))
+
+        sections = []
+        for name, values in columns.items():
+            encoded = [b'' if value is _ABSENT else json.dumps(value, default=str).encode('utf-8') for value in values]
+            offsets = np.zeros(row_count + 1, dtype='<i8')
+            np.cumsum([len(value) for value in encoded], out=offsets[1:])
+            sections.append((name, offsets.tobytes(), b''.join(encoded)))
+
+        def aligned(position):
+            return (position + 7) & ~7
+
+        # Section positions depend on the header size, which depends on the positions; iterate until stable
+        header_length = 0
+        while True:
+            position = aligned(len(cls.MAGIC) + 8 + header_length)
+            layout = []
+            for name, offsets, data in sections:
+                layout.append({'name': name, 'offsets': position, 'data': position + len(offsets), 'data_length': len(data)})
+                position = aligned(position + len(offsets) + len(data))
+            header = json.dumps({'row_count': row_count, 'columns': layout}).encode('utf-8')
+            if len(header) == header_length:
+                break
+            header_length = len(header)
+
+        temp_path = f"{filepath}.tmp"
+        with open(temp_path, 'wb') as f:
+            f.write(cls.MAGIC)
+            f.write(np.array([header_length], dtype='<i8').tobytes())
+            f.write(header)
+            for column, (_, offsets, data) in zip(layout, sections):
+                f.write(b'\0' * (column['offsets'] - f.tell()))
+                f.write(offsets)
+                f.write(data)
+        os.replace(temp_path, filepath)
+
+    def __len__(self):
+        return self._row_count
+
+    def _row_position(self, row_id):
+        if row_id < 0:
+            row_id += self._row_count
+        if not 0 <= row_id < self._row_count:
+            raise IndexError('row id out of range')
+        return row_id
+
+    def __getitem__(self, row_id):
+        row_id = self._row_position(row_id)
+        names, values = [], []
+        for name, offsets, data in self._row_columns:
+            start, end = offsets[row_id], offsets[row_id + 1]
+            if end > start:
+                names.append(name)
+                values.append(data[start:end])
+        return dict(zip(names, _decode_json(b''.join((b'[', b','.join(values), b']')).decode('utf-8'))))
+
+    def __iter__(self):
+        for row_id in range(self._row_count):
+            yield self[row_id]
+
+    def value(self, row_id, name, default=None):
+        """Decodes a single column of a row without materializing the rest of it."""
+        row_id = self._row_position(row_id)
+        pos = self._column_positions.get(name)
+        if pos is None:
+            return default
+        _, offsets, data = self._columns[pos]
+        start, end = offsets[row_id], offsets[row_id + 1]
+        return _decode_json(str(data[start:end], 'utf-8')) if end > start else default
+
+    def has_column(self, name):
+        return name in self._column_positions
+
+    def column(self, name, default=None):
+        """Decodes every value of one column, e.g. to rebuild a row-level index."""
+        pos = self._column_positions.get(name)
+        if pos is None:
+            return [default] * self._row_count
+        _, offsets, data = self._columns[pos]
+        bounds = offsets.tolist()
+        return [_decode_json(str(data[start:end], 'utf-8')) if end > start else default for start, end in zip(bounds, bounds[1:])]
+
+    def patched(self, filepath, row_updates):
+        """
+        Writes a copy of this store to `filepath` with {row_id: {column: value}}
+        applied, and returns the new store. Row ids do not change, so indexes
+        built over this store stay valid as long as their columns are not patched.
+        """
+        columns = {name: self.column(name, _ABSENT) for name, _, _ in self._columns}
+        for row_id, values in row_updates.items():
+            for name, value in values.items():
+                columns.setdefault(name, [_ABSENT] * self._row_count)[row_id] = value
+        RowStore.write_columns(columns, filepath, row_count=self._row_count)
+        return RowStore(filepath)
+
+    def materialize(self, row_id, **extra):
+        """Decodes a row for serialization, with optional extra per-request fields."""
+        row = self[row_id]
+        row.update(extra)
+        return row
+
+
+SearchHit = namedtuple('SearchHit', ['row_store', 'row_id', 'score', 'source_sort_key'])
+
+
+def serialize_hits(hits, include_scores=False):
+    """Orders hits by relevance (foreign before local on ties) and materializes only those rows."""
+    ordered = sorted(hits, key=lambda hit: (-hit.score, hit.source_sort_key))
+    if include_scores:
+        return [hit.row_store.materialize(hit.row_id, relevance_score=hit.score, source_sort_key=hit.source_sort_key) for hit in ordered]
+    return [hit.row_store.materialize(hit.row_id) for hit in ordered]
@@ -10,7 +10,12 @@ function initializeActivityLogModule(deps) {
         return;
     }
 
-    let allProjects = [];
+    // Filtering, sorting and paging happen on the server; `loadedProjects` holds the pages fetched so far
+    let loadedProjects = [];
+    let nextOffset = null;
+    let totalCount = 0;
+    let searchTimeout;
+    let requestCounter = 0;
 
     const searchInput = document.getElementById('activity-log-search-input');
     const userFilter = document.getElementById('activity-log-user-filter');
@@ -25,19 +30,12 @@ function initializeActivityLogModule(deps) {
         placeholder.innerHTML = `<div class="flex flex-col items-center"><div class="loader"></div><p class="mt-4 font-semibold">Loading all projects...</p></div>`;
 
         try {
-            const [projectsRes, usersRes] = await Promise.all([
-                fetch(`${API_URL}/all_projects_for_admin?role=${currentUser.role}`), // FIX: Call the new admin-only endpoint
-                fetch(`${API_URL}/get_all_users`)
-            ]);
-
-            if (!projectsRes.ok) throw new Error('Failed to fetch projects.');
+            const usersRes = await fetch(`${API_URL}/get_all_users`);
             if (!usersRes.ok) throw new Error('Failed to fetch users.');
-
-            allProjects = await projectsRes.json();
             const allUsers = await usersRes.json();
 
             populateUserFilter(allUsers);
-            applyFiltersAndSort();
+            await applyFiltersAndSort();
         } catch (err) {
             placeholder.innerHTML = `<p class="text-red-500 font-semibold">Error: ${err.message}</p>`;
             showToast('Failed to load data for the log.', true);
@@ -54,44 +52,53 @@ function initializeActivityLogModule(deps) {
         });
     };
 
-    const applyFiltersAndSort = () => {
-        let processedProjects = [...allProjects];
-
-        const searchQuery = searchInput.value.toLowerCase().trim();
-        const userQuery = userFilter.value;
-        const typeQuery = typeFilter.value;
-
-        if (searchQuery) {
-            processedProjects = processedProjects.filter(p =>
-                (p.referenceNumber && p.referenceNumber.toLowerCase().includes(searchQuery)) ||
-                (p.clientName && p.clientName.toLowerCase().includes(searchQuery))
-            );
-        }
+    const fetchProjectsPage = async (offset) => {
+        const params = new URLSearchParams({
+            role: currentUser.role,
+            search: searchInput.value.toLowerCase().trim(),
+            owner: userFilter.value,
+            type: typeFilter.value,
+            sort: sortBy.value || 'date_desc',
+            offset: offset
+        });
+        const response = await fetch(`${API_URL}/all_projects_for_admin?${params}`); // FIX: Call the new admin-only endpoint
+        if (!response.ok) throw new Error('Failed to fetch projects.');
+        const projects = await response.json();
+        return {
+            projects,
+            nextOffset: response.headers.get('X-Next-Offset'),
+            totalCount: Number(response.headers.get('X-Total-Count') || projects.length)
+        };
+    };
 
-        if (userQuery) {
-            processedProjects = processedProjects.filter(p => p.owner_email === userQuery);
-        }
+    const applyFiltersAndSort = async () => {
+        // Only the latest request may render, since filters can change while one is in flight
+        const requestId = ++requestCounter;
+        const page = await fetchProjectsPage(0);
+        if (requestId !== requestCounter) return;
+        loadedProjects = page.projects;
+        nextOffset = page.nextOffset;
+        totalCount = page.totalCount;
+        renderProjectsTable(loadedProjects);
+    };
 
-        if (typeQuery) {
-            processedProjects = processedProjects.filter(p => p.projectType === typeQuery);
+    const loadMoreProjects = async () => {
+        if (nextOffset === null) return;
+        const requestId = requestCounter;
+        try {
+            const page = await fetchProjectsPage(Number(nextOffset));
+            if (requestId !== requestCounter) return;
+            loadedProjects = loadedProjects.concat(page.projects);
+            nextOffset = page.nextOffset;
+            totalCount = page.totalCount;
+            renderProjectsTable(loadedProjects);
+        } catch (err) {
+            showToast(`Failed to load more projects: ${err.message}`, true);
         }
+    };
 
-        const sortQuery = sortBy.value;
-        processedProjects.sort((a, b) => {
-            switch (sortQuery) {
-                case 'date_asc':
-                    return new Date(a.dateModified) - new Date(b.dateModified);
-                case 'ref_asc':
-                    return (a.referenceNumber || '').localeCompare(b.referenceNumber || '', undefined, { numeric: true });
-                case 'ref_desc':
-                    return (b.referenceNumber || '').localeCompare(a.referenceNumber || '', undefined, { numeric: true });
-                case 'date_desc':
-                default:
-                    return new Date(b.dateModified) - new Date(a.dateModified);
-            }
-        });
-
-        renderProjectsTable(processedProjects);
+    const refreshProjects = () => {
+        applyFiltersAndSort().catch(err => showToast(`Failed to load projects: ${err.message}`, true));
     };
 
     const renderProjectsTable = (projects) => {
@@ -150,12 +157,22 @@ function initializeActivityLogModule(deps) {
             `;
             tableBody.appendChild(row);
         });
+
+        if (nextOffset !== null) {
+            const loadMoreRow = document.createElement('tr');
+            loadMoreRow.innerHTML = `<td colspan="9" class="px-6 py-3 text-center"><button class="px-3 py-1 text-sm bg-slate-200 dark:bg-slate-700 rounded hover:bg-slate-300 dark:hover:bg-slate-600">Load more (${projects.length} of ${totalCount})</button></td>`;
+            loadMoreRow.querySelector('button').addEventListener('click', loadMoreProjects);
+            tableBody.appendChild(loadMoreRow);
+        }
     };
 
-    if (searchInput) searchInput.addEventListener('input', applyFiltersAndSort);
-    if (userFilter) userFilter.addEventListener('change', applyFiltersAndSort);
-    if (typeFilter) typeFilter.addEventListener('change', applyFiltersAndSort);
-    if (sortBy) sortBy.addEventListener('change', applyFiltersAndSort);
+    if (searchInput) searchInput.addEventListener('input', () => {
+        clearTimeout(searchTimeout);
+        searchTimeout = setTimeout(refreshProjects, 300);
+    });
+    if (userFilter) userFilter.addEventListener('change', refreshProjects);
+    if (typeFilter) typeFilter.addEventListener('change', refreshProjects);
+    if (sortBy) sortBy.addEventListener('change', refreshProjects);
 
     if (tableBody) {
         tableBody.addEventListener('click', (e) => {
@@ -134,6 +134,68 @@ const initializeAiHelperModule = (dependencies) => {
         saveAsBtn.disabled = disabled;
     }
 
+    function showProcessingProgress(processed, total) {
+        const progressText = total ? ` ${processed}/${total}` : '';
+        processBtn.innerHTML = `<div class="loader !w-4 !h-4 !border-2"></div><span class="ml-2">Processing...${progressText}</span>`;
+    }
+
+    // Submits the file as a background job and resolves with its final result.
+    // Progress is pushed over Socket.IO when connected; polling covers missed events.
+    async function runProcessingJob(formData) {
+        const socket = window.socket;
+        if (socket && socket.id) formData.append('socket_id', socket.id);
+
+        const submitResponse = await fetch(`${API_URL}/ai_helper/jobs`, { method: 'POST', body: formData });
+        const submitted = await submitResponse.json();
+        if (!submitted.success) {
+            throw new Error(submitted.message);
+        }
+        const jobId = submitted.job_id;
+
+        return new Promise((resolve, reject) => {
+            let pollTimer = null;
+
+            const onProgress = (data) => {
+                if (data.job_id === jobId) showProcessingProgress(data.processed, data.total);
+            };
+            const onFinished = (data) => {
+                if (data.job_id !== jobId) return;
+                clearTimeout(pollTimer);
+                poll();
+            };
+            const cleanup = () => {
+                clearTimeout(pollTimer);
+                if (socket) {
+                    socket.off('ai_helper_progress', onProgress);
+                    socket.off('ai_helper_job_finished', onFinished);
+                }
+            };
+            const poll = async () => {
+                try {
+                    const response = await fetch(`${API_URL}/ai_helper/jobs/${jobId}`);
+                    const job = await response.json();
+                    if (!job.success) throw new Error(job.message);
+                    if (job.status === 'done' || job.status === 'failed') {
+                        cleanup();
+                        resolve(job.result);
+                        return;
+                    }
+                    showProcessingProgress(job.processed, job.total);
+                    pollTimer = setTimeout(poll, 2000);
+                } catch (error) {
+                    cleanup();
+                    reject(error);
+                }
+            };
+
+            if (socket) {
+                socket.on('ai_helper_progress', onProgress);
+                socket.on('ai_helper_job_finished', onFinished);
+            }
+            pollTimer = setTimeout(poll, 2000);
+        });
+    }
+
     async function handleFileProcessing() {
         if (!lastSelectedFile) {
             showToast('Please select a file first.', true);
@@ -161,8 +223,7 @@ const initializeAiHelperModule = (dependencies) => {
         processBtn.innerHTML = '<div class="loader !w-4 !h-4 !border-2"></div><span class="ml-2">Processing...</span>';
 
         try {
-            const response = await fetch(`${API_URL}/ai_helper/process_file`, { method: 'POST', body: formData });
-            const result = await response.json();
+            const result = await runProcessingJob(formData);
 
             if (!result.success) {
                 throw new Error(result.message);
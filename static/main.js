@@ -44,7 +44,7 @@ const initializeApp = () => {
     // --- STATE MANAGEMENT ---
     const API_URL = '';
     let currentUser = null, currentProjectId = null, currentReferenceNumber = null;
-    let notificationPollInterval;
+    let notificationPollInterval, notificationSocketBound = false, displayedNotifications = [];
     const tabInitializationState = {
         generator: false,
         challan: false,
@@ -321,20 +321,25 @@ const initializeApp = () => {
         adminOnlyTabs.style.display = isAdmin ? 'block' : 'none';
         reinitBtn.style.display = isAdmin ? 'flex' : 'none';
         populateUserSuggestions();
-        pollNotifications();
-        notificationPollInterval = setInterval(pollNotifications, 15000);
+        loadNotifications();
+        // Notifications are pushed over the chat socket; poll only while it is not connected
+        clearInterval(notificationPollInterval);
+        notificationPollInterval = setInterval(() => {
+            if (!window.socket || !window.socket.connected) loadNotifications();
+        }, 15000);
         
         if (!tabInitializationState.chat) {
             initializeChatModule({ API_URL, currentUser, showToast });
             tabInitializationState.chat = true;
         }
+        bindNotificationSocket();
 
         // UPDATED: Use the createSearchHandler for the main project search
         createSearchHandler({
             searchInput: projectSearchInput,
             resultsContainer: projectSearchResults,
             apiEndpoint: `${API_URL}/projects`,
-            buildQuery: (query) => `email=${currentUser.email}&role=${currentUser.role}&search=${encodeURIComponent(query)}`,
+            buildQuery: (query) => `email=${currentUser.email}&role=${currentUser.role}&search=${encodeURIComponent(query)}&limit=20&fields=projectId,referenceNumber,clientName`,
             renderResults: renderProjectResults, // This function is now in search_result.js
             onResultSelected: async (project) => {
                 const result = await getProjectData(project.projectId);
@@ -354,12 +359,17 @@ const initializeApp = () => {
         switchTab('generator');
     }
 
-    async function renderProjectsList(searchTerm = '') {
-        projectsTableBody.innerHTML = '';
+    // The list is fetched a page at a time; "Load more" appends the next page
+    async function renderProjectsList(searchTerm = '', offset = 0) {
+        if (offset === 0) projectsTableBody.innerHTML = '';
         try {
-            const response = await fetch(`${API_URL}/projects?email=${currentUser.email}&search=${encodeURIComponent(searchTerm)}&role=${currentUser.role}`);
+            const response = await fetch(`${API_URL}/projects?email=${currentUser.email}&search=${encodeURIComponent(searchTerm)}&role=${currentUser.role}&offset=${offset}`);
             const projects = await response.json();
-            if (!response.ok || projects.length === 0) {
+            if (offset > 0) {
+                const loadMoreRow = projectsTableBody.querySelector('.load-more-projects-row');
+                if (loadMoreRow) loadMoreRow.remove();
+                if (!response.ok) throw new Error(projects.message || 'Failed to load more projects.');
+            } else if (!response.ok || projects.length === 0) {
                 projectsTablePlaceholder.style.display = 'table-row';
                 const placeholderCell = projectsTablePlaceholder.querySelector('td');
                 if (placeholderCell) {
@@ -405,6 +415,15 @@ const initializeApp = () => {
                     </td>`;
                 projectsTableBody.appendChild(row);
             });
+
+            const nextOffset = response.headers.get('X-Next-Offset');
+            if (nextOffset !== null) {
+                const loadMoreRow = document.createElement('tr');
+                loadMoreRow.className = 'load-more-projects-row';
+                loadMoreRow.innerHTML = `<td colspan="8" class="text-center py-3"><button class="px-3 py-1 text-sm bg-slate-200 dark:bg-slate-700 rounded hover:bg-slate-300 dark:hover:bg-slate-600">Load more (${projectsTableBody.querySelectorAll('tr:not(.load-more-projects-row)').length} of ${response.headers.get('X-Total-Count')})</button></td>`;
+                loadMoreRow.querySelector('button').addEventListener('click', () => renderProjectsList(searchTerm, Number(nextOffset)));
+                projectsTableBody.appendChild(loadMoreRow);
+            }
         } catch (err) { 
             projectsTablePlaceholder.style.display = 'table-row';
             const placeholderCell = projectsTablePlaceholder.querySelector('td');
@@ -500,17 +519,42 @@ const initializeApp = () => {
         } catch (err) { adminReviewPlaceholder.textContent = `Error loading admin reviews: ${err.message}`; }
     }
     
-    async function pollNotifications() {
+    function showUnreadCount(unreadCount) {
+        notificationBadge.textContent = unreadCount;
+        notificationBadge.classList.toggle('hidden', unreadCount === 0);
+    }
+
+    function bindNotificationSocket() {
+        if (notificationSocketBound || !window.socket) return;
+        notificationSocketBound = true;
+        window.socket.on('new_notification', (data) => {
+            if (!currentUser || data.notification.user_email !== currentUser.email) return;
+            renderNotifications([data.notification, ...displayedNotifications]);
+            showUnreadCount(data.unread_count);
+            refreshAdminReviewBadge();
+        });
+        // Sent on every (re)connect; reload if anything changed while disconnected
+        window.socket.on('notification_count', (data) => {
+            if (String(data.unread_count) !== notificationBadge.textContent) loadNotifications();
+        });
+    }
+
+    async function loadNotifications() {
         if (!currentUser) return;
         try {
             const res = await fetch(`${API_URL}/get_notifications?email=${currentUser.email}`);
             const notifications = await res.json();
+            showUnreadCount(Number(res.headers.get('X-Unread-Count')));
+            await refreshAdminReviewBadge();
+            renderNotifications(notifications);
+        } catch (err) { console.error('Failed to load notifications:', err); }
+    }
+
+    async function refreshAdminReviewBadge() {
+        if (!currentUser) return;
+        try {
             const adminRes = await fetch(`${API_URL}/get_admin_requests?role=${currentUser.role}`);
             const adminRequests = await adminRes.json();
-            const unreadCount = notifications.filter(n => n.is_read === 'no').length;
-            notificationBadge.textContent = unreadCount;
-            notificationBadge.classList.toggle('hidden', unreadCount === 0);
-            
             const adminReviewTab = document.querySelector('[data-tab="admin-review"]');
             let adminReviewBadge = adminReviewTab.querySelector('.notification-badge');
             if (currentUser.role === 'admin' && adminRequests.length > 0) {
@@ -523,11 +567,11 @@ const initializeApp = () => {
             } else if (adminReviewBadge) {
                 adminReviewBadge.remove();
             }
-            renderNotifications(notifications);
-        } catch (err) { console.error('Failed to poll notifications:', err); }
+        } catch (err) { console.error('Failed to load admin requests:', err); }
     }
 
     function renderNotifications(notifications) {
+        displayedNotifications = notifications;
         notificationItemsContainer.innerHTML = notifications.length === 0 ? '<p class="text-center text-slate-500 py-4">No notifications</p>' : '';
         notifications.forEach(notif => {
             const notifDiv = document.createElement('div');
@@ -553,9 +597,7 @@ const initializeApp = () => {
                            const result = await res.json();
                            if (result.success) {
                                renderNotifications(result.notifications);
-                               const unreadCount = result.notifications.filter(n => n.is_read === 'no').length;
-                               notificationBadge.textContent = unreadCount;
-                               notificationBadge.classList.toggle('hidden', unreadCount === 0);
+                               showUnreadCount(result.unread_count);
                            }
                         }
                     } catch (err) {
@@ -588,9 +630,7 @@ const initializeApp = () => {
                     if (result.success) {
                         // Re-render the list with the data from the server
                         renderNotifications(result.notifications);
-                        const unreadCount = result.notifications.filter(n => n.is_read === 'no').length;
-                        notificationBadge.textContent = unreadCount;
-                        notificationBadge.classList.toggle('hidden', unreadCount === 0);
+                        showUnreadCount(result.unread_count);
                     } else {
                         showToast(result.message, true);
                     }
@@ -717,7 +757,18 @@ const initializeApp = () => {
         reinitBtn.disabled = true; reinitBtn.innerHTML = `<div class="loader !w-4 !h-4 !border-2"></div><span class="ml-2">Initializing...</span>`;
         try {
             const response = await fetch(`${API_URL}/reinitialize`, { method: 'POST', headers: { 'Content-Type': 'application/json' }, body: JSON.stringify({ role: currentUser.role }) });
-            alert((await response.json()).message);
+            const result = await response.json();
+            if (!result.success || !result.build_id) { alert(result.message); return; }
+            // The rebuild runs in the background; search keeps working until it is published
+            let build = { status: 'queued' };
+            while (build.status === 'queued' || build.status === 'running') {
+                await new Promise(resolve => setTimeout(resolve, 2000));
+                const statusResponse = await fetch(`${API_URL}/reinitialize/${result.build_id}?role=${currentUser.role}`);
+                const statusResult = await statusResponse.json();
+                if (!statusResult.success) { alert(statusResult.message); return; }
+                build = statusResult.build;
+            }
+            alert(build.message);
         } catch (err) { alert('An error occurred during re-initialization.'); } 
         finally { reinitBtn.disabled = false; reinitBtn.textContent = 'Re-init Data'; }
     });
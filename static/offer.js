@@ -2209,30 +2209,58 @@ const getDefaultFinancialLabels = () => ({
 
     if (autoFillBtn) {
         autoFillBtn.addEventListener('click', async () => {
+            const resetButton = () => {
+                autoFillBtn.disabled = false;
+                autoFillBtn.innerHTML = '<i class="fas fa-magic"></i> Auto-fill Missing Prices';
+            };
+            const postAutofill = async (dryRun) => {
+                const response = await fetch(`${API_URL}/autofill_master_prices`, {
+                    method: 'POST',
+                    headers: { 'Content-Type': 'application/json' },
+                    body: JSON.stringify({ adminEmail: currentUser.email, dryRun })
+                });
+                return response.json();
+            };
+
+            autoFillBtn.disabled = true;
+            autoFillBtn.innerHTML = `<div class="loader !w-4 !h-4 !border-2"></div><span class="ml-2">Checking...</span>`;
+
+            // Preview first, so the admin sees how many rows would change before anything is written
+            let preview;
+            try {
+                preview = await postAutofill(true);
+            } catch (err) {
+                showToast(`An error occurred: ${err.message}`, true);
+                resetButton();
+                return;
+            }
+            if (!preview.success || preview.count === 0) {
+                showToast(preview.count === 0 && preview.success ? 'No items need auto-filling.' : preview.message, !preview.success);
+                resetButton();
+                return;
+            }
+
+            const sheetCount = new Set(preview.rows.map(row => `${row.source}/${row.sheet}`)).size;
             const confirmed = await showConfirmModal(
-                'This will scan the master price lists and attempt to fill in any missing price values. This can take a moment and will trigger a data re-initialization. Continue?',
+                `${preview.count} item(s) across ${sheetCount} sheet(s) have no installation price and will be set to 10% of their offer price. Continue?`,
                 'Auto-fill Master Prices',
                 'bg-red-600 hover:bg-red-700',
                 'Proceed'
             );
-            if (!confirmed) return;
+            if (!confirmed) {
+                resetButton();
+                return;
+            }
 
-            autoFillBtn.disabled = true;
             autoFillBtn.innerHTML = `<div class="loader !w-4 !h-4 !border-2"></div><span class="ml-2">Processing...</span>`;
 
             try {
-                const response = await fetch(`${API_URL}/autofill_master_prices`, {
-                    method: 'POST',
-                    headers: { 'Content-Type': 'application/json' },
-                    body: JSON.stringify({ adminEmail: currentUser.email })
-                });
-                const result = await response.json();
+                const result = await postAutofill(false);
                 showToast(result.message, !result.success);
             } catch (err) {
                 showToast(`An error occurred: ${err.message}`, true);
             } finally {
-                autoFillBtn.disabled = false;
-                autoFillBtn.innerHTML = '<i class="fas fa-magic"></i> Auto-fill Missing Prices';
+                resetButton();
             }
         });
     }
@@ -0,0 +1,220 @@
+# table_store.py
+import io
+import os
+import csv
+import json
+import sqlite3
+import threading
+from datetime import datetime
+
+# The app's record tables: their columns (in CSV order), column types other than text, key column and secondary indexes
+TABLES = {
+    'activity_log': {
+        'columns': ['sl', 'date', 'user_name', 'fo_name', 'file_path', 'project_id'],
+        'types': {'sl': 'INTEGER'},
+        'key': None,
+        'indexes': [('sl',)],
+    },
+    'review_requests': {
+        'columns': ['request_id', 'user_email', 'request_type', 'item_code', 'details', 'status', 'visibility', 'remarks', 'timestamp'],
+        'key': 'request_id',
+        'indexes': [('user_email', 'status', 'visibility'), ('status', 'visibility')],
+    },
+    'notifications': {
+        'columns': ['notification_id', 'user_email', 'message', 'is_read', 'timestamp'],
+        'key': 'notification_id',
+        'indexes': [('user_email', 'timestamp')],
+    },
+    'project_shares': {
+        'columns': ['share_id', 'project_id', 'owner_email', 'shared_with_email', 'permissions', 'timestamp'],
+        'key': 'share_id',
+        'indexes': [('shared_with_email', 'project_id'), ('project_id',)],
+    },
+    'tasks': {
+        'columns': ['task_id', 'assigned_by', 'assigned_to', 'task_description', 'status', 'timestamp'],
+        'key': 'task_id',
+        'indexes': [('assigned_to',)],
+    },
+    'chat_history': {
+        'columns': ['message_id', 'sender_email', 'recipient_email', 'message', 'timestamp'],
+        'key': 'message_id',
+        'indexes': [('sender_email', 'recipient_email', 'timestamp')],
+    },
+}
+
+
+# Unread notifications per user, kept current by triggers so the count is one primary-key read
+NOTIFICATION_COUNTS_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS notification_counts (user_email TEXT PRIMARY KEY NOT NULL, unread INTEGER NOT NULL);
+    CREATE TRIGGER IF NOT EXISTS notifications_count_insert AFTER INSERT ON notifications
+    WHEN NEW.is_read = 'no' AND NEW.user_email IS NOT NULL BEGIN
+        INSERT INTO notification_counts (user_email, unread) VALUES (NEW.user_email, 1)
+            ON CONFLICT (user_email) DO UPDATE SET unread = unread + 1;
+    END;
+    CREATE TRIGGER IF NOT EXISTS notifications_count_delete AFTER DELETE ON notifications
+    WHEN OLD.is_read = 'no' BEGIN
+        UPDATE notification_counts SET unread = unread - 1 WHERE user_email = OLD.user_email;
+    END;
+    CREATE TRIGGER IF NOT EXISTS notifications_count_update AFTER UPDATE OF is_read, user_email ON notifications BEGIN
+        UPDATE notification_counts SET unread = unread - 1 WHERE OLD.is_read = 'no' AND user_email = OLD.user_email;
+        INSERT INTO notification_counts (user_email, unread) SELECT NEW.user_email, 1
+            WHERE NEW.is_read = 'no' AND NEW.user_email IS NOT NULL
+            ON CONFLICT (user_email) DO UPDATE SET unread = unread + 1;
+    END;
+"""
+
+
+class TableStore:
+    """
+    The app's record tables (notifications, review requests, shares, tasks, chat
+    history and the activity log) in one SQLite database in WAL mode, replacing
+    the CSV files. Lookups go through indexes on the columns the endpoints filter
+    on, and updates touch only the rows they change. Each thread gets its own
+    connection.
+
+    `csv_sources` maps table names to the CSV files they used to live in; each is
+    imported once, the first time the database is opened, and left in place.
+    Unread notifications are counted per user in `notification_counts`.
+    Table and column names only ever come from TABLES, never from requests.
+    """
+
+    def __init__(self, db_file=None, csv_sources=None):
+        self.db_file = db_file
+        self.csv_sources = csv_sources or {}
+        self._local = threading.local()
+        self._setup_lock = threading.Lock()
+        self._ready = False
+
+    def _connection(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.db_file, timeout=30)
+            connection.row_factory = sqlite3.Row
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            self._local.connection = connection
+            with self._setup_lock:
+                if not self._ready:
+                    self._create_tables(connection)
+                    self._import_csv_sources(connection)
+                    self._count_notifications(connection)
+                    self._ready = True
+        return connection
+
+    def _create_tables(self, connection):
+        with connection:
+            connection.execute("CREATE TABLE IF NOT EXISTS store_meta (key TEXT PRIMARY KEY, value TEXT)")
+            for table, spec in TABLES.items():
+                types = spec.get('types', {})
+                columns = ', '.join(f"{column} {types.get(column, 'TEXT')}{' PRIMARY KEY' if column == spec['key'] else ''}" for column in spec['columns'])
+                connection.execute(f"CREATE TABLE IF NOT EXISTS {table} ({columns})")
+                for index_columns in spec['indexes']:
+                    connection.execute(f"CREATE INDEX IF NOT EXISTS {table}_{'_'.join(index_columns)} ON {table} ({', '.join(index_columns)})")
+        connection.executescript(NOTIFICATION_COUNTS_SCHEMA)
+
+    def _import_csv_sources(self, connection):
+        for table, filepath in self.csv_sources.items():
+            meta_key = f"imported:{table}"
+            if connection.execute("SELECT 1 FROM store_meta WHERE key = ?", (meta_key,)).fetchone():
+                continue
+            columns = TABLES[table]['columns']
+            imported = 0
+            with connection:
+                if os.path.exists(filepath):
+                    with open(filepath, 'r', newline='', encoding='utf-8') as f:
+                        for record in csv.DictReader(f):
+                            values = [record.get(column) if record.get(column) != '' else None for column in columns]
+                            cursor = connection.execute(
+                                f"INSERT OR IGNORE INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})", values)
+                            imported += cursor.rowcount
+                connection.execute("INSERT INTO store_meta (key, value) VALUES (?, ?)",
+                                   (meta_key, json.dumps({'file': os.path.abspath(filepath), 'rows': imported, 'at': datetime.now().isoformat()})))
+            if imported:
+                print(f"Imported {imported} row(s) from '{filepath}' into table '{table}'.")
+
+    def _count_notifications(self, connection):
+        # Counts notifications stored before the triggers existed; from then on the triggers keep them
+        if connection.execute("SELECT 1 FROM store_meta WHERE key = 'counted:notifications'").fetchone():
+            return
+        with connection:
+            connection.execute("DELETE FROM notification_counts")
+            connection.execute("INSERT INTO notification_counts (user_email, unread) SELECT user_email, count(*) FROM notifications "
+                               "WHERE is_read = 'no' AND user_email IS NOT NULL GROUP BY user_email")
+            connection.execute("INSERT INTO store_meta (key, value) VALUES ('counted:notifications', ?)", (datetime.now().isoformat(),))
+
+    @staticmethod
+    def _where(where):
+        if not where:
+            return '', []
+        return ' WHERE ' + ' AND '.join(f"{column} IS ?" for column in where), list(where.values())
+
+    def insert(self, table, row):
+        """Adds a row given as {column: value}; missing columns are stored as NULL."""
+        columns = TABLES[table]['columns']
+        connection = self._connection()
+        with connection:
+            connection.execute(f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})",
+                               [row.get(column) for column in columns])
+
+    def select(self, table, where=None, order_by=None):
+        """Rows as dicts, filtered by {column: value} equality and ordered by an ORDER BY clause from the caller."""
+        clause, params = self._where(where)
+        sql = f"SELECT {', '.join(TABLES[table]['columns'])} FROM {table}{clause}"
+        if order_by:
+            sql += f" ORDER BY {order_by}"
+        return [dict(row) for row in self._connection().execute(sql, params)]
+
+    def select_one(self, table, where):
+        rows = self.select(table, where)
+        return rows[0] if rows else None
+
+    def update(self, table, where, changes):
+        """Sets {column: value} on the rows matching `where`; returns how many rows changed."""
+        clause, params = self._where(where)
+        connection = self._connection()
+        with connection:
+            cursor = connection.execute(f"UPDATE {table} SET {', '.join(f'{column} = ?' for column in changes)}{clause}",
+                                        list(changes.values()) + params)
+        return cursor.rowcount
+
+    def delete(self, table, where):
+        clause, params = self._where(where)
+        connection = self._connection()
+        with connection:
+            cursor = connection.execute(f"DELETE FROM {table}{clause}", params)
+        return cursor.rowcount
+
+    def exists(self, table, where):
+        clause, params = self._where(where)
+        return self._connection().execute(f"SELECT 1 FROM {table}{clause} LIMIT 1", params).fetchone() is not None
+
+    def unread_count(self, user_email):
+        """How many of a user's notifications are unread."""
+        row = self._connection().execute("SELECT unread FROM notification_counts WHERE user_email = ?", (user_email,)).fetchone()
+        return row[0] if row else 0
+
+    def append_activity(self, row):
+        """Adds an activity-log row numbered one past the highest `sl`, in a single transaction."""
+        connection = self._connection()
+        with connection:
+            connection.execute('BEGIN IMMEDIATE')
+            last_sl = connection.execute("SELECT max(sl) FROM activity_log").fetchone()[0]
+            row = dict(row, sl=(last_sl or 0) + 1)
+            columns = TABLES['activity_log']['columns']
+            connection.execute(f"INSERT INTO activity_log ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})",
+                               [row.get(column) for column in columns])
+        return row['sl']
+
+    def export_csv(self, table):
+        """The whole table as CSV text, in the column layout of the old CSV file."""
+        columns = TABLES[table]['columns']
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(columns)
+        for row in self._connection().execute(f"SELECT {', '.join(columns)} FROM {table} ORDER BY rowid"):
+            writer.writerow(['' if value is None else value for value in row])
+        return buffer.getvalue()
+
+
+# Shared record tables; app.py sets the database file and the CSV files to import
+tables = TableStore()
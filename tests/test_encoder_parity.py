@@ -0,0 +1,38 @@
+# tests/test_encoder_parity.py
+import os
+import sys
+
+import pytest
+
+pytest.importorskip('faiss')
+pytest.importorskip('sentence_transformers')
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for path in (REPO_DIR, os.path.join(REPO_DIR, 'benchmarks')):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+from bench_util import SAMPLE_TEXTS
+from check_encoder_parity import encode, cosine_similarities, min_cosine_for
+
+MODEL_NAME = 'all-MiniLM-L6-v2'
+
+# (ENCODER_BACKEND, ENCODER_MODEL_FILE, runtime module the backend needs)
+BACKENDS = [
+    ('onnx', '', 'onnxruntime'),
+    ('onnx', 'onnx/model_qint8_avx512_vnni.onnx', 'onnxruntime'),
+    ('openvino', '', 'openvino'),
+]
+
+
+@pytest.fixture(scope='module')
+def torch_vectors():
+    return encode({'MODEL_NAME': MODEL_NAME, 'ENCODER_BACKEND': 'torch'}, SAMPLE_TEXTS)
+
+
+@pytest.mark.parametrize('backend, model_file, runtime', BACKENDS, ids=[f"{b}:{f or 'default'}" for b, f, _ in BACKENDS])
+def test_backend_vectors_match_torch(torch_vectors, backend, model_file, runtime):
+    pytest.importorskip(runtime)
+    pytest.importorskip('optimum')
+    vectors = encode({'MODEL_NAME': MODEL_NAME, 'ENCODER_BACKEND': backend, 'ENCODER_MODEL_FILE': model_file}, SAMPLE_TEXTS)
+    assert cosine_similarities(vectors, torch_vectors).min() >= min_cosine_for(model_file)
@@ -0,0 +1,126 @@
+# tests/test_master_price_updates.py
+import os
+import sys
+
+import pytest
+from openpyxl import Workbook
+
+pytest.importorskip('faiss')
+pytest.importorskip('sentence_transformers')
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEADER = ['item_code', 'description', 'make', 'approvals', 'model', 'po_price', 'offer_price', 'installation', 'unit']
+
+
+def write_price_list(filepath, sheets):
+    wb = Workbook()
+    wb.remove(wb.active)
+    for sheet_name, rows in sheets.items():
+        ws = wb.create_sheet(sheet_name)
+        ws.append(HEADER)
+        for row in rows:
+            ws.append(row)
+    wb.save(filepath)
+
+
+@pytest.fixture(scope='module')
+def app_module(tmp_path_factory):
+    """app.py running in a fresh working directory with two small price lists."""
+    workdir = tmp_path_factory.mktemp('server')
+    previous_cwd = os.getcwd()
+    os.chdir(workdir)
+    os.makedirs('data_storage')
+    write_price_list(os.path.join('data_storage', 'Price List 2017-Rev-Edited -All Item 2018.xlsx'), {
+        'Cable': [
+            ['CB1', 'Copper cable 4C 16 sq mm', 'ABB', 'UL', 'C-16', 100, 108, 10, 'm'],
+            ['CB2', 'Copper cable 4C 25 sq mm', 'ABB', 'UL', 'C-25', 150, 162, None, 'm'],
+            ['CB3', 'Aluminium cable 4C 95 sq mm', 'ABB', 'UL', 'A-95', 300, None, None, 'm'],
+        ],
+    })
+    write_price_list(os.path.join('data_storage', 'local_items.xlsx'), {
+        'Fittings': [['FT1', 'GI elbow 1/2 inch', 'LS', None, None, 5, 6, 1, 'Pcs']],
+    })
+    if REPO_DIR not in sys.path:
+        sys.path.insert(0, REPO_DIR)
+    import app
+    app.setup_directories_and_files()
+    app.publish_search_bundle(app.data_management.initialize_data(app.data_config()))
+    yield app
+    # Queued builds read and write relative to the working directory
+    wait_for_index_builds(app)
+    os.chdir(previous_cwd)
+
+
+def wait_for_index_builds(app):
+    # Builds run one at a time in submission order, so an empty task finishing means they are done
+    app.index_build_executor.submit(lambda: None).result(timeout=120)
+
+
+def test_update_master_price_with_new_make_shows_up_in_filter_options(app_module):
+    client = app_module.app.test_client()
+    before = client.get('/get_filter_options')
+    assert 'Zeta' not in before.get_json()['make']
+
+    response = client.post('/update_master_price', json={
+        'adminEmail': 'admin@example.com', 'itemCode': 'ZT1', 'priceType': 'po_price', 'priceValue': 42,
+        'sourceType': 'foreign', 'productType': 'Zeta', 'description': 'Zeta smoke detector', 'unit': 'Pcs',
+    })
+    assert response.get_json()['success']
+    wait_for_index_builds(app_module)
+
+    after = client.get('/get_filter_options', headers={'If-None-Match': before.headers['ETag']})
+    assert after.status_code == 200
+    assert 'Zeta' in after.get_json()['make']
+    assert after.headers['ETag'] != before.headers['ETag']
+
+
+def test_batch_master_price_update_queues_one_rebuild(app_module):
+    client = app_module.app.test_client()
+    response = client.post('/update_master_prices', json={'adminEmail': 'admin@example.com', 'updates': [
+        {'itemCode': 'OM1', 'priceType': 'po_price', 'priceValue': 7, 'sourceType': 'local',
+         'productType': 'Omega', 'description': 'Omega junction box', 'unit': 'Pcs'},
+        {'itemCode': 'OM2', 'priceType': 'po_price', 'priceValue': 9, 'sourceType': 'local',
+         'productType': 'Omega', 'description': 'Omega gland', 'unit': 'Pcs'},
+    ]})
+    payload = response.get_json()
+    assert payload['success']
+    assert payload['build_id'] is not None
+    wait_for_index_builds(app_module)
+
+    assert app_module.index_builds[payload['build_id']]['status'] == 'completed'
+    assert 'Omega' in client.get('/get_filter_options').get_json()['make']
+
+
+def test_autofilled_installation_prices_match_a_rebuild(app_module):
+    def installation_values():
+        return [(row['item_code'], type(row['installation']), row['installation']) for row in app_module.search_bundle.item_searchable_data]
+
+    client = app_module.app.test_client()
+    response = client.post('/autofill_master_prices', json={'adminEmail': 'admin@example.com'})
+    assert response.get_json()['success']
+    wait_for_index_builds(app_module)
+    patched = installation_values()
+
+    app_module.start_index_build('check')
+    wait_for_index_builds(app_module)
+    assert patched == installation_values()
+
+
+def test_autofill_after_an_unindexed_row_shift_rebuilds_instead_of_patching(app_module):
+    # A row inserted by an edit whose rebuild never ran: the published rows no longer line up with the sheet
+    filepath = app_module.price_list_path('PRICE_LIST_FILE')
+    with app_module.price_list_repo.price_lists.edit(filepath) as edit:
+        ws = edit.workbook['Cable']
+        ws.insert_rows(2)
+        for col_idx, value in enumerate(['CB0', 'Fibre cable 12 core', 'ABB', 'UL', 'F-12', 400, 500, None, 'm'], start=1):
+            ws.cell(row=2, column=col_idx, value=value)
+        edit.rows_renumbered(ws)
+        edit.changed = True
+
+    client = app_module.app.test_client()
+    assert client.post('/autofill_master_prices', json={'adminEmail': 'admin@example.com'}).get_json()['success']
+    wait_for_index_builds(app_module)
+
+    installations = {row['item_code']: row['installation'] for row in app_module.search_bundle.item_searchable_data}
+    assert installations['CB0'] == 50
+    assert installations['CB1'] == 10
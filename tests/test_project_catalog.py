@@ -0,0 +1,32 @@
+# tests/test_project_catalog.py
+import json
+import os
+import sys
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if REPO_DIR not in sys.path:
+    sys.path.insert(0, REPO_DIR)
+
+from project_catalog import ProjectCatalog
+
+
+def write_project(projects_dir, project_id, **fields):
+    data = {'projectId': project_id, 'referenceNumber': f'REF-{project_id}', 'lastModified': '2025-01-01T10:00:00',
+            'owner_email': 'sales@example.com', 'client': {'name': 'Acme'}, 'sheets': [], **fields}
+    with open(os.path.join(projects_dir, f'{project_id}.json'), 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=4)
+
+
+def test_query_sees_a_project_rewritten_in_place_by_another_process(tmp_path):
+    projects_dir = tmp_path / 'projects'
+    projects_dir.mkdir()
+    write_project(projects_dir, 'p1', status='Pending')
+    catalog = ProjectCatalog(str(projects_dir), str(tmp_path / 'catalog.json'))
+    assert [row['status'] for row in catalog.query()] == ['Pending']
+
+    # Rewriting an existing file leaves the directory's mtime unchanged
+    directory_mtime = os.stat(projects_dir).st_mtime_ns
+    write_project(projects_dir, 'p1', status='Delivered to site')
+    assert os.stat(projects_dir).st_mtime_ns == directory_mtime
+
+    assert [row['status'] for row in catalog.query()] == ['Delivered to site']